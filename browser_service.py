@@ -0,0 +1,167 @@
+"""
+Browser Service
+Keeps one Chromium running with a persistent profile directory (cookies and
+a disk cache of VRBO's JS/CSS bundles) and exposes it over CDP. The fetch
+scripts attach to it instead of cold-launching their own browser, and fall
+back to launching one when the service is not running.
+
+Usage:
+    python browser_service.py              # Start (headed) and keep running until Ctrl+C
+    python browser_service.py --headless
+    python browser_service.py --status
+    python browser_service.py --stop
+"""
+
+import argparse
+import json
+import urllib.request
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright
+
+# Configuration
+SERVICE_PORT = 9222  # CDP port, bound to localhost only
+PROFILE_DIR = Path('.browser-profile')
+DISK_CACHE_MB = 512
+USE_SERVICE = True  # Set to False to make every script launch its own browser
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+# Applied by the service to every page in its context; attached scripts cannot change them
+CONTEXT_OPTIONS = {
+    'user_agent': USER_AGENT,
+    'locale': 'en-US',
+    'timezone_id': 'America/Chicago',
+    'color_scheme': 'light',
+    'no_viewport': True,  # Pages use the window size below
+}
+WINDOW_SIZE = (1920, 1080)
+
+
+def endpoint(port=SERVICE_PORT):
+    """CDP URL of the running service, or None"""
+    url = f'http://127.0.0.1:{port}'
+    try:
+        with urllib.request.urlopen(f'{url}/json/version', timeout=0.5) as response:
+            json.load(response)
+        return url
+    except (OSError, ValueError):
+        return None
+
+
+def attached(browser):
+    """True for a browser launch() reached over CDP (the service, with its persistent context)
+
+    Set when the browser is obtained: a launched browser also has contexts
+    once the first new_context() call made one.
+    """
+    return getattr(browser, 'via_cdp', False)
+
+
+def launch(p, **launch_options):
+    """The service's browser if it is running, else p.chromium.launch(**launch_options)
+
+    browser.close() on an attached browser only disconnects; the service keeps running.
+    """
+    url = endpoint() if USE_SERVICE else None
+    if url:
+        try:
+            browser = p.chromium.connect_over_cdp(url)
+            browser.via_cdp = True
+            print(f"[*] Attached to browser service at {url}")
+            return browser
+        except Exception as e:
+            print(f"[!] Browser service at {url} not usable ({e}), launching a browser")
+    return p.chromium.launch(**launch_options)
+
+
+def new_context(browser, **context_options):
+    """A context to open pages in
+
+    Attached: the service's persistent context, so its cache and cookies are
+    shared (context_options are ignored; see CONTEXT_OPTIONS). Launched: a
+    fresh browser.new_context(**context_options).
+    """
+    if attached(browser):
+        return browser.contexts[0]
+    return browser.new_context(**context_options)
+
+
+async def async_launch(p, **launch_options):
+    """launch() for async_playwright"""
+    url = endpoint() if USE_SERVICE else None
+    if url:
+        try:
+            browser = await p.chromium.connect_over_cdp(url)
+            browser.via_cdp = True
+            print(f"[*] Attached to browser service at {url}")
+            return browser
+        except Exception as e:
+            print(f"[!] Browser service at {url} not usable ({e}), launching a browser")
+    return await p.chromium.launch(**launch_options)
+
+
+async def async_new_context(browser, **context_options):
+    """new_context() for async_playwright"""
+    if attached(browser):
+        return browser.contexts[0]
+    return await browser.new_context(**context_options)
+
+
+def serve(headless=False, profile=PROFILE_DIR, port=SERVICE_PORT):
+    """Run the browser until Ctrl+C or its window is closed"""
+    if endpoint(port):
+        print(f"[=] A browser service is already running on port {port}")
+        return
+    args = [
+        f'--remote-debugging-port={port}',
+        '--remote-debugging-address=127.0.0.1',
+        f'--disk-cache-size={DISK_CACHE_MB * 1024 * 1024}',
+        f'--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}',
+        f'--user-agent={USER_AGENT}',  # Also for pages the service does not emulate
+        '--disable-blink-features=AutomationControlled',
+        '--disable-dev-shm-usage',
+    ]
+    Path(profile).mkdir(parents=True, exist_ok=True)
+    with sync_playwright() as p:
+        context = p.chromium.launch_persistent_context(str(profile), headless=headless, args=args,
+                                                       **CONTEXT_OPTIONS)
+        print(f"[+] Browser service listening on http://127.0.0.1:{port}")
+        print(f"[*] Profile and disk cache: {profile}/ ({DISK_CACHE_MB} MB cache)")
+        print("[*] Press Ctrl+C to stop")
+        try:
+            context.wait_for_event('close', timeout=0)  # Keeps serving Playwright events meanwhile
+        except KeyboardInterrupt:
+            print("\n[*] Stopping browser service...")
+            context.close()
+
+
+def stop(port=SERVICE_PORT):
+    url = endpoint(port)
+    if not url:
+        print("[=] No browser service running")
+        return
+    with sync_playwright() as p:
+        browser = p.chromium.connect_over_cdp(url)
+        browser.new_browser_cdp_session().send('Browser.close')
+    print("[+] Browser service stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared Chromium with a persistent profile and disk cache')
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--profile', default=str(PROFILE_DIR), help='Profile directory (cookies, disk cache)')
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--status', action='store_true', help='Report whether the service is running')
+    parser.add_argument('--stop', action='store_true', help='Close a running service')
+    args = parser.parse_args()
+
+    if args.status:
+        url = endpoint(args.port)
+        print(f"[+] Running at {url}" if url else "[-] Not running")
+    elif args.stop:
+        stop(args.port)
+    else:
+        serve(args.headless, Path(args.profile), args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Asset Build
+Produces the deployable site in dist/ from index.html (re-rendered first by
+build_site.py):
+- HTML, CSS and JavaScript minified (minify.py)
+- only the CSS the header and comparison table need is inlined; the full
+  stylesheet loads without blocking the first paint
+- stylesheet, script, image manifest and gallery images named after a hash
+  of their content, so browsers and CDNs can cache them indefinitely
+- .gz and .br (Brotli, when installed) siblings for every text file
+- a size report: source, minified, gzip and Brotli bytes per file
+
+Files from earlier builds that are no longer referenced are removed.
+
+Usage:
+    python build_assets.py
+    python build_assets.py --out public
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from html.parser import HTMLParser
+from pathlib import Path
+
+from build_site import build as build_page
+from image_convert import file_sha256, write_atomic
+from image_manifest import MANIFEST_FILE
+from minify import css_blocks, minify_css, minify_html, minify_js
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Configuration
+SOURCE_FILE = Path('index.html')
+DIST_DIR = Path('dist')
+ASSETS_DIR = 'assets'  # Stylesheet and script, under the output directory
+HASH_LENGTH = 10
+CRITICAL_ROOTS = ('header', 'summary-section')  # Tags or classes of the elements above the fold
+TEXT_SUFFIXES = ('.html', '.css', '.js', '.json', '.svg', '.txt')
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Served by hosts that read a _headers file (Netlify, Cloudflare Pages); hashed names never change content
+CACHE_HEADERS = {
+    f'/{ASSETS_DIR}/*': 'public, max-age=31536000, immutable',
+    '/images/*': 'public, max-age=31536000, immutable',
+    '/index.html': 'public, max-age=0, must-revalidate',
+}
+
+STYLE_BLOCK = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+SCRIPT_BLOCK = re.compile(r'<script>(.*?)</script>', re.DOTALL)
+PSEUDO = re.compile(r'::?[a-zA-Z-]+(?:\([^)]*\))?')
+ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+SELECTOR_TOKEN = re.compile(r'([.#]?)(-?[_a-zA-Z][\w-]*)')
+VOID_TAGS = frozenset('area base br col embed hr img input link meta source track wbr'.split())
+
+
+def hashed_name(name, digest):
+    """'pool.png' -> 'pool.<hash>.png'"""
+    path = Path(name)
+    return f"{path.stem}.{digest[:HASH_LENGTH]}{path.suffix}"
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Critical CSS --------------------------------------------------------------
+
+class CriticalElements(HTMLParser):
+    """Tag names, classes and ids of the elements inside the critical roots and their ancestors"""
+
+    def __init__(self, roots=CRITICAL_ROOTS):
+        super().__init__()
+        self.roots = set(roots)
+        self.stack = []  # (tag, classes, id, is_root)
+        self.depth = 0  # Number of critical roots on the stack
+        self.tags, self.classes, self.ids = set(), set(), set()
+
+    def _add(self, tag, classes, element_id):
+        self.tags.add(tag)
+        self.classes.update(classes)
+        if element_id:
+            self.ids.add(element_id)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        element_id = attrs.get('id')
+        is_root = tag in self.roots or bool(self.roots.intersection(classes))
+        if is_root and not self.depth:
+            for ancestor in self.stack:
+                self._add(*ancestor[:3])
+        if is_root or self.depth:
+            self._add(tag, classes, element_id)
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, classes, element_id, is_root))
+            self.depth += is_root
+
+    def handle_endtag(self, tag):
+        while self.stack:
+            open_tag, _, _, is_root = self.stack.pop()
+            self.depth -= is_root
+            if open_tag == tag:
+                break
+
+    def needs(self, selector):
+        """True if every class, id and tag in selector occurs in the critical elements
+
+        Pseudo-classes and attribute tests are ignored, so this can only
+        keep too much, never too little.
+        """
+        selector = ATTRIBUTE.sub('', PSEUDO.sub('', selector))
+        for kind, name in SELECTOR_TOKEN.findall(selector):
+            found = {'.': self.classes, '#': self.ids}.get(kind, self.tags)
+            if (name if kind else name.lower()) not in found:
+                return False
+        return True
+
+
+def critical_css(css, elements):
+    """The rules of minified css that can apply above the fold, in their original order"""
+    out = []
+    for prelude, body in css_blocks(css):
+        if body is None:
+            out.append(prelude + ';')
+        elif prelude.startswith(('@media', '@supports')):
+            inner = critical_css(body, elements)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@') or any(elements.needs(s) for s in prelude.split(',')):
+            out.append(f'{prelude}{{{body}}}')
+    return ''.join(out)
+
+
+# Output --------------------------------------------------------------------
+
+class Dist:
+    """The output directory: writes files only when they change and remembers what it wrote"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.written = set()
+        self.report = []  # (name, source bytes, output bytes, gzip bytes, brotli bytes)
+
+    def write(self, name, data, source_bytes=None):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists() or path.read_bytes() != data:
+            write_atomic(path, data)
+        self.written.add(path)
+        compressed = self.precompress(path, data) if path.suffix in TEXT_SUFFIXES else (None, None)
+        self.report.append((name, source_bytes or len(data), len(data)) + compressed)
+
+    def precompress(self, path, data):
+        """Write .gz (and .br) siblings; returns their sizes"""
+        sizes = []
+        encoders = [('.gz', lambda d: gzip.compress(d, GZIP_LEVEL, mtime=0))]
+        if HAS_BROTLI:
+            encoders.append(('.br', lambda d: brotli.compress(d, quality=BROTLI_QUALITY)))
+        for suffix, encode in encoders:
+            sibling = path.with_name(path.name + suffix)
+            packed = encode(data)
+            if not sibling.exists() or sibling.read_bytes() != packed:
+                write_atomic(sibling, packed)
+            self.written.add(sibling)
+            sizes.append(len(packed))
+        return tuple(sizes) + (None,) * (2 - len(sizes))
+
+    def link(self, name, source):
+        """Place source at name (a hard link when possible; images are not recompressed)"""
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            try:
+                os.link(source, path)
+            except OSError:
+                shutil.copy2(source, path)
+        self.written.add(path)
+        return path.stat().st_size
+
+    def prune(self):
+        """Remove files an earlier build left behind; returns how many"""
+        removed = 0
+        for path in sorted(self.root.rglob('*'), reverse=True):
+            if path.is_file() and path not in self.written:
+                path.unlink()
+                removed += 1
+            elif path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+        return removed
+
+
+def place_images(dist, manifest):
+    """Hash-named copies of every manifest image; returns (manifest with new srcs, count, bytes)
+
+    Inline previews are dropped: the page already carries them.
+    """
+    count = total = 0
+    for option in manifest.get('options', {}).values():
+        for images in option.values():
+            for image in images:
+                image.pop('preview', None)
+                for entry in [image] + image.get('variants', []):
+                    source = Path(entry['src'])
+                    name = source.parent / hashed_name(source.name, file_sha256(source))
+                    total += dist.link(name, source)
+                    entry['src'] = name.as_posix()
+                    count += 1
+    return manifest, count, total
+
+
+def build(out=DIST_DIR):
+    dist = Dist(out)
+    html = SOURCE_FILE.read_text(encoding='utf-8')
+    style, script = STYLE_BLOCK.search(html), SCRIPT_BLOCK.search(html)
+
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest, image_count, image_bytes = place_images(dist, json.load(f))
+    manifest_data = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+    manifest_name = f"images/{hashed_name(MANIFEST_FILE.name, content_hash(manifest_data))}"
+    dist.write(manifest_name, manifest_data, MANIFEST_FILE.stat().st_size)
+
+    js_source = script.group(1)
+    js = minify_js(js_source.replace(f"'{MANIFEST_FILE.as_posix()}'", f"'{manifest_name}'")).strip().encode('utf-8')
+    js_name = f"{ASSETS_DIR}/{hashed_name('site.js', content_hash(js))}"
+    dist.write(js_name, js, len(js_source.encode('utf-8')))
+
+    css_source = style.group(1)
+    css = minify_css(css_source)
+    css_name = f"{ASSETS_DIR}/{hashed_name('site.css', content_hash(css.encode('utf-8')))}"
+    dist.write(css_name, css.encode('utf-8'), len(css_source.encode('utf-8')))
+
+    elements = CriticalElements()
+    elements.feed(html)
+    critical = critical_css(css, elements)
+    # The full stylesheet still holds the critical rules, so once it loads the cascade is the original one
+    head = (f'<style>{critical}</style>'
+            f'<link rel="preload" href="{css_name}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{css_name}"></noscript>')
+    page = html[:style.start()] + head + html[style.end():script.start()] \
+        + f'<script src="{js_name}" defer></script>' + html[script.end():]
+    dist.write('index.html', minify_html(page).encode('utf-8'), len(html.encode('utf-8')))
+
+    headers = ''.join(f"{pattern}\n  Cache-Control: {value}\n" for pattern, value in CACHE_HEADERS.items())
+    dist.write('_headers', headers.encode('utf-8'))
+    removed = dist.prune()
+    return dist, len(critical), image_count, image_bytes, removed
+
+
+def print_report(dist, critical_bytes, image_count, image_bytes, removed):
+    def kb(value):
+        return '-' if value is None else f"{value / 1024:.1f}"
+
+    print(f"\n  {'File':<42} {'Source KB':>10} {'Minified':>9} {'gzip':>7} {'brotli':>7}")
+    rows = [row for row in dist.report if not row[0].startswith('_')]
+    for name, source, output, gz, br in rows:
+        print(f"  {name:<42} {kb(source):>10} {kb(output):>9} {kb(gz):>7} {kb(br):>7}")
+    totals = [sum(row[i] or 0 for row in rows) for i in range(1, 5)]
+    print(f"  {'Total text':<42} {kb(totals[0]):>10} {kb(totals[1]):>9} {kb(totals[2]):>7} "
+          f"{kb(totals[3]) if HAS_BROTLI else '-':>7}")
+    print(f"\n[*] Inlined critical CSS: {critical_bytes / 1024:.1f} KB")
+    print(f"[*] Images: {image_count} hash-named ({image_bytes / 1024 / 1024:.1f} MB, unchanged bytes)")
+    if removed:
+        print(f"[-] Removed {removed} files from earlier builds")
+    if not HAS_BROTLI:
+        print("[!] Brotli not installed, .br files skipped. Install with: pip install brotli")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the minified, hash-named site in dist/')
+    parser.add_argument('--out', default=str(DIST_DIR), help='Output directory')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Asset Build")
+    print("=" * 70)
+    stats = build_page()
+    print(f"[*] index.html: {stats['rendered']} of {stats['fragments']} fragments re-rendered")
+    print_report(*build(args.out))
+    print(f"\n[+] Site written to {args.out}/")
+
+
+if __name__ == '__main__':
+    main()
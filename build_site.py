@@ -0,0 +1,376 @@
+"""
+Site Builder
+Renders index.html from the listing data instead of hand-edited markup. The
+comparison table rows and property cards are filled from templates/ with
+site_listings.json (the hand-written copy: names, photo captions, amenity
+tags, description) overlaid with the scraped numbers in
+vrbo_updated_data.json (price, rating, rooms, sleeps, size). Listings that
+only exist in the scraped data get a card from their scraped fields.
+
+Every row and card is a fragment fingerprinted by its templates, its
+listing's values and the listing's image manifest entry. Only fragments
+whose fingerprint changed are re-rendered, and index.html is written only
+when its content changes.
+
+The first image of each gallery is painted from the manifest's inline
+preview (image_manifest.py) behind the card, so the page shows a blurred
+version of the photo before any image request.
+
+Usage:
+    python build_site.py             # Rebuild what changed
+    python build_site.py --force     # Re-render every fragment
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import re
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+from image_convert import write_atomic
+from image_manifest import MANIFEST_FILE
+import listing_table
+from listing_table import TRAVELERS, normalize, parse_list, parse_number
+
+# Configuration
+SITE_FILE = Path('site_listings.json')
+DATA_FILE = Path('vrbo_updated_data.json')
+TEMPLATES_DIR = Path('templates')
+OUTPUT_FILE = Path('index.html')
+CACHE_FILE = Path('.site-cache') / 'fragments.json'
+CHECK_IN = date(2026, 6, 26)
+CHECK_OUT = date(2026, 6, 28)
+REGION_ID = 1341
+EXCELLENT_RATING = 8.6  # 0-10 scale; lower ratings get the "very good" badge
+SCRAPED_NUMBERS = ('price', 'rating', 'bedrooms', 'bathrooms', 'sleeps', 'sqft')
+DEFAULT_PHOTOS = [
+    {'type': 'pool', 'label': 'Pool', 'emoji': '🏊', 'caption': [],
+     'background': 'linear-gradient(135deg, #3498db 0%, #1abc9c 100%)'},
+    {'type': 'exterior', 'label': 'Exterior', 'emoji': '🏠', 'caption': [],
+     'background': 'linear-gradient(135deg, #e67e22 0%, #f39c12 100%)'},
+]
+# kind: (placeholder in page.html, separator, templates it is rendered from).
+# A change to any of those templates re-renders every fragment of the kind.
+FRAGMENTS = {
+    'row': ('rows', '\n', ('row.html',)),
+    'card': ('cards', '\n\n', ('card.html', 'photo.html', 'stat.html', 'amenity.html')),
+}
+MISSING = '—'
+
+PLACEHOLDER = re.compile(r'^([ \t]*)\{\{ (\w+) \}\}$|\{\{ (\w+) \}\}', re.MULTILINE)
+LINE_START = re.compile(r'(?<=\n)(?=.)')  # Start of every non-blank line after the first
+
+
+# Rendering -----------------------------------------------------------------
+
+class Indented(str):
+    """A block value whose lines are already indented for its placeholder"""
+
+
+def indent_block(text, indent):
+    return indent + LINE_START.sub(indent, text) if indent else text
+
+
+def block_indent(template, name):
+    """Indentation of the placeholder for name when it stands alone on its line"""
+    match = re.search(r'^([ \t]*)\{\{ %s \}\}$' % name, template, re.MULTILINE)
+    return match.group(1) if match else ''
+
+
+def render(template, values):
+    """Fill {{ name }} placeholders in one pass
+
+    A placeholder alone on its line takes a multi-line value, each line
+    indented like the placeholder (unless the value is Indented already).
+    """
+    def fill(match):
+        indent, block_name, inline_name = match.groups()
+        if inline_name:
+            return str(values[inline_name])
+        value = values[block_name]
+        return value if isinstance(value, Indented) else indent_block(str(value), indent)
+    return PLACEHOLDER.sub(fill, template)
+
+
+def load_templates(root=TEMPLATES_DIR):
+    return {path.name: path.read_text(encoding='utf-8') for path in sorted(Path(root).glob('*.html'))}
+
+
+def fingerprint(*parts):
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def esc(value, quote=False):
+    """Escape text for element content (quote=True inside an attribute value)"""
+    return html.escape(str(value), quote=quote)
+
+
+def known(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def money(value):
+    return f"${value:,.0f}" if known(value) else MISSING
+
+
+def count(value):
+    return f"{value:g}" if known(value) else MISSING
+
+
+def trip_dates(check_in=CHECK_IN, check_out=CHECK_OUT):
+    """'June 26-28, 2026' (month and year repeated only when they change)"""
+    if (check_in.year, check_in.month) == (check_out.year, check_out.month):
+        return f"{check_in:%B} {check_in.day}-{check_out.day}, {check_in.year}"
+    if check_in.year == check_out.year:
+        return f"{check_in:%B} {check_in.day} - {check_out:%B} {check_out.day}, {check_in.year}"
+    return f"{check_in:%B} {check_in.day}, {check_in.year} - {check_out:%B} {check_out.day}, {check_out.year}"
+
+
+# Listing values ------------------------------------------------------------
+
+def listing_entries(site, records):
+    """(listing_id, option, copy, record) for every listing in the copy or the data
+
+    In option order; listings without an option number are numbered after
+    the last one.
+    """
+    copies = site.get('listings', {})
+    entries = []
+    for listing_id in dict.fromkeys(list(copies) + list(records)):
+        copy, record = copies.get(listing_id), records.get(listing_id) or {}
+        entries.append([listing_id, (copy or record).get('option'), copy, record])
+    next_option = max((e[1] for e in entries if isinstance(e[1], int)), default=0) + 1
+    for entry in entries:
+        if not isinstance(entry[1], int):
+            entry[1], next_option = next_option, next_option + 1
+    return sorted(entries, key=lambda e: (e[1], e[0]))
+
+
+def scraped(record):
+    return bool(record) and 'error' not in record
+
+
+def listing_view(listing_id, option, copy, record, images=None):
+    """One listing's values: the site copy, with scraped numbers where the data has them
+
+    Without copy the names, description and amenity tags come from the
+    scraped record too. images is the listing's manifest entry.
+    """
+    view = dict(copy or {}, listing_id=listing_id, option=option)
+    view['previews'] = {image_type: gallery[0]['preview'] for image_type, gallery in (images or {}).items()
+                        if gallery and gallery[0].get('preview')}
+    if scraped(record):
+        values = normalize(record)
+        view.update({field: values[field] for field in SCRAPED_NUMBERS if known(values[field])})
+    if not copy:
+        amenities = [str(a) for a in parse_list(record.get('amenities'))]
+        lowered = ' '.join(amenities).lower()
+        view['name'] = view['headline'] = record.get('title') or record.get('name') or listing_id
+        view['description'] = record.get('description') or ''
+        view['amenities'] = [{'text': a, 'highlight': False} for a in amenities]
+        view['pool'] = 'pool' in lowered
+        view['hot_tub'] = 'hot tub' in lowered or 'spa' in lowered
+    view.setdefault('photos', DEFAULT_PHOTOS)
+    view.setdefault('beach', '')
+    return view
+
+
+def prices_as_of(site, entries):
+    """Oldest scraped price date when every shown price was scraped, else the copy's date"""
+    stamps = [(record.get('fetched') or {}).get('price')
+              if scraped(record) and known(parse_number(record.get('price'))) else None
+              for _, _, _, record in entries]
+    if stamps and all(stamps):
+        oldest = datetime.fromisoformat(min(stamps))
+        return f"{oldest:%b} {oldest.day}, {oldest.year}"
+    return site.get('prices_as_of', MISSING)
+
+
+# Fragments -----------------------------------------------------------------
+
+def vrbo_url(listing_id, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return f"https://www.vrbo.com/{listing_id}" + (f"?{query}" if query else '')
+
+
+def shared_values(travelers=TRAVELERS):
+    nights = (CHECK_OUT - CHECK_IN).days
+    return {'travelers': travelers, 'nights': nights, 'trip_dates': trip_dates()}
+
+
+def per_person(view, travelers):
+    price = view.get('price')
+    return price / max(1, travelers) if known(price) else None
+
+
+def icon(flag):
+    return '<span class="check-icon">✓</span>' if flag else '<span class="x-icon">✗</span>'
+
+
+def render_row(view, templates, shared):
+    rating = view.get('rating')
+    rating_class = 'excellent' if known(rating) and rating >= EXCELLENT_RATING else 'very-good'
+    rooms = f"{count(view.get('bedrooms'))} BR / {count(view.get('bathrooms'))} BA"
+    return render(templates['row.html'], {
+        'option': view['option'],
+        'name': esc(view['name']),
+        'sleeps': count(view.get('sleeps')),
+        'rooms': rooms,
+        'rating_class': rating_class,
+        'rating': f"{rating:.1f}" if known(rating) else MISSING,
+        'pool': icon(view.get('pool')),
+        'hot_tub': icon(view.get('hot_tub')),
+        'beach': esc(view['beach']),
+        'price': money(view.get('price')),
+        'per_person': money(per_person(view, shared['travelers'])),
+    })
+
+
+def card_stats(view):
+    """(emoji, text) for the stats row; the beach distance stands in for an unknown size"""
+    stats = []
+    if known(view.get('bedrooms')):
+        bedrooms = view['bedrooms']
+        stats.append(('🛏️', f"{bedrooms:g} Bedroom" + ('' if bedrooms == 1 else 's')))
+    if known(view.get('bathrooms')):
+        stats.append(('🚿', f"{view['bathrooms']:g} Baths"))
+    if known(view.get('sleeps')):
+        stats.append(('👥', f"Sleeps {view['sleeps']:g}"))
+    if known(view.get('sqft')):
+        stats.append(('📐', f"{view['sqft']:,.0f} sq ft"))
+    elif view['beach']:
+        stats.append(('🏖️', view['beach']))
+    return stats
+
+
+def photo_background(photo, previews):
+    """The photo's gradient, under its gallery's inline preview when there is one"""
+    preview = previews.get(photo['type'])
+    if not preview:
+        return photo['background']
+    return f'url({preview}) center / cover no-repeat, {photo["background"]}'
+
+
+def render_card(view, templates, shared):
+    listing_id = view['listing_id']
+    gallery_url = esc(vrbo_url(listing_id, pwaThumbnailDialog='thumbnail-gallery'), quote=True)
+    photos = [render(templates['photo.html'], {
+        'option': view['option'],
+        'type': esc(photo['type'], quote=True),
+        'classes': 'photo-container has-preview' if photo['type'] in view['previews'] else 'photo-container',
+        'background': esc(photo_background(photo, view['previews']), quote=True),
+        'emoji': photo['emoji'],
+        'caption': '<br>'.join(esc(line) for line in photo['caption']),
+        'gallery_url': gallery_url,
+        'label': esc(photo['label']),
+    }) for photo in view['photos']]
+    stats = [render(templates['stat.html'], {'emoji': emoji, 'text': esc(text)}) for emoji, text in card_stats(view)]
+    amenities = [render(templates['amenity.html'], {
+        'classes': ' '.join(['amenity-tag'] + [tone for tone in ('highlight', 'warning') if amenity.get(tone)]),
+        'text': esc(amenity['text']),
+    }) for amenity in view.get('amenities', [])]
+    book_url = vrbo_url(listing_id, regionId=REGION_ID, chkin=CHECK_IN, chkout=CHECK_OUT,
+                        useRewards='false', adults=shared['travelers'])
+    return render(templates['card.html'], {
+        'option': view['option'],
+        'headline': esc(view['headline']),
+        'photos': ''.join(photos).rstrip('\n'),
+        'gallery_url': gallery_url,
+        'stats': ''.join(stats).rstrip('\n'),
+        'amenities': ''.join(amenities).rstrip('\n'),
+        'description': esc(view.get('description', '')),
+        'price': money(view.get('price')),
+        'nights': shared['nights'],
+        'per_person': money(per_person(view, shared['travelers'])),
+        'book_url': esc(book_url, quote=True),
+    })
+
+
+RENDERERS = {'row': render_row, 'card': render_card}
+
+
+# Build ---------------------------------------------------------------------
+
+def load_json(path, default):
+    path = Path(path)
+    if not path.exists():
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build(output=OUTPUT_FILE, force=False, travelers=TRAVELERS):
+    """Render the page, re-rendering only changed fragments; returns a stats dict"""
+    started = time.perf_counter()
+    site = load_json(SITE_FILE, {})
+    records = load_json(DATA_FILE, {})
+    manifest = load_json(MANIFEST_FILE, {}).get('options', {})
+    templates = load_templates()
+    cache = {} if force else load_json(CACHE_FILE, {})
+    cached = cache.get('fragments', {})
+
+    shared = shared_values(travelers)
+    entries = listing_entries(site, records)
+    # Fragments are cached indented for their place in the page, so the page
+    # is assembled by joining them. This file renders them and listing_table
+    # parses their numbers, so a change to either re-renders them all.
+    code = ''.join(Path(path).read_text(encoding='utf-8') for path in (__file__, listing_table.__file__))
+    indents = {kind: block_indent(templates['page.html'], slot) for kind, (slot, _, _) in FRAGMENTS.items()}
+    template_prints = {kind: fingerprint(code, indents[kind], *(templates[name] for name in names))
+                       for kind, (_, _, names) in FRAGMENTS.items()}
+
+    fragments = {}
+    rendered = 0
+    for listing_id, option, copy, record in entries:
+        # Fingerprint the raw inputs, so an unchanged listing is not even normalized
+        inputs = fingerprint(listing_id, option, copy, record, manifest.get(str(option)), shared)
+        view = None
+        for kind, renderer in RENDERERS.items():
+            key = f"{kind}:{listing_id}"
+            digest = hashlib.sha256((template_prints[kind] + inputs).encode('ascii')).hexdigest()
+            if cached.get(key, {}).get('fingerprint') != digest:
+                view = view or listing_view(listing_id, option, copy, record, manifest.get(str(option)))
+                markup = renderer(view, templates, shared).rstrip('\n')
+                cached[key] = {'fingerprint': digest, 'html': indent_block(markup, indents[kind])}
+                rendered += 1
+            fragments[key] = cached[key]
+
+    page_values = dict(shared, count=len(entries), prices_as_of=esc(prices_as_of(site, entries)))
+    page_print = fingerprint(templates['page.html'], page_values,
+                             [fragment['fingerprint'] for fragment in fragments.values()])
+    output = Path(output)
+    written = False
+    if page_print != cache.get('page') or not output.exists():
+        blocks = {slot: Indented(separator.join(fragments[f"{kind}:{e[0]}"]['html'] for e in entries))
+                  for kind, (slot, separator, _) in FRAGMENTS.items()}
+        page = render(templates['page.html'], dict(page_values, **blocks)).encode('utf-8')
+        if not output.exists() or output.read_bytes() != page:
+            write_atomic(output, page)
+            written = True
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(CACHE_FILE, json.dumps({'page': page_print, 'fragments': fragments},
+                                            ensure_ascii=False).encode('utf-8'))
+    return {'listings': len(entries), 'fragments': len(fragments), 'rendered': rendered,
+            'written': written, 'seconds': time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render index.html from the listing data')
+    parser.add_argument('--force', action='store_true', help='Re-render every fragment')
+    parser.add_argument('--output', default=str(OUTPUT_FILE))
+    parser.add_argument('--travelers', type=int, default=TRAVELERS)
+    args = parser.parse_args()
+
+    stats = build(args.output, force=args.force, travelers=args.travelers)
+    print(f"[*] {stats['listings']} listings: {stats['rendered']} of {stats['fragments']} fragments re-rendered")
+    status = f"[+] Wrote {args.output}" if stats['written'] else f"[=] {args.output} unchanged"
+    print(f"{status} ({stats['seconds'] * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
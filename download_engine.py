@@ -0,0 +1,146 @@
+"""
+Download Engine
+Runs image downloads on a bounded worker pool that shares one keep-alive
+HTTP session. Each host gets a concurrency cap and a request-rate cap so the
+traffic we send stays at today's pace while the waiting overlaps.
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configuration
+MAX_WORKERS = 4  # Download threads shared by all hosts
+PER_HOST_CONCURRENCY = 2  # Simultaneous requests to a single host
+PER_HOST_RATE = 1.0  # Request starts per second to a single host
+RATE_JITTER = 0.5  # Randomize each gap by +/- this fraction
+
+
+class StageStats:
+    """Thread-safe item/byte/time counters for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.failures = 0
+        self.bytes = 0
+        self.busy = 0.0  # Summed per-item work time
+        self._first = None
+        self._last = None
+        self._lock = threading.Lock()
+
+    def record(self, started, finished, nbytes=0, ok=True, busy=None):
+        """Record one item that ran from started to finished (monotonic)"""
+        with self._lock:
+            if ok:
+                self.items += 1
+                self.bytes += nbytes
+            else:
+                self.failures += 1
+            self.busy += busy if busy is not None else finished - started
+            self._first = started if self._first is None else min(self._first, started)
+            self._last = finished if self._last is None else max(self._last, finished)
+
+    @property
+    def wall(self):
+        """Seconds between the first item starting and the last finishing"""
+        if self._first is None:
+            return 0.0
+        return self._last - self._first
+
+    def summary(self):
+        wall = self.wall
+        line = f"{self.name}: {self.items} ok, {self.failures} failed in {wall:.1f}s"
+        if wall > 0:
+            line += f" ({self.items / wall:.2f} items/s"
+            if self.bytes:
+                line += f", {self.bytes / wall / 1e6:.2f} MB/s"
+            line += f", {self.busy:.1f}s busy)"
+        return line
+
+
+class HostRateLimiter:
+    """Spaces request starts to each host roughly 1/rate seconds apart"""
+
+    def __init__(self, rate=PER_HOST_RATE, jitter=RATE_JITTER):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host):
+        """Claim the next start slot for host; return seconds until it (no sleeping)
+
+        For callers that wait their own way, e.g. with asyncio.sleep.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            gap = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._next_slot[host] = start + gap
+        return start - now
+
+    def acquire(self, host):
+        """Block until the next request to host may start; return the wait"""
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class DownloadEngine:
+    """Thread pool + pooled session with per-host concurrency and rate caps
+
+    Usage:
+        with DownloadEngine() as engine:
+            future = engine.submit(download_image, url, filepath)
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, per_host_concurrency=PER_HOST_CONCURRENCY,
+                 per_host_rate=PER_HOST_RATE, headers=None):
+        self.per_host_concurrency = per_host_concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.limiter = HostRateLimiter(per_host_rate)
+        self.stats = StageStats('download')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_concurrency))
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, host):
+        with self._slots_lock:
+            return self._host_slots[host]
+
+    def _run(self, fn, url, args, kwargs):
+        host = urlparse(url).netloc
+        with self._slot(host):
+            self.limiter.acquire(host)
+            started = time.monotonic()
+            result = fn(url, *args, session=self.session, **kwargs)
+            nbytes = result.get('bytes', 0) if isinstance(result, dict) else 0
+            self.stats.record(started, time.monotonic(), nbytes, ok=bool(result))
+            return result
+
+    def submit(self, fn, url, *args, **kwargs):
+        """Schedule fn(url, *args, session=..., **kwargs) and return a Future"""
+        return self._executor.submit(self._run, fn, url, args, kwargs)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
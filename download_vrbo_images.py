@@ -2,27 +2,37 @@
 VRBO Image Download Script
 Downloads images from each VRBO listing and organizes them into the correct folders.
 Categorizes images as pool or exterior based on filename patterns and content.
+
+Usage:
+    python download_vrbo_images.py
+    python download_vrbo_images.py --resume    # Continue the last run after a crash or Ctrl+C
 """
 
-from playwright.sync_api import sync_playwright
+from scrape_engine import ScrapeEngine
+from download_engine import DownloadEngine
+from image_convert import ConversionStage, PARTIAL_SUFFIX, convert_image, detect_extension, file_sha256
+from image_dedupe import select_best
+from image_classifier import classify
+from image_store import ImageStore
+from listing_db import ListingDB
+from run_journal import RunJournal
+from network_capture import NetworkCapture
+from http_cache import ValidatorCache
+from image_derivatives import build_derivatives
+from image_manifest import write_manifest
+from page_readiness import PolitenessScheduler, async_wait_for_dom_quiet, async_wait_until_ready
+import argparse
+import asyncio
+from concurrent.futures import Future
 import requests
+import hashlib
 import json
 import os
-import random
-import time
+import tempfile
 from pathlib import Path
 from urllib.parse import urlparse
 import re
 
-try:
-    from PIL import Image
-    import io
-    HAS_PIL = True
-except ImportError:
-    HAS_PIL = False
-    print("[!] Warning: PIL/Pillow not installed. Install with: pip install Pillow")
-    print("[!] Images will be saved in original format (may not be PNG)")
-
 # VRBO listing IDs mapped to option numbers
 listings = [
     ('4146676', 'Spacious Beach House', 1),
@@ -37,111 +47,265 @@ listings = [
 
 # Configuration
 HEADLESS = False  # Set to True for headless mode
-MIN_DELAY = 1  # Minimum delay between downloads (seconds)
-MAX_DELAY = 3  # Maximum delay between downloads (seconds)
+CONTEXTS = 3  # Listings loaded at once; the request rate is set by PAGES_PER_MINUTE (page_readiness.py)
 IMAGES_DIR = Path('images')
 DOWNLOAD_TIMEOUT = 30  # Seconds
+REVALIDATE = True  # Send conditional requests for stored images instead of trusting the store
+OUTPUT_FORMAT = 'webp'  # 'png', 'passthrough' (keep CDN bytes), 'webp' or 'jpeg'
+OUTPUT_QUALITY = 80  # Starting quality for webp/jpeg
+OUTPUT_MAX_BYTES = 350 * 1024  # Per-image byte budget for webp/jpeg (None = no budget)
+DEDUPE = True  # Drop near-duplicate shots, keeping the sharpest / highest-resolution one
+MAX_CANDIDATES = 25  # Images fetched per listing before classification
+MAX_POOL_IMAGES = 10
+MAX_EXTERIOR_IMAGES = 15
+KEYWORD_WEIGHT = 1.0  # Classifier score added for a pool keyword (subtracted for exterior)
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'webp', 'gif', 'avif')  # Extensions the site looks for
+CHUNK_SIZE = 64 * 1024  # Bytes read from the socket per iteration
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.vrbo.com/',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+def output_options():
+    """convert_image keyword arguments for the configured output format"""
+    return {'output_format': OUTPUT_FORMAT, 'quality': OUTPUT_QUALITY, 'max_bytes': OUTPUT_MAX_BYTES}
+
+
+def output_variant():
+    """Store variant for the configured output (None for the original PNG output)"""
+    if OUTPUT_FORMAT == 'png':
+        return None
+    if OUTPUT_FORMAT == 'passthrough':
+        return OUTPUT_FORMAT
+    return f'{OUTPUT_FORMAT}-q{OUTPUT_QUALITY}-{OUTPUT_MAX_BYTES}'
+
+
+def existing_images(option_dir, base):
+    """Files in option_dir named base.<any image extension>"""
+    return [option_dir / f'{base}.{ext}' for ext in IMAGE_EXTENSIONS
+            if (option_dir / f'{base}.{ext}').exists()]
+
+
+def place_image(store, sha256, option_dir, base):
+    """Link a stored image into option_dir as base.<ext>
+
+    Copies of the same slot under other extensions (e.g. an old pool.png
+    after switching to webp) are removed so the site cannot pick a stale
+    one. Returns (filename, changed).
+    """
+    ext = detect_extension(store.blob_path(sha256))
+    filepath = option_dir / f'{base}.{ext}'
+    for stale in existing_images(option_dir, base):
+        if stale != filepath:
+            stale.unlink()
+    return filepath.name, store.link(sha256, filepath)
+
+
+def clear_slot(store, option_dir, base):
+    """Remove store-managed files for slot base (hand-placed files are kept)"""
+    for path in existing_images(option_dir, base):
+        if store.blob_path(file_sha256(path)).exists():
+            path.unlink()
+
+
+def hand_placed(store, option_dir, base):
+    """True if slot base holds a file the store does not manage"""
+    return any(not store.blob_path(file_sha256(path)).exists()
+               for path in existing_images(option_dir, base))
+
 
+def slot_bases(store, option_dir, category, count):
+    """The first count slot names for category, skipping hand-placed slots"""
+    bases = []
+    number = 1
+    while len(bases) < count:
+        base = f'{category}{number}' if number > 1 else category
+        if not hand_placed(store, option_dir, base):
+            bases.append(base)
+        number += 1
+    return bases
 
-def jitter_delay(min_seconds=MIN_DELAY, max_seconds=MAX_DELAY):
-    """Add random jitter delay to mimic human behavior"""
-    delay = random.uniform(min_seconds, max_seconds)
-    time.sleep(delay)
-    return delay
+
+def clear_stale_slots(store, option_dir, category, keep):
+    """Remove store-managed category slots not in keep (left from a larger run)"""
+    pattern = re.compile(rf'^{category}\d*$')
+    for base in sorted({p.stem for p in option_dir.glob(f'{category}*.*')}):
+        if pattern.match(base) and base not in keep:
+            clear_slot(store, option_dir, base)
+
+
+KEYWORD_PATTERN = re.compile(
+    r'(?P<pool>pool|swimming|spa|hot tub|jacuzzi|dive|swim)'
+    r'|(?P<exterior>exterior|outside|front|back|yard|patio|deck|beach|ocean|view)'
+)
 
 
 def is_pool_image(url, alt_text=''):
-    """Determine if an image is likely a pool image based on URL and alt text"""
-    url_lower = url.lower()
-    alt_lower = alt_text.lower()
-    
-    pool_keywords = ['pool', 'swimming', 'spa', 'hot tub', 'jacuzzi', 'dive', 'swim']
-    exterior_keywords = ['exterior', 'outside', 'front', 'back', 'yard', 'patio', 'deck', 'beach', 'ocean', 'view']
-    
-    # Check URL
-    for keyword in pool_keywords:
-        if keyword in url_lower:
-            return True
-    
-    # Check alt text
-    for keyword in pool_keywords:
-        if keyword in alt_lower:
-            return True
-    
-    # If it has exterior keywords but not pool keywords, it's likely exterior
-    for keyword in exterior_keywords:
-        if keyword in url_lower or keyword in alt_lower:
-            return False
-    
-    return None  # Unknown
+    """Determine if an image is likely a pool image based on URL and alt text
+
+    Returns True (pool keyword), False (only exterior keywords) or None.
+    """
+    exterior = False
+    for text in (url.lower(), alt_text.lower()):
+        for match in KEYWORD_PATTERN.finditer(text):
+            if match.lastgroup == 'pool':
+                return True
+            exterior = True
+    return False if exterior else None
 
 
-def download_image(url, filepath, headers=None):
-    """Download an image from URL to filepath and convert to PNG"""
+def stream_to_temp(response, directory):
+    """Stream a response body into a hidden temp file, hashing it on the way.
+
+    Returns (temp_path, sha256_hex, byte_count). Only one chunk is held in
+    memory at a time, so peak usage does not grow with the image size.
+    """
+    digest = hashlib.sha256()
+    byte_count = 0
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix='.', suffix=PARTIAL_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                byte_count += len(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+    return Path(temp_name), digest.hexdigest(), byte_count
+
+
+def remove_partial_downloads(directory):
+    """Delete temp files left behind by an interrupted download"""
+    removed = 0
+    if directory.exists():
+        for stale in directory.glob(f'.*{PARTIAL_SUFFIX}'):
+            stale.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def download_image(url, filepath, headers=None, session=None, converter=None,
+                   cache=None, revalidate=False):
+    """Download an image from URL to filepath and convert it to OUTPUT_FORMAT
+
+    The body is streamed to a temp file next to filepath and only renamed
+    into place once complete, so filepath either does not exist or holds a
+    finished image. Returns a dict with the sha256 and byte count of the
+    downloaded body, or None on failure. Pass a requests.Session to reuse
+    its keep-alive connections.
+
+    The result dict carries a Future for convert_image's result under
+    'conversion'. With a ConversionStage as converter the temp file is
+    handed over for conversion in a worker process; otherwise conversion
+    happens inline and the Future is already done.
+
+    With a ValidatorCache as cache the response's ETag/Last-Modified are
+    remembered; with revalidate=True they are also sent as a conditional
+    request, and a 304 returns {'not_modified': True} without a body.
+    """
+    temp_path = None
     try:
         if headers is None:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Referer': 'https://www.vrbo.com/',
-                'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-            }
-        
-        response = requests.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT, stream=True)
-        response.raise_for_status()
+            headers = DOWNLOAD_HEADERS
+        conditional = {}
+        if cache is not None and revalidate:
+            conditional = cache.conditional_headers(url)
+            if conditional:
+                headers = {**headers, **conditional}
+        http = session if session is not None else requests
         
         # Ensure directory exists
         filepath.parent.mkdir(parents=True, exist_ok=True)
         
-        # Download image data
-        image_data = response.content
+        with http.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            if cache is not None:
+                cache.record(url, response, conditional=bool(conditional))
+            if response.status_code == 304:
+                return {'not_modified': True, 'bytes': 0}
+            temp_path, sha256, byte_count = stream_to_temp(response, filepath.parent)
         
-        # Convert to PNG using PIL/Pillow
-        if HAS_PIL:
-            try:
-                # Open image from bytes
-                img = Image.open(io.BytesIO(image_data))
-                
-                # Convert RGBA to RGB if necessary (for JPEG compatibility)
-                if img.mode == 'RGBA':
-                    # Create white background
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    rgb_img.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-                    img = rgb_img
-                elif img.mode not in ('RGB', 'L'):
-                    img = img.convert('RGB')
-                
-                # Save as PNG
-                img.save(filepath, 'PNG')
-                return True
-            except Exception as e:
-                # Fallback: save original format
-                print(f"      [!] PNG conversion failed, saving original: {e}")
-                with open(filepath, 'wb') as f:
-                    f.write(image_data)
-                return True
-        else:
-            # If PIL not available, save as-is but with .png extension
-            # This might not work perfectly, but better than nothing
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
-            return True
+        info = {'sha256': sha256, 'bytes': byte_count}
+        info['conversion'] = convert_download(temp_path, filepath, converter)
+        temp_path = None  # Now owned by the conversion
+        return info
         
     except Exception as e:
         print(f"      [!] Download failed: {e}")
-        return False
+        return None
+    finally:
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
+
+
+def convert_download(temp_path, filepath, converter=None):
+    """Future for converting the finished body at temp_path into filepath
 
+    With a ConversionStage the work happens in a worker process (submit
+    blocks while its queue is full); otherwise it runs inline. Either way
+    temp_path is consumed.
+    """
+    if converter is not None:
+        return converter.submit(temp_path, filepath)
+    future = Future()
+    future.set_result(convert_image(temp_path, filepath, **output_options()))
+    return future
 
-def extract_image_urls(page):
+
+def captured_image(captured, filepath, converter=None):
+    """download_image's result for a body the browser already received"""
+    future = Future()
+    future.set_result({'sha256': captured['sha256'], 'bytes': captured['bytes'],
+                       'conversion': convert_download(captured['path'], filepath, converter)})
+    return future
+
+
+def dedupe_images(images_data):
+    """Drop repeated URLs, keeping the first occurrence (and any alt text)"""
+    unique = {}
+    for img_data in images_data:
+        url = img_data['url']
+        if url not in unique:
+            unique[url] = dict(img_data)
+        elif not unique[url].get('alt') and img_data.get('alt'):
+            unique[url]['alt'] = img_data['alt']
+    return list(unique.values())
+
+
+def skip_thumbnail_duplicates(images_data, capture):
+    """images_data without the near-duplicates visible in renditions the page already loaded
+
+    Only images whose thumbnail (or a larger rendition) the browser
+    received can be compared before downloading; the rest are downloaded
+    and compared at full size afterwards. Returns (images_data, skipped).
+    """
+    staged = [(i, capture.peek(img_data['url'])) for i, img_data in enumerate(images_data)]
+    staged = [(i, image['path']) for i, image in staged if image]
+    if len(staged) < 2:
+        return images_data, 0
+    keep, _ = select_best([path for _, path in staged])
+    skip = {i for (i, _), kept in zip(staged, keep) if not kept}
+    return [img_data for i, img_data in enumerate(images_data) if i not in skip], len(skip)
+
+
+async def extract_image_urls(page, log=print):
     """Extract all image URLs from the VRBO page"""
     image_urls = []
     
     try:
-        # Wait for images to load (skip networkidle as VRBO has continuous activity)
-        jitter_delay(2, 3)  # Give time for lazy-loaded images
+        # Lazy-loaded images are in the DOM once it stops changing
+        await async_wait_for_dom_quiet(page)
         
         # Get all image elements with their URLs and alt text
-        images_data = page.evaluate("""
+        images_data = await page.evaluate("""
             () => {
                 const images = [];
                 const imgElements = document.querySelectorAll('img');
@@ -187,12 +351,12 @@ def extract_image_urls(page):
             
             for selector in gallery_selectors:
                 try:
-                    main_img = page.query_selector(selector)
+                    main_img = await page.query_selector(selector)
                     if main_img:
-                        main_img.click()
-                        jitter_delay(1, 2)
+                        await main_img.click()
+                        await async_wait_for_dom_quiet(page)
                         # Extract more images from gallery
-                        gallery_images = page.evaluate("""
+                        gallery_images = await page.evaluate("""
                             () => {
                                 const images = [];
                                 const imgElements = document.querySelectorAll('img');
@@ -212,8 +376,8 @@ def extract_image_urls(page):
                         """)
                         images_data.extend(gallery_images)
                         # Close gallery
-                        page.keyboard.press('Escape')
-                        jitter_delay(0.5, 1)
+                        await page.keyboard.press('Escape')
+                        await async_wait_for_dom_quiet(page, 200, 1000)
                         break
                 except:
                     continue
@@ -221,205 +385,302 @@ def extract_image_urls(page):
         except:
             pass
         
-        image_urls = images_data
+        # The gallery pass re-finds everything already in the DOM
+        image_urls = dedupe_images(images_data)
         
     except Exception as e:
-        print(f"      [!] Error extracting images: {e}")
+        log(f"      [!] Error extracting images: {e}")
     
     return image_urls
 
 
-def organize_images(image_urls, option_dir, listing_name):
-    """Download and organize images into pool and exterior folders"""
-    pool_images = []
-    exterior_images = []
-    other_images = []
-    
-    # Categorize images
-    for img_data in image_urls:
-        url = img_data['url']
-        alt = img_data.get('alt', '')
-        
-        category = is_pool_image(url, alt)
-        if category is True:
-            pool_images.append(img_data)
-        elif category is False:
-            exterior_images.append(img_data)
-        else:
-            other_images.append(img_data)
-    
-    # If we couldn't categorize, split evenly (or use heuristics)
-    if not pool_images and not exterior_images and other_images:
-        # Try to categorize based on image order/position
-        # Usually first images are exterior, middle are interior, pool might be later
-        # For now, assign first half to exterior, rest to pool
-        mid = len(other_images) // 2
-        exterior_images = other_images[:mid]
-        pool_images = other_images[mid:]
-        other_images = []
+def organize_images(image_urls, option_dir, listing_name, engine=None, converter=None, store=None,
+                    cache=None, capture=None):
+    """Download and organize images into pool and exterior folders
+
+    Downloads run concurrently on engine (a DownloadEngine); one is created
+    for this call if none is given. With a ConversionStage as converter,
+    image conversion overlaps with the downloads in worker processes.
+    Finished images go into the ImageStore and are hardlinked into
+    option_dir; URLs the store already holds are linked without a fetch,
+    or - with a ValidatorCache as cache and REVALIDATE on - after a
+    conditional request confirms the CDN copy has not changed.
+    With DEDUPE on, near-duplicate shots are left out of the gallery and
+    only the best one of each group is linked. Duplicates among the
+    thumbnails the page loaded (capture) are skipped before any download;
+    others are only found once downloaded, so their bytes are still fetched.
+
+    Pool or exterior is decided once every image is in the store: the
+    classifier scores the whole batch from its pixels, plus URL/alt
+    keywords, and the most pool-like images take the pool slots. Slots
+    holding hand-placed files are left alone.
+
+    With a NetworkCapture as capture, images the browser already received
+    at full size are converted from those bodies instead of downloaded.
+    """
+    if store is None:
+        store = ImageStore()
+    candidates = dedupe_images(image_urls)
+    if DEDUPE and capture is not None:
+        candidates, skipped = skip_thumbnail_duplicates(candidates, capture)
+        if skipped:
+            print(f"      [-] {skipped} near-duplicate shot(s) skipped before download (page thumbnails)")
+    candidates = candidates[:MAX_CANDIDATES]
     
     downloaded = {'pool': 0, 'exterior': 0, 'other': 0}
     
-    # Download pool images
-    print(f"      [*] Downloading pool images...")
-    for i, img_data in enumerate(pool_images[:10], 1):  # Limit to 10 pool images
-        url = img_data['url']
-        filename = f'pool{i}.png' if i > 1 else f'pool.png'
-        filepath = option_dir / filename
-        
-        if not filepath.exists():  # Skip if already exists
-            if download_image(url, filepath):
-                downloaded['pool'] += 1
-                print(f"        [+] {filename}")
-            jitter_delay(0.5, 1.5)
-        else:
-            print(f"        [>] {filename} (already exists)")
+    own_engine = engine is None
+    if own_engine:
+        engine = DownloadEngine()
     
-    # Download exterior images
-    print(f"      [*] Downloading exterior images...")
-    for i, img_data in enumerate(exterior_images[:10], 1):  # Limit to 10 exterior images
-        url = img_data['url']
-        filename = f'exterior{i}.png' if i > 1 else f'exterior.png'
-        filepath = option_dir / filename
+    try:
+        print(f"      [*] Placing {len(candidates)} images...")
+        variant = output_variant()
+        ready = []  # (img_data, sha256, status) once each image is in the store
+        futures = []
+        from_browser = 0
+        for img_data in candidates:
+            url = img_data['url']
+            sha256 = store.lookup(url, variant)
+            revalidate = (bool(sha256) and REVALIDATE and cache is not None
+                          and cache.has_validators(url) and not cache.validated(url))
+            if sha256 and not revalidate:  # Fetched before (this run or an earlier one)
+                ready.append((img_data, sha256, 'from store'))
+                continue
+            staging = store.staging_path()
+            captured = capture.take(url) if capture is not None and not revalidate else None
+            if captured:  # The bytes already crossed the network once, in the browser
+                futures.append((img_data, captured_image(captured, staging, converter)))
+                from_browser += 1
+                continue
+            future = engine.submit(download_image, url, staging, converter=converter,
+                                   cache=cache, revalidate=revalidate)
+            futures.append((img_data, future))
+        if from_browser:
+            print(f"      [=] {from_browser} image(s) taken from the browser's own responses")
         
-        if not filepath.exists():  # Skip if already exists
-            if download_image(url, filepath):
-                downloaded['exterior'] += 1
-                print(f"        [+] {filename}")
-            jitter_delay(0.5, 1.5)
-        else:
-            print(f"        [>] {filename} (already exists)")
-    
-    # Download other images (uncategorized) as exterior
-    if other_images:
-        print(f"      [*] Downloading additional images...")
-        for i, img_data in enumerate(other_images[:5], 1):  # Limit to 5 additional
+        for img_data, future in futures:
             url = img_data['url']
-            filename = f'exterior{len(exterior_images) + i}.png'
-            filepath = option_dir / filename
-            
-            if not filepath.exists():
-                if download_image(url, filepath):
-                    downloaded['exterior'] += 1
+            info = future.result()
+            if not info:
+                continue
+            if info.get('not_modified'):
+                ready.append((img_data, store.lookup(url, variant), 'not modified'))
+                continue
+            try:
+                conversion = info['conversion'].result()
+            except Exception as e:
+                print(f"        [!] {url}: conversion failed: {e}")
+                continue
+            if conversion['error']:
+                print(f"        [!] {url}: {conversion['error']}")
+            store.add(conversion['path'], conversion['sha256'], url, variant)
+            ready.append((img_data, conversion['sha256'], None))
+        
+        # Keep only the best shot of each group of near-duplicates
+        if DEDUPE and ready:
+            keep, _ = select_best([store.blob_path(sha256) for _, sha256, _ in ready])
+            dropped = len(ready) - sum(keep)
+            ready = [item for item, kept in zip(ready, keep) if kept]
+            if dropped:
+                print(f"        [-] {dropped} near-duplicate shot(s) left out")
+        
+        # Score the batch and split it in one pass
+        keywords = []
+        for img_data, _, _ in ready:
+            category = is_pool_image(img_data['url'], img_data.get('alt', ''))
+            keywords.append(0 if category is None else (1 if category else -1))
+        scores = classify([store.blob_path(sha256) for _, sha256, _ in ready], keywords, KEYWORD_WEIGHT)
+        pool_like = {i for i, score in enumerate(scores) if score > 0}
+        if not pool_like and scores:
+            pool_like = {max(range(len(scores)), key=scores.__getitem__)}  # Every card needs a pool photo
+        # Pool shots past MAX_POOL_IMAGES are dropped, not filed as exterior shots
+        exterior = [i for i in range(len(ready)) if i not in pool_like][:MAX_EXTERIOR_IMAGES]
+        pool = sorted(pool_like, key=lambda i: -scores[i])[:MAX_POOL_IMAGES]  # Clearest pool shot first
+        
+        for category, indexes in (('pool', pool), ('exterior', exterior)):
+            bases = slot_bases(store, option_dir, category, len(indexes))
+            for index, base in zip(indexes, bases):
+                _, sha256, status = ready[index]
+                filename, changed = place_image(store, sha256, option_dir, base)
+                if status is None:
                     print(f"        [+] {filename}")
-                jitter_delay(0.5, 1.5)
+                    downloaded[category] += 1
+                elif changed or status == 'not modified':
+                    print(f"        [=] {filename} ({status})")
+                else:
+                    print(f"        [>] {filename} (already exists)")
+            clear_stale_slots(store, option_dir, category, bases)
+    finally:
+        if own_engine:
+            engine.close()
+        store.save()
+        if cache is not None:
+            cache.save()
     
     return downloaded
 
 
+async def process_listing(worker, position, total, listing, pipeline):
+    """Collect one listing's image URLs on worker's page, then organize them
+
+    pipeline holds the shared engine, converter, store, cache and the lock
+    that lets one listing organize (and print) at a time.
+    """
+    listing_id, name, option_num = listing
+    log = worker.log
+    log(f"\n[{position}/{total}] Processing: {name} (ID: {listing_id})")
+    log("-" * 70)
+    
+    url = f'https://www.vrbo.com/{listing_id}'
+    option_dir = IMAGES_DIR / f'option-{option_num}'
+    page = worker.page
+    
+    try:
+        # Navigate once the scheduler allows another request to the site
+        log(f"  [*] Navigating to {url}...")
+        await worker.goto(url, wait_until='domcontentloaded', timeout=30000)
+        if worker.last_wait:
+            log(f"  [*] Paced {worker.last_wait:.1f}s since the previous page")
+        
+        # Ready when listing content is in the DOM and it stops growing
+        elapsed, how = await async_wait_until_ready(page)
+        log(f"  [*] Page ready after {elapsed:.1f}s ({how})")
+        
+        # Extract image URLs
+        log("  [*] Extracting image URLs...")
+        image_urls = await extract_image_urls(page, log)
+        log(f"  [+] Found {len(image_urls)} images")
+        
+        if not image_urls:
+            log("  [!] No images found, trying alternative method...")
+            # Try scrolling to trigger lazy loading
+            for _ in range(3):
+                await page.evaluate("window.scrollBy(0, 500)")
+                await async_wait_for_dom_quiet(page)
+            image_urls = await extract_image_urls(page, log)
+            log(f"  [+] Found {len(image_urls)} images after scrolling")
+        pipeline['seen'][listing_id] = [img['url'] for img in image_urls]
+        await worker.capture.async_settle()  # Bodies of the images the page itself loaded
+        
+        # Download and organize images; other contexts keep loading pages meanwhile
+        if image_urls:
+            async with pipeline['lock']:
+                worker.flush()
+                stale = remove_partial_downloads(option_dir)
+                if stale:
+                    print(f"  [*] Removed {stale} partial download(s) from a previous run")
+                downloaded = await asyncio.to_thread(
+                    organize_images, image_urls, option_dir, name, pipeline['engine'],
+                    pipeline['converter'], pipeline['store'], pipeline['cache'], worker.capture)
+            log(f"  [+] Downloaded: {downloaded['pool']} pool, {downloaded['exterior']} exterior")
+            return {
+                'option': option_num,
+                'name': name,
+                'total_images': len(image_urls),
+                'downloaded': downloaded
+            }
+        log("  [!] No images to download")
+        return {
+            'option': option_num,
+            'name': name,
+            'total_images': 0,
+            'downloaded': {'pool': 0, 'exterior': 0, 'other': 0}
+        }
+        
+    except Exception as e:
+        log(f"  [!] Error processing {name}: {e}")
+        return {
+            'option': option_num,
+            'name': name,
+            'error': str(e)
+        }
+
+
 def main():
     """Main function to download VRBO images"""
+    parser = argparse.ArgumentParser(description='Download and organize VRBO listing images')
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RUN_ID',
+                        help='Skip listings an interrupted run already finished (default: the latest run)')
+    args = parser.parse_args()
+    
+    journal = RunJournal('download_vrbo_images', args.resume)  # Each finished listing is on disk at once
+    todo = [listing for listing in listings if not journal.done(listing[0])]
+    
     print("=" * 70)
     print("VRBO Image Download Script")
     print("=" * 70)
     print(f"Mode: {'Headed' if not HEADLESS else 'Headless'}")
     print(f"Images directory: {IMAGES_DIR}")
-    print(f"Listings to process: {len(listings)}")
+    print(f"Output format: {OUTPUT_FORMAT}")
+    print(f"Browser contexts: {CONTEXTS}")
+    print(f"Run: {journal.run_id}" + (f" (resumed, {len(listings) - len(todo)} already done)" if journal.resumed else ""))
+    print(f"Listings to process: {len(todo)} of {len(listings)}")
     print("=" * 70)
     print()
     
     # Ensure images directory exists
     IMAGES_DIR.mkdir(exist_ok=True)
     
-    results = {}
+    store = ImageStore()
+    remove_partial_downloads(store.root)
+    cache = ValidatorCache()
+    scheduler = PolitenessScheduler()  # Paces page loads; image downloads are paced by the engine
     
-    with sync_playwright() as p:
-        # Launch browser
-        browser = p.chromium.launch(
-            headless=HEADLESS,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-            ]
-        )
-        
-        # Create context with realistic settings
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            viewport={'width': 1920, 'height': 1080},
-            locale='en-US',
-        )
-        
-        # Add stealth scripts
-        context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-        """)
-        
-        page = context.new_page()
+    launch_options = {
+        'headless': HEADLESS,
+        'args': [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+        ]
+    }
+    
+    # Realistic settings for every browser context
+    context_options = {
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'viewport': {'width': 1920, 'height': 1080},
+        'locale': 'en-US',
+    }
+    
+    # Stealth scripts
+    stealth_script = """
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined
+        });
+    """
+    
+    pages = ScrapeEngine(CONTEXTS, launch_options, context_options, stealth_script, scheduler=scheduler,
+                         capture_factory=lambda: NetworkCapture(store.root, data=False))
+    
+    with DownloadEngine() as engine, ConversionStage(**output_options()) as converter:
+        pipeline = {'engine': engine, 'converter': converter, 'store': store, 'cache': cache,
+                    'lock': asyncio.Lock(), 'seen': {}}
         
-        for i, (listing_id, name, option_num) in enumerate(listings, 1):
-            print(f"\n[{i}/{len(listings)}] Processing: {name} (ID: {listing_id})")
-            print("-" * 70)
-            
-            url = f'https://www.vrbo.com/{listing_id}'
-            option_dir = IMAGES_DIR / f'option-{option_num}'
-            
-            try:
-                # Navigate to page
-                print(f"  [*] Navigating to {url}...")
-                page.goto(url, wait_until='domcontentloaded', timeout=30000)
-                
-                # Wait with jitter
-                delay = jitter_delay(2, 4)
-                print(f"  [*] Waited {delay:.1f}s")
-                
-                # Wait for page to be ready (use 'load' instead of 'networkidle' as VRBO has continuous network activity)
-                print("  [*] Waiting for images to load...")
-                try:
-                    page.wait_for_load_state('load', timeout=20000)
-                except:
-                    pass  # Continue even if timeout
-                jitter_delay(3, 5)  # Give extra time for images to load
-                
-                # Extract image URLs
-                print("  [*] Extracting image URLs...")
-                image_urls = extract_image_urls(page)
-                print(f"  [+] Found {len(image_urls)} images")
-                
-                if not image_urls:
-                    print("  [!] No images found, trying alternative method...")
-                    # Try scrolling to trigger lazy loading
-                    for _ in range(3):
-                        page.evaluate("window.scrollBy(0, 500)")
-                        jitter_delay(1, 2)
-                    image_urls = extract_image_urls(page)
-                    print(f"  [+] Found {len(image_urls)} images after scrolling")
-                
-                # Download and organize images
-                if image_urls:
-                    downloaded = organize_images(image_urls, option_dir, name)
-                    results[listing_id] = {
-                        'option': option_num,
-                        'name': name,
-                        'total_images': len(image_urls),
-                        'downloaded': downloaded
-                    }
-                    print(f"  [+] Downloaded: {downloaded['pool']} pool, {downloaded['exterior']} exterior")
-                else:
-                    print("  [!] No images to download")
-                    results[listing_id] = {
-                        'option': option_num,
-                        'name': name,
-                        'total_images': 0,
-                        'downloaded': {'pool': 0, 'exterior': 0, 'other': 0}
-                    }
-                
-                # Random delay before next listing
-                if i < len(listings):
-                    delay = jitter_delay(3, 6)
-                    print(f"  [*] Waiting {delay:.1f}s before next listing...")
-                
-            except Exception as e:
-                print(f"  [!] Error processing {name}: {e}")
-                results[listing_id] = {
-                    'option': option_num,
-                    'name': name,
-                    'error': str(e)
-                }
+        async def handler(worker, item):
+            position, listing = item
+            result = await process_listing(worker, position, len(todo), listing, pipeline)
+            journal.record(listing[0], {'result': result, 'image_urls': pipeline['seen'].get(listing[0], [])},
+                           ok='error' not in result)
+            return result
         
-        browser.close()
+        outcomes = []
+        if todo:
+            outcomes = pages.run_sync(enumerate(todo, 1), handler)
+            print(f"\n[+] {len(todo)} listings in {pages.elapsed:.1f}s ({scheduler.waited:.1f}s of it pacing waits)")
+    
+    # Results come from the journal (listings done before a resume included), in listing order
+    finished = journal.entries()
+    journal.close()
+    crashed = {listing[0]: outcome for listing, outcome in zip(todo, outcomes) if isinstance(outcome, Exception)}
+    results = {}
+    seen = {}
+    for listing_id, name, option_num in listings:
+        if listing_id in finished:
+            entry, _ = finished[listing_id]
+            results[listing_id] = entry['result']
+            seen[listing_id] = entry['image_urls']
+        elif listing_id in crashed:
+            results[listing_id] = {'option': option_num, 'name': name, 'error': str(crashed[listing_id])}
     
     # Save results to JSON
     output_file = 'image_download_results.json'
@@ -430,6 +691,19 @@ def main():
     print(f"[+] Results saved to {output_file}")
     print("=" * 70)
     
+    # Image URLs seen this run, linked to their blobs once downloaded
+    with ListingDB() as db, db.transaction():
+        for listing_id, name, option_num in listings:
+            db.upsert_listing(listing_id, name, option_num, source='download_vrbo_images')
+            db.add_image_urls(listing_id, seen.get(listing_id, []), 'download_vrbo_images')
+        db.import_store(store)
+        print(f"[+] {len(db.pending_images())} image URLs in {db.path} not downloaded yet")
+    
+    # Responsive variants for srcset (unchanged images are skipped)
+    print("\n[*] Building responsive image variants...")
+    build_derivatives(IMAGES_DIR)
+    write_manifest(IMAGES_DIR)
+    
     # Print summary
     print("\nDownload Summary:")
     total_pool = 0
@@ -445,6 +719,11 @@ def main():
             print(f"  {data.get('name', 'Unknown')} - ERROR: {data['error']}")
     
     print(f"\nTotal: {total_pool} pool images, {total_exterior} exterior images")
+    
+    print("\nPipeline Throughput:")
+    for stats in (engine.stats, converter.stats):
+        print(f"  {stats.summary()}")
+    print(f"  revalidate: {cache.not_modified} not modified, {cache.modified} changed")
 
 
 if __name__ == '__main__':
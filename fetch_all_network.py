@@ -1,4 +1,5 @@
 from playwright.sync_api import sync_playwright
+from browser_service import launch, new_context
 import json
 
 # Just test with first listing
@@ -12,8 +13,8 @@ all_urls = []
 
 with sync_playwright() as p:
     # Try non-headless to see what's happening
-    browser = p.chromium.launch(headless=False)
-    page = browser.new_page()
+    browser = launch(p, headless=False)  # The browser service if it is running
+    page = new_context(browser).new_page()
     
     def log_request(request):
         url = request.url
@@ -52,6 +53,7 @@ with sync_playwright() as p:
         print(f"  [{i+1}] {u}")
     
     input("\nPress Enter to close browser...")
+    page.close()
     browser.close()
 
 
@@ -1,6 +1,8 @@
 from playwright.sync_api import sync_playwright
 import json
 import re
+from page_archive import PageArchive
+from browser_service import launch, new_context
 
 listings = [
     ('4146676', 'Spacious Beach House'),
@@ -14,10 +16,11 @@ listings = [
 ]
 
 results = {}
+archive = PageArchive()
 
 with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
-    context = browser.new_context(
+    browser = launch(p, headless=True)  # The browser service if it is running
+    context = new_context(browser,
         user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         viewport={'width': 1920, 'height': 1080}
     )
@@ -35,6 +38,7 @@ with sync_playwright() as p:
             
             # Get page HTML
             html = page.content()
+            archive.save(listing_id, html, page.url, name, i + 1)
             
             # Look for image URLs in script tags containing JSON data
             # VRBO often embeds property data in __NEXT_DATA__ or similar
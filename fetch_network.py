@@ -1,4 +1,5 @@
 from playwright.sync_api import sync_playwright
+from browser_service import launch, new_context
 import json
 
 listings = [
@@ -15,12 +16,13 @@ listings = [
 results = {}
 
 with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
+    browser = launch(p, headless=True)  # The browser service if it is running
+    context = new_context(browser)
     
     for i, (listing_id, name) in enumerate(listings):
         print(f"[{i+1}/8] {name}...", end=" ", flush=True)
         
-        page = browser.new_page()
+        page = context.new_page()
         
         # Collect image URLs from network requests
         image_urls = []
@@ -1,6 +1,8 @@
 from playwright.sync_api import sync_playwright
 import json
 import time
+from resource_policy import SERVICE_PROFILE, ResourcePolicy, format_report
+from browser_service import attached, launch, new_context
 
 # VRBO listing IDs with their names
 listings = [
@@ -18,10 +20,14 @@ def fetch_images():
     results = {}
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
+        browser = launch(p, headless=True)  # The browser service if it is running
+        context = new_context(browser,
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         )
+        # Without images, fonts and analytics the page can actually reach networkidle.
+        # The browser service loads everything instead, so its disk cache is used.
+        policy = ResourcePolicy(SERVICE_PROFILE if attached(browser) else 'data-only')
+        wait_until = 'networkidle' if policy.rules else 'load'
         
         for i, (listing_id, name) in enumerate(listings):
             print(f"[{i+1}/8] Fetching images for Option {i+1}: {name} (ID: {listing_id})...")
@@ -29,9 +35,11 @@ def fetch_images():
             # URL with gallery parameter
             url = f'https://www.vrbo.com/{listing_id}?pwaThumbnailDialog=thumbnail-gallery'
             
+            policy.reset()
             try:
                 page = context.new_page()
-                page.goto(url, wait_until='networkidle', timeout=30000)
+                policy.attach(page)
+                page.goto(url, wait_until=wait_until, timeout=30000)
                 
                 # Wait a bit for images to load
                 time.sleep(3)
@@ -75,6 +83,7 @@ def fetch_images():
                 }
                 
                 print(f"   Found {len(unique_urls)} images")
+                print(f"   {format_report(policy.report(page))}")
                 if unique_urls:
                     print(f"   First image: {unique_urls[0][:80]}...")
                 
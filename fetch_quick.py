@@ -1,5 +1,7 @@
 from playwright.sync_api import sync_playwright
 import re
+from page_archive import PageArchive
+from browser_service import launch, new_context
 
 # Test with first 2 listings
 listings = [
@@ -7,9 +9,11 @@ listings = [
     ('2873463', 'Large Luxurious Home'),
 ]
 
+archive = PageArchive()
+
 with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
-    page = browser.new_page()
+    browser = launch(p, headless=True)  # The browser service if it is running
+    page = new_context(browser).new_page()
     
     for listing_id, name in listings:
         print(f"\n{'='*50}")
@@ -23,6 +27,7 @@ with sync_playwright() as p:
             
             # Get page content and extract image URLs
             content = page.content()
+            archive.save(listing_id, content, page.url, name)
             
             # Find all image URLs
             patterns = [
@@ -45,6 +50,7 @@ with sync_playwright() as p:
         except Exception as e:
             print(f"Error: {e}")
     
+    page.close()
     browser.close()
 
 
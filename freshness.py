@@ -0,0 +1,181 @@
+"""
+Listing Freshness
+Per-field time-to-live policies for vrbo_updated_data.json. Each record
+carries a 'fetched' map of field -> UTC timestamp of the last visit that
+read it; the planner picks only the listings with at least one field past
+its TTL, so a routine refresh visits a fraction of the list. A visit that
+found a field empty is recorded in 'missed', and the field is retried one
+TTL later rather than on every run.
+
+Usage:
+    python freshness.py            # Show which listings are due and why
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Configuration
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+FIELD_TTLS = {
+    'price': 12 * HOUR,
+    'rating': 7 * DAY,
+    'reviews': 7 * DAY,
+    'images': 14 * DAY,
+    'title': 30 * DAY,
+    'bedrooms': 30 * DAY,
+    'bathrooms': 30 * DAY,
+    'sleeps': 30 * DAY,
+    'sqft': 30 * DAY,
+    'amenities': 30 * DAY,
+    'description': 30 * DAY,
+}
+DATA_FILE = 'vrbo_updated_data.json'
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def _parse(stamp):
+    try:
+        when = datetime.fromisoformat(stamp)
+    except (TypeError, ValueError):
+        return None
+    return when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+
+
+def last_attempt(record, field):
+    """When field was last read, or last found missing, whichever is later (None if never)"""
+    attempts = [_parse((record.get(key) or {}).get(field)) for key in ('fetched', 'missed')]
+    attempts = [when for when in attempts if when]
+    return max(attempts) if attempts else None
+
+
+def stale_fields(record, now=None, ttls=FIELD_TTLS):
+    """Fields of record never fetched, or not attempted within their TTL"""
+    now = now or utc_now()
+    if not record or 'error' in record:
+        return list(ttls)
+    stale = []
+    for field, ttl in ttls.items():
+        when = last_attempt(record, field)
+        if when is None or now - when >= ttl:
+            stale.append(field)
+    return stale
+
+
+def overdue(record, now=None, ttls=FIELD_TTLS):
+    """How far past its TTL the stalest field is (timedelta.max if never fetched)"""
+    now = now or utc_now()
+    if not record or 'error' in record:
+        return timedelta.max
+    worst = timedelta.min
+    for field, ttl in ttls.items():
+        when = last_attempt(record, field)
+        if when is None:
+            return timedelta.max
+        worst = max(worst, now - when - ttl)
+    return worst
+
+
+def plan(listings, records, now=None, ttls=FIELD_TTLS, limit=None):
+    """Listings (in input order) with at least one stale field
+
+    listings are (listing_id, ...) tuples and records the current
+    {listing_id: record}. Returns [(listing, stale fields)]. With limit,
+    only the most overdue listings are kept, so staggered runs spread the
+    visits over time.
+    """
+    now = now or utc_now()
+    due = []
+    for listing in listings:
+        record = records.get(listing[0])
+        stale = stale_fields(record, now, ttls)
+        if stale:
+            due.append((listing, stale))
+    if limit is not None and len(due) > limit:
+        keep = sorted(due, key=lambda item: overdue(records.get(item[0][0]), now, ttls), reverse=True)[:limit]
+        keep = {item[0][0] for item in keep}
+        due = [item for item in due if item[0][0] in keep]
+    return due
+
+
+def _iso(when=None):
+    """when (an ISO string or datetime, default now) as an ISO string"""
+    when = when or utc_now()
+    return when.isoformat(timespec='seconds') if isinstance(when, datetime) else when
+
+
+def stamp(record, when=None, fields=FIELD_TTLS):
+    """Mark fields of record as fetched at when (an ISO string or datetime)"""
+    when = _iso(when)
+    fetched = dict(record.get('fetched') or {})
+    fetched.update({field: when for field in fields})
+    record['fetched'] = fetched
+    missed = {field: at for field, at in (record.get('missed') or {}).items() if field not in fields}
+    if missed:
+        record['missed'] = missed
+    else:
+        record.pop('missed', None)
+    return record
+
+
+def merge(previous, fresh, when=None):
+    """Fold a freshly visited record into the previous one
+
+    Fields the visit read are stamped. A field the page left empty keeps
+    its previous value and that value's timestamp, and the visit is noted
+    in 'missed' so the field is retried after its TTL, not on every run;
+    it is stamped only when there was nothing to keep. A failed visit
+    leaves the previous record as it was.
+    """
+    if 'error' in fresh:
+        return previous if previous and 'error' not in previous else fresh
+    when = _iso(when)
+    merged = dict(previous or {})
+    merged.pop('error', None)
+    read, kept = [], []
+    for key, value in fresh.items():
+        if key in ('fetched', 'missed'):
+            continue
+        if value or not merged.get(key) or key not in FIELD_TTLS:
+            merged[key] = value
+            read.append(key)
+        else:
+            kept.append(key)
+    merged['fetched'] = (previous or {}).get('fetched') or {}
+    merged = stamp(merged, when, [field for field in FIELD_TTLS if field in read])
+    if kept:
+        missed = dict(merged.get('missed') or {})
+        missed.update({field: when for field in kept})
+        merged['missed'] = missed
+    return merged
+
+
+def load_records(path=DATA_FILE):
+    if not Path(path).exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def describe(record, stale):
+    if not record or not record.get('fetched'):
+        return 'never fetched'
+    return 'stale: ' + ', '.join(stale)
+
+
+def main():
+    from update_vrbo_data import listings
+
+    records = load_records()
+    due = plan(listings, records)
+    print(f"[*] {len(due)}/{len(listings)} listings due for a visit")
+    for (listing_id, name, option_num), stale in due:
+        print(f"  Option {option_num}: {name} ({listing_id}) - {describe(records.get(listing_id), stale)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+HTTP Validator Cache
+Remembers the ETag / Last-Modified each image URL was served with, so the
+next run can send a conditional request and get a bodyless 304 back when
+the photo has not changed on the CDN.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from image_convert import PARTIAL_SUFFIX
+
+# Configuration
+CACHE_FILE = Path('images') / '.store' / 'validators.json'
+
+
+class ValidatorCache:
+    """Persistent URL -> {etag, last_modified} map plus per-run counters"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        self.not_modified = 0  # 304s received this run
+        self.modified = 0  # Full responses to a conditional request this run
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._validated = set()  # URLs already checked this run
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[!] Ignoring unreadable validator cache {self.path}: {e}")
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for url (may be empty)"""
+        entry = self._entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def has_validators(self, url):
+        return bool(self._entries.get(url))
+
+    def validated(self, url):
+        """True if url was already fetched or revalidated during this run"""
+        return url in self._validated
+
+    def record(self, url, response, conditional=False):
+        """Store the validators from a 200/304 response to url"""
+        with self._lock:
+            self._validated.add(url)
+            if response.status_code == 304:
+                self.not_modified += 1
+            elif conditional:
+                self.modified += 1
+            # A 304 may refresh the validators; a full response replaces them
+            entry = dict(self._entries.get(url, {})) if response.status_code == 304 else {}
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag:
+                entry['etag'] = etag
+            if last_modified:
+                entry['last_modified'] = last_modified
+            if entry:
+                self._entries[url] = entry
+            else:
+                self._entries.pop(url, None)
+
+    def save(self):
+        """Atomically write the cache to disk"""
+        with self._lock:
+            data = dict(self._entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=self.path.parent, prefix='.', suffix=PARTIAL_SUFFIX)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(temp_name, self.path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
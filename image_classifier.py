@@ -0,0 +1,129 @@
+"""
+Pool / Exterior Image Classifier
+Scores a whole batch of images at once from NumPy color statistics: the
+share of saturated pool-water cyan/blue in the lower two thirds of the frame, blue sky in
+the top third, and sand tones. Positive scores mean "pool".
+
+Usage:
+    python image_classifier.py images/option-1
+"""
+
+import sys
+from pathlib import Path
+
+from image_convert import HAS_PIL
+
+if HAS_PIL:
+    from PIL import Image
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import pillow_avif  # noqa: F401  Registers the AVIF decoder with Pillow
+except ImportError:
+    pass
+
+# Configuration
+THUMBNAIL_SIZE = 64  # Images are reduced to this square before scoring
+BATCH_SIZE = 128
+WATER_HUE = (165, 230)  # Degrees; turquoise to deep-blue pool water
+WATER_SATURATION = 0.35  # Pool water is more saturated than sky or ocean haze
+SKY_HUE = (200, 250)  # Degrees; blue sky
+SAND_HUE = (25, 55)  # Degrees; sand and beige
+WATER_THRESHOLD = 0.04  # Water share at which the pixel score is neutral
+WATER_WEIGHT = 20.0
+SAND_WEIGHT = 0.5  # Penalty for sand dominating water (beach / exterior shots)
+SKY_WEIGHT = 0.25  # Small bonus for outdoor shots, since interiors are never the pool
+
+
+def load_thumbnails(paths, size=THUMBNAIL_SIZE):
+    """(N, size, size, 3) float32 RGB in [0, 1] and an (N,) valid mask"""
+    batch = np.zeros((len(paths), size, size, 3), dtype=np.float32)
+    valid = np.zeros(len(paths), dtype=bool)
+    for row, path in enumerate(paths):
+        try:
+            with Image.open(path) as img:
+                img.draft('RGB', (size * 4, size * 4))  # Fast JPEG downscale on decode
+                thumb = img.convert('RGB').resize((size, size), Image.Resampling.BOX)
+        except Exception:
+            continue
+        batch[row] = np.asarray(thumb, dtype=np.float32) / 255.0
+        valid[row] = True
+    return batch, valid
+
+
+def rgb_to_hsv(rgb):
+    """Vectorized RGB -> (hue degrees, saturation, value) for (..., 3) arrays"""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    value = rgb.max(axis=-1)
+    delta = value - rgb.min(axis=-1)
+    saturation = np.where(value > 0, delta / np.maximum(value, 1e-9), 0.0)
+    safe = np.maximum(delta, 1e-9)
+    hue = np.select(
+        [delta == 0, value == r, value == g],
+        [0.0, ((g - b) / safe) % 6, (b - r) / safe + 2],
+        default=(r - g) / safe + 4,
+    ) * 60.0
+    return hue, saturation, value
+
+
+def color_features(rgb):
+    """Per-image water, sky and sand fractions for an (N, H, W, 3) batch"""
+    hue, sat, val = rgb_to_hsv(rgb)
+    third = rgb.shape[1] // 3
+    water = (hue >= WATER_HUE[0]) & (hue <= WATER_HUE[1]) & (sat > WATER_SATURATION) & (val > 0.35)
+    sky = (hue > SKY_HUE[0]) & (hue <= SKY_HUE[1]) & (sat > 0.15) & (val > 0.5)
+    sand = (hue >= SAND_HUE[0]) & (hue <= SAND_HUE[1]) & (sat > 0.15) & (sat < 0.6) & (val > 0.55)
+    return {
+        'water': water[:, third:].mean(axis=(1, 2)),
+        'sky': sky[:, :third].mean(axis=(1, 2)),
+        'sand': sand.mean(axis=(1, 2)),
+    }
+
+
+def pixel_scores(paths, batch_size=BATCH_SIZE):
+    """(N,) pool-vs-exterior score from pixels; 0 for undecodable images"""
+    scores = np.zeros(len(paths))
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        rgb, valid = load_thumbnails(chunk)
+        features = color_features(rgb)
+        sand_share = features['sand'] / (features['sand'] + features['water'] + 1e-9)
+        score = (WATER_WEIGHT * (features['water'] - WATER_THRESHOLD)
+                 - SAND_WEIGHT * sand_share
+                 + SKY_WEIGHT * (features['sky'] > 0.05))
+        scores[start:start + len(chunk)] = np.where(valid, score, 0.0)
+    return scores
+
+
+def classify(paths, keyword_scores=None, keyword_weight=1.0):
+    """Return (N,) combined scores; > 0 means pool, otherwise exterior
+
+    keyword_scores (+1 pool, -1 exterior, 0 unknown per image) are added
+    with keyword_weight. Without NumPy/Pillow only the keywords count.
+    """
+    keywords = list(keyword_scores) if keyword_scores is not None else [0] * len(paths)
+    if not (HAS_NUMPY and HAS_PIL) or not paths:
+        return [keyword_weight * k for k in keywords]
+    combined = pixel_scores(paths) + keyword_weight * np.asarray(keywords, dtype=np.float64)
+    return combined.tolist()
+
+
+def main():
+    if not HAS_NUMPY:
+        print("[!] NumPy not installed. Install with: pip install numpy")
+        return
+    folder = Path(sys.argv[1] if len(sys.argv) > 1 else 'images')
+    paths = sorted(p for p in folder.rglob('*') if p.is_file() and not p.name.startswith('.')
+                   and p.suffix.lower() in ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.avif')
+                   and p.parent.name != 'derived')
+    for path, score in zip(paths, classify(paths)):
+        print(f"  {'pool    ' if score > 0 else 'exterior'} {score:+.2f}  {path}")
+
+
+if __name__ == '__main__':
+    main()
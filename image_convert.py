@@ -0,0 +1,241 @@
+"""
+Image Conversion Stage
+CPU-bound Pillow work (decode, flatten, encode) runs in a process pool
+behind the downloader. Download threads hand over finished temp files and
+block when too many conversions are pending, so memory stays bounded.
+
+Output formats:
+- png: lossless PNG (the original behavior; large for photos)
+- passthrough: keep the downloaded bytes untouched
+- webp / jpeg: re-encode at a quality target within a per-image byte budget
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from download_engine import StageStats
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    print("[!] Warning: PIL/Pillow not installed. Install with: pip install Pillow")
+    print("[!] Images will be saved in original format (may not be PNG)")
+
+# Configuration
+CONVERT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Converter processes
+MAX_PENDING = 16  # Downloaded files waiting for (or in) conversion before downloads block
+PARTIAL_SUFFIX = '.part'  # Temp files everywhere are hidden and carry this suffix until renamed
+OUTPUT_FORMATS = ('png', 'passthrough', 'webp', 'jpeg')
+DEFAULT_QUALITY = 80  # Starting quality for webp/jpeg
+MIN_QUALITY = 50  # Lowest quality tried before downscaling to meet the byte budget
+QUALITY_STEP = 10
+DOWNSCALE_STEP = 0.85  # Shrink factor per attempt once quality is at MIN_QUALITY
+
+# Leading bytes -> file extension, for naming passthrough output
+MAGIC_EXTENSIONS = [
+    (0, b'\x89PNG', 'png'),
+    (0, b'\xff\xd8\xff', 'jpg'),
+    (0, b'GIF8', 'gif'),
+    (8, b'WEBP', 'webp'),
+    (8, b'avif', 'avif'),
+    (8, b'avis', 'avif'),
+]
+PIL_EXTENSIONS = {'PNG': 'png', 'JPEG': 'jpg', 'WEBP': 'webp', 'GIF': 'gif'}
+
+
+def detect_extension(path, default='jpg'):
+    """Guess a file extension from the image's leading bytes"""
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    for offset, magic, ext in MAGIC_EXTENSIONS:
+        if head[offset:offset + len(magic)] == magic:
+            return ext
+    return default
+
+
+def flatten(img):
+    """Return img as RGB or L, compositing any alpha onto white"""
+    # Convert RGBA to RGB if necessary (for JPEG compatibility)
+    if img.mode == 'RGBA':
+        # Create white background
+        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+        rgb_img.paste(img, mask=img.split()[3])  # Use alpha channel as mask
+        return rgb_img
+    if img.mode not in ('RGB', 'L'):
+        return img.convert('RGB')
+    return img
+
+
+def write_atomic(filepath, data):
+    """Write bytes to a temp file beside filepath, then rename into place"""
+    fd, temp_name = tempfile.mkstemp(dir=filepath.parent, prefix='.', suffix=PARTIAL_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_name, 0o644)  # mkstemp creates owner-only files
+        os.replace(temp_name, filepath)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def convert_to_png(source, filepath):
+    """Convert the image at source to PNG and atomically move it to filepath"""
+    fd, temp_name = tempfile.mkstemp(dir=filepath.parent, prefix='.', suffix=PARTIAL_SUFFIX)
+    os.close(fd)
+    temp_path = Path(temp_name)
+    try:
+        with Image.open(source) as img:
+            # Save as PNG
+            flatten(img).save(temp_path, 'PNG')
+        os.replace(temp_path, filepath)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def encode_within_budget(img, pil_format, quality=DEFAULT_QUALITY, max_bytes=None):
+    """Encode img as JPEG/WebP, lowering quality then size until it fits
+
+    Returns the encoded bytes. Without max_bytes a single encode at quality
+    is done.
+    """
+    img = flatten(img)
+    while True:
+        for q in range(quality, MIN_QUALITY - 1, -QUALITY_STEP):
+            buffer = io.BytesIO()
+            img.save(buffer, pil_format, quality=q, optimize=pil_format == 'JPEG', method=4)
+            data = buffer.getvalue()
+            if max_bytes is None or len(data) <= max_bytes:
+                return data
+        width, height = img.size
+        if width < 320 or height < 320:
+            return data  # Good enough; don't shrink photos into thumbnails
+        img = img.resize((int(width * DOWNSCALE_STEP), int(height * DOWNSCALE_STEP)),
+                         Image.Resampling.LANCZOS)
+
+
+def convert_to_lossy(source, filepath, output_format, quality=DEFAULT_QUALITY, max_bytes=None):
+    """Re-encode source as webp/jpeg into filepath; return the extension
+
+    A source already in the target format and within budget is kept as-is
+    rather than losing quality to a second lossy encode.
+    """
+    pil_format = 'WEBP' if output_format == 'webp' else 'JPEG'
+    with Image.open(source) as img:
+        fits = max_bytes is None or os.path.getsize(source) <= max_bytes
+        if img.format == pil_format and fits:
+            data = None
+        else:
+            data = encode_within_budget(img, pil_format, quality, max_bytes)
+    if data is None:
+        os.replace(source, filepath)
+    else:
+        write_atomic(filepath, data)
+    return PIL_EXTENSIONS[pil_format]
+
+
+def file_sha256(path, chunk_size=64 * 1024):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def convert_image(source, filepath, output_format='png', quality=DEFAULT_QUALITY, max_bytes=None):
+    """Turn the downloaded temp file at source into filepath
+
+    Always consumes source. If Pillow is missing or cannot decode the image
+    the original bytes are kept under filepath. Runs in a worker process, so
+    problems are returned in the result dict instead of printed. The result
+    also carries the sha256 of the file written to filepath and the file
+    extension matching its actual format.
+    """
+    source, filepath = Path(source), Path(filepath)
+    started = time.perf_counter()
+    result = {'converted': False, 'error': None, 'ext': None}
+    try:
+        if output_format == 'passthrough':
+            os.replace(source, filepath)
+        elif HAS_PIL:
+            try:
+                if output_format == 'png':
+                    convert_to_png(source, filepath)
+                    result['ext'] = 'png'
+                else:
+                    result['ext'] = convert_to_lossy(source, filepath, output_format, quality, max_bytes)
+                result['converted'] = True
+            except Exception as e:
+                # Fallback: save original format
+                result['error'] = f"{output_format.upper()} conversion failed, saving original: {e}"
+                os.replace(source, filepath)
+        else:
+            # If PIL not available, save as-is
+            os.replace(source, filepath)
+    finally:
+        source.unlink(missing_ok=True)
+    if result['ext'] is None:
+        result['ext'] = detect_extension(filepath)
+    result['path'] = str(filepath)
+    result['sha256'] = file_sha256(filepath)
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+class ConversionStage:
+    """Process pool that drains downloaded temp files into final images
+
+    submit() blocks once MAX_PENDING conversions are queued or running,
+    which pushes back on the download threads instead of piling up files.
+    """
+
+    def __init__(self, workers=CONVERT_WORKERS, max_pending=MAX_PENDING, **options):
+        self.options = options  # output_format / quality / max_bytes for convert_image
+        self.stats = StageStats('convert')
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._pending = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, source, filepath):
+        """Queue a conversion and return a Future for convert_image's result"""
+        self._pending.acquire()
+        started = time.monotonic()
+        outer = Future()
+        try:
+            inner = self._executor.submit(convert_image, str(source), str(filepath), **self.options)
+        except BaseException:
+            self._pending.release()
+            raise
+
+        def finished(inner):
+            self._pending.release()
+            try:
+                result = inner.result()
+            except Exception as e:
+                self.stats.record(started, time.monotonic(), ok=False)
+                Path(source).unlink(missing_ok=True)
+                outer.set_exception(e)
+                return
+            self.stats.record(started, time.monotonic(), busy=result['seconds'])
+            outer.set_result(result)
+
+        inner.add_done_callback(finished)
+        return outer
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
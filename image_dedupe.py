@@ -0,0 +1,219 @@
+"""
+Near-Duplicate Image Detection
+Computes dHash and pHash fingerprints for a batch of images with NumPy,
+groups near-duplicates (same shot at a different crop or resolution) by
+Hamming distance, and keeps the best shot of each group, scored on
+resolution and Laplacian-variance sharpness.
+
+Usage:
+    python image_dedupe.py images/option-1
+"""
+
+import sys
+from pathlib import Path
+
+from image_convert import HAS_PIL
+
+if HAS_PIL:
+    from PIL import Image
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import pillow_avif  # noqa: F401  Registers the AVIF decoder with Pillow
+except ImportError:
+    pass
+
+# Configuration
+BATCH_SIZE = 64  # Images decoded before their features are stacked and hashed
+HASH_SIZE = 8  # 8x8 = 64-bit hashes
+PHASH_SIZE = 32  # DCT input size for pHash
+SHARPNESS_SIZE = 256  # Images are normalized to this square before measuring sharpness
+DUPLICATE_DISTANCE = 20  # Max combined dHash+pHash Hamming distance (of 128 bits) for a near-duplicate
+RESOLUTION_WEIGHT = 0.6  # Share of the best-shot score from pixel count
+SHARPNESS_WEIGHT = 0.4  # Share of the best-shot score from sharpness
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as an (n, n) matrix"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def _pack_bits(bits):
+    """(N, 64) bool -> (N,) uint64"""
+    weights = (np.uint64(1) << np.arange(bits.shape[1], dtype=np.uint64))
+    return (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+
+def dhash(small):
+    """Difference hash of (N, HASH_SIZE, HASH_SIZE + 1) grayscale arrays"""
+    bits = small[:, :, 1:] > small[:, :, :-1]
+    return _pack_bits(bits.reshape(len(small), -1))
+
+
+def phash(gray):
+    """DCT hash of (N, PHASH_SIZE, PHASH_SIZE) grayscale arrays"""
+    dct = _dct_matrix(gray.shape[1])
+    coeffs = np.einsum('ij,njk,lk->nil', dct, gray, dct)[:, :HASH_SIZE, :HASH_SIZE]
+    flat = coeffs.reshape(len(gray), -1)
+    median = np.median(flat[:, 1:], axis=1, keepdims=True)  # Ignore the DC term
+    return _pack_bits(flat > median)
+
+
+def laplacian_variance(gray):
+    """Variance of the 4-neighbour Laplacian for (N, H, W) arrays; higher = sharper"""
+    lap = (gray[:, :-2, 1:-1] + gray[:, 2:, 1:-1] + gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:]
+           - 4 * gray[:, 1:-1, 1:-1])
+    return lap.reshape(len(gray), -1).var(axis=1)
+
+
+_POPCOUNT = None
+
+
+def hamming_matrix(hashes):
+    """(N, N) pairwise Hamming distances between uint64 hashes"""
+    global _POPCOUNT
+    if _POPCOUNT is None:
+        _POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+    xor = hashes[:, None] ^ hashes[None, :]
+    return _POPCOUNT[xor.view(np.uint8).reshape(len(hashes), len(hashes), 8)].sum(axis=2)
+
+
+def _reduce(img):
+    """Small grayscale arrays used for hashing and sharpness"""
+    img.draft('L', (SHARPNESS_SIZE * 2, SHARPNESS_SIZE * 2))  # Fast JPEG downscale on decode
+    gray = img.convert('L')
+    small = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX), dtype=np.float32)
+    dct_in = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BOX), dtype=np.float32)
+    sharp_in = np.asarray(gray.resize((SHARPNESS_SIZE, SHARPNESS_SIZE), Image.Resampling.BILINEAR),
+                          dtype=np.float32)
+    return small, dct_in, sharp_in
+
+
+def image_features(paths, batch_size=BATCH_SIZE):
+    """Fingerprints, sharpness and pixel counts for every path
+
+    Images are decoded batch_size at a time, reduced to small arrays, and
+    each batch is hashed in one vectorized pass. Returns a dict of (N,)
+    arrays: dhash, phash, sharpness, pixels and valid (False where the
+    image could not be decoded).
+    """
+    count = len(paths)
+    features = {
+        'dhash': np.zeros(count, dtype=np.uint64),
+        'phash': np.zeros(count, dtype=np.uint64),
+        'sharpness': np.zeros(count, dtype=np.float64),
+        'pixels': np.zeros(count, dtype=np.int64),
+        'valid': np.zeros(count, dtype=bool),
+    }
+    for start in range(0, count, batch_size):
+        rows, smalls, dct_ins, sharp_ins = [], [], [], []
+        for row in range(start, min(start + batch_size, count)):
+            try:
+                with Image.open(paths[row]) as img:
+                    features['pixels'][row] = img.width * img.height
+                    small, dct_in, sharp_in = _reduce(img)
+            except Exception:
+                continue
+            rows.append(row)
+            smalls.append(small)
+            dct_ins.append(dct_in)
+            sharp_ins.append(sharp_in)
+        if not rows:
+            continue
+        rows = np.array(rows)
+        features['dhash'][rows] = dhash(np.stack(smalls))
+        features['phash'][rows] = phash(np.stack(dct_ins))
+        features['sharpness'][rows] = laplacian_variance(np.stack(sharp_ins))
+        features['valid'][rows] = True
+    return features
+
+
+def cluster_labels(features, max_distance=DUPLICATE_DISTANCE):
+    """Connected components of the near-duplicate graph; (N,) int labels
+
+    Undecodable images each get their own cluster.
+    """
+    count = len(features['valid'])
+    distance = hamming_matrix(features['dhash']) + hamming_matrix(features['phash'])
+    adjacent = (distance <= max_distance) & features['valid'][:, None] & features['valid'][None, :]
+    labels = np.full(count, -1, dtype=np.int64)
+    label = 0
+    for seed in range(count):
+        if labels[seed] >= 0:
+            continue
+        members = np.zeros(count, dtype=bool)
+        members[seed] = True
+        frontier = members.copy()
+        while frontier.any():
+            reached = adjacent[frontier].any(axis=0) & ~members
+            members |= reached
+            frontier = reached
+        labels[members] = label
+        label += 1
+    return labels
+
+
+def best_shot_mask(features, labels):
+    """(N,) bool mask with one True per cluster: its highest-scoring image"""
+    count = len(labels)
+    n_clusters = labels.max() + 1 if count else 0
+    pixels = features['pixels'].astype(np.float64)
+    sharpness = features['sharpness']
+    # Normalize both criteria against the best value inside each cluster
+    max_pixels = np.zeros(n_clusters)
+    max_sharp = np.zeros(n_clusters)
+    np.maximum.at(max_pixels, labels, pixels)
+    np.maximum.at(max_sharp, labels, sharpness)
+    score = (RESOLUTION_WEIGHT * pixels / np.maximum(max_pixels[labels], 1)
+             + SHARPNESS_WEIGHT * sharpness / np.maximum(max_sharp[labels], 1e-9))
+    # Highest score per cluster; ties go to the earliest image
+    order = np.lexsort((np.arange(count), -score, labels))
+    first = np.ones(count, dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    keep = np.zeros(count, dtype=bool)
+    keep[order[first]] = True
+    return keep
+
+
+def select_best(paths, max_distance=DUPLICATE_DISTANCE, batch_size=BATCH_SIZE):
+    """Return (keep, labels) for paths: which to keep and their cluster ids
+
+    Without NumPy or Pillow every image is kept.
+    """
+    if not (HAS_NUMPY and HAS_PIL) or not paths:
+        return [True] * len(paths), list(range(len(paths)))
+    features = image_features(paths, batch_size)
+    labels = cluster_labels(features, max_distance)
+    keep = best_shot_mask(features, labels)
+    return keep.tolist(), labels.tolist()
+
+
+def main():
+    if not HAS_NUMPY:
+        print("[!] NumPy not installed. Install with: pip install numpy")
+        return
+    folder = Path(sys.argv[1] if len(sys.argv) > 1 else 'images')
+    paths = sorted(p for p in folder.rglob('*') if p.is_file() and not p.name.startswith('.')
+                   and p.suffix.lower() in ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.avif')
+                   and p.parent.name != 'derived')
+    keep, labels = select_best(paths)
+    clusters = {}
+    for path, kept, label in zip(paths, keep, labels):
+        clusters.setdefault(label, []).append((path, kept))
+    duplicates = [members for members in clusters.values() if len(members) > 1]
+    print(f"{len(paths)} images, {len(clusters)} distinct shots, {len(duplicates)} near-duplicate groups")
+    for members in duplicates:
+        print("  " + ", ".join(f"{'*' if kept else ''}{path}" for path, kept in members))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Responsive Image Derivatives
+Writes 480/960/1600 px wide WebP variants of every gallery image in
+images/option-N/ so the page can offer them through srcset. Work is spread
+over a process pool, and an image whose source hash is unchanged since the
+last build is skipped. Results are recorded in images/derivatives.json.
+
+Usage:
+    python image_derivatives.py
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from image_convert import HAS_PIL, PARTIAL_SUFFIX, file_sha256, write_atomic
+
+if HAS_PIL:
+    from PIL import Image
+
+try:
+    import pillow_avif  # noqa: F401  Registers the AVIF decoder with Pillow
+    HAS_AVIF = True
+except ImportError:
+    HAS_AVIF = False
+
+# Configuration
+IMAGES_DIR = Path('images')
+DERIVED_DIRNAME = 'derived'  # images/option-N/derived/<base>-<width>w.webp
+RECORD_FILE = IMAGES_DIR / 'derivatives.json'
+WIDTHS = (480, 960, 1600)
+QUALITY = 75
+WORKERS = os.cpu_count() or 2
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'webp', 'gif', 'avif')
+
+
+def gallery_images(images_dir=IMAGES_DIR):
+    """Every image directly inside an images/option-N/ folder, sorted"""
+    found = []
+    for option_dir in sorted(images_dir.glob('option-*')):
+        for path in sorted(option_dir.iterdir()):
+            if path.is_file() and not path.name.startswith('.') \
+                    and path.suffix.lower().lstrip('.') in IMAGE_EXTENSIONS:
+                found.append(path)
+    return found
+
+
+def variant_path(source, width):
+    return source.parent / DERIVED_DIRNAME / f'{source.stem}-{width}w.webp'
+
+
+def make_derivatives(source, images_dir=IMAGES_DIR, widths=WIDTHS, quality=QUALITY, previous=None):
+    """Write the width variants of source; runs in a worker process
+
+    previous is the record from the last build. If the source hash matches
+    and every variant file still exists, nothing is re-encoded. Returns the
+    new record: {sha256, width, height, variants: [{width, src}], skipped},
+    with src relative to images_dir.
+    """
+    source, images_dir = Path(source), Path(images_dir)
+    sha256 = file_sha256(source)
+    if previous and previous.get('sha256') == sha256 and all(
+            (images_dir / v['src']).exists() for v in previous.get('variants', [])):
+        return {**previous, 'skipped': True}
+
+    record = {'sha256': sha256, 'variants': [], 'skipped': False}
+    with Image.open(source) as img:
+        img.load()
+        record['width'], record['height'] = img.size
+        if img.mode not in ('RGB', 'RGBA', 'L'):
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+        for width in sorted(widths):
+            if width >= img.width:
+                break  # Never upscale; the original covers the rest
+            height = round(img.height * width / img.width)
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+            target = variant_path(source, width)
+            target.parent.mkdir(exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=target.parent, prefix='.', suffix=PARTIAL_SUFFIX)
+            os.close(fd)
+            try:
+                resized.save(temp_name, 'WEBP', quality=quality, method=4)
+                os.replace(temp_name, target)
+            except BaseException:
+                Path(temp_name).unlink(missing_ok=True)
+                raise
+            record['variants'].append({'width': width, 'src': target.relative_to(images_dir).as_posix()})
+    return record
+
+
+def load_records(path=RECORD_FILE):
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] Ignoring unreadable {path}: {e}")
+    return {}
+
+
+def save_records(records, path=RECORD_FILE):
+    write_atomic(path, json.dumps(records, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def remove_orphans(records, images_dir=IMAGES_DIR):
+    """Delete derived files that no current record points at"""
+    keep = {images_dir / v['src'] for record in records.values() for v in record['variants']}
+    removed = 0
+    for derived in images_dir.glob(f'option-*/{DERIVED_DIRNAME}/*.webp'):
+        if derived not in keep:
+            derived.unlink()
+            removed += 1
+    return removed
+
+
+def build_derivatives(images_dir=IMAGES_DIR, widths=WIDTHS, quality=QUALITY, workers=WORKERS):
+    """Bring every gallery image's variants up to date; return the records
+
+    Records are keyed by the image path relative to images_dir
+    (e.g. 'option-1/pool.webp').
+    """
+    if not HAS_PIL:
+        print("[!] Pillow not installed, skipping responsive variants")
+        return {}
+
+    started = time.monotonic()
+    record_file = images_dir / RECORD_FILE.name
+    previous = load_records(record_file)
+    records = {}
+    made = skipped = failed = 0
+
+    sources = gallery_images(images_dir)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for source in sources:
+            key = source.relative_to(images_dir).as_posix()
+            futures[key] = pool.submit(make_derivatives, str(source), str(images_dir), widths, quality,
+                                       previous.get(key))
+        for key, future in futures.items():
+            try:
+                record = future.result()
+            except Exception as e:
+                failed += 1
+                # Many CDN photos are AVIF, which Pillow only reads with the plugin
+                hint = '' if HAS_AVIF else ' (AVIF? pip install pillow-avif-plugin)'
+                print(f"  [!] {key}: {e}{hint}")
+                continue
+            if record.pop('skipped'):
+                skipped += 1
+            else:
+                made += 1
+            records[key] = record
+
+    removed = remove_orphans(records, images_dir)
+    save_records(records, record_file)
+    print(f"  [+] Variants: {made} images resized, {skipped} unchanged, {failed} failed, "
+          f"{removed} stale files removed in {time.monotonic() - started:.1f}s")
+    return records
+
+
+def main():
+    print("=" * 70)
+    print("Responsive Image Derivatives")
+    print("=" * 70)
+    build_derivatives()
+
+
+if __name__ == '__main__':
+    main()
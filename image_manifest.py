@@ -0,0 +1,141 @@
+"""
+Images Manifest
+Writes images/manifest.json: for every option, the ordered list of pool
+and exterior images with their dimensions, size, hash and responsive
+variants. index.html reads it once instead of probing for files. The first
+image of each gallery also gets a tiny inline preview (a base64 WebP about
+32 px wide) that build_site.py embeds in the page for the first paint.
+
+Usage:
+    python image_manifest.py
+"""
+
+import base64
+import io
+import json
+import re
+
+from image_convert import HAS_PIL, file_sha256, write_atomic
+from image_derivatives import IMAGES_DIR, RECORD_FILE, gallery_images, load_records
+
+if HAS_PIL:
+    from PIL import Image
+
+# Configuration
+MANIFEST_FILE = IMAGES_DIR / 'manifest.json'
+TYPE_ORDER = ('pool', 'exterior')  # Other types follow alphabetically
+PREVIEW_WIDTH = 32  # Pixels; upscaled by the browser, which blurs it
+PREVIEW_QUALITY = 40
+
+NAME_PATTERN = re.compile(r'^([a-z_-]+?)(\d*)$', re.IGNORECASE)
+
+
+def slot_key(path):
+    """Sort key putting pool before pool1 before pool2 ... before pool10"""
+    match = NAME_PATTERN.match(path.stem)
+    number = int(match.group(2)) if match.group(2) else 1
+    return (number, len(path.stem))
+
+
+def image_size(path, record=None):
+    """(width, height) from the derivatives record or the image header"""
+    if record and record.get('width'):
+        return record['width'], record['height']
+    if HAS_PIL:
+        try:
+            with Image.open(path) as img:
+                return img.size  # Only the header is read
+        except Exception:
+            pass
+    return None, None
+
+
+def preview_uri(path, width=PREVIEW_WIDTH, quality=PREVIEW_QUALITY):
+    """Data URI of a tiny WebP rendition of the image, or None without Pillow"""
+    if not HAS_PIL:
+        return None
+    try:
+        with Image.open(path) as img:
+            img.draft('RGB', (width * 4, width * 4))  # JPEGs decode at a fraction of full size
+            small = img.convert('RGB')
+            small.thumbnail((width, width * 4), Image.LANCZOS)
+        buffer = io.BytesIO()
+        small.save(buffer, 'WEBP', quality=quality, method=6)
+    except Exception:
+        return None
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def previous_previews(path):
+    """{sha256: preview} from an earlier manifest, so unchanged images are not decoded again"""
+    previews = {}
+    for option in load_records(path).get('options', {}).values():
+        for images in option.values():
+            previews.update({image['sha256']: image['preview'] for image in images if image.get('preview')})
+    return previews
+
+
+def build_manifest(images_dir=IMAGES_DIR):
+    """Return the manifest dict for the images currently on disk"""
+    site_root = images_dir.parent
+    derivatives = load_records(images_dir / RECORD_FILE.name)
+    previews = previous_previews(images_dir / MANIFEST_FILE.name)
+    options = {}
+    for path in gallery_images(images_dir):
+        match = NAME_PATTERN.match(path.stem)
+        if not match:
+            continue
+        option_num = path.parent.name.split('-', 1)[1]
+        image_type = match.group(1).lower()
+        options.setdefault(option_num, {}).setdefault(image_type, []).append(path)
+
+    manifest = {'options': {}}
+    for option_num in sorted(options, key=lambda n: (not n.isdigit(), int(n) if n.isdigit() else n)):
+        types = options[option_num]
+        ordered_types = [t for t in TYPE_ORDER if t in types] + sorted(set(types) - set(TYPE_ORDER))
+        entry = {}
+        for image_type in ordered_types:
+            images = []
+            for path in sorted(types[image_type], key=slot_key):
+                key = path.relative_to(images_dir).as_posix()
+                record = derivatives.get(key)
+                width, height = image_size(path, record)
+                images.append({
+                    'src': path.relative_to(site_root).as_posix(),
+                    'width': width,
+                    'height': height,
+                    'bytes': path.stat().st_size,
+                    'sha256': file_sha256(path),
+                    'variants': [
+                        {'width': v['width'], 'src': (images_dir / v['src']).relative_to(site_root).as_posix()}
+                        for v in (record or {}).get('variants', [])
+                    ],
+                })
+            first = images[0]
+            preview = previews.get(first['sha256']) or preview_uri(images_dir.parent / first['src'])
+            if preview:
+                first['preview'] = preview
+            entry[image_type] = images
+        manifest['options'][option_num] = entry
+    return manifest
+
+
+def write_manifest(images_dir=IMAGES_DIR):
+    """Build and atomically write images/manifest.json; return the manifest"""
+    manifest = build_manifest(images_dir)
+    path = images_dir / MANIFEST_FILE.name
+    write_atomic(path, (json.dumps(manifest, indent=2) + '\n').encode('utf-8'))
+    count = sum(len(images) for option in manifest['options'].values() for images in option.values())
+    print(f"  [+] Manifest: {count} images in {len(manifest['options'])} options -> {path}")
+    return manifest
+
+
+def main():
+    print("=" * 70)
+    print("Images Manifest")
+    print("=" * 70)
+    write_manifest()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Content-Addressed Image Store
+Every finished image is kept once under images/.store/<sha256>, and a
+persistent URL -> sha256 index remembers what each URL produced. Option
+folders get hardlinks into the store, so a photo that repeats within a
+gallery, across listings or across runs is fetched and stored only once.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+from image_convert import PARTIAL_SUFFIX  # Staging files are hidden and carry it until added
+
+# Configuration
+STORE_DIR = Path('images') / '.store'
+INDEX_NAME = 'index.json'
+
+
+class ImageStore:
+    """Blob store keyed by sha256 plus a URL -> sha256 index"""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / INDEX_NAME
+        self._lock = threading.Lock()
+        self._index = {}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[!] Ignoring unreadable store index {self.index_path}: {e}")
+
+    def blob_path(self, sha256):
+        return self.root / sha256
+
+    def staging_path(self):
+        """A fresh hidden path inside the store to write a new image to"""
+        return self.root / f'.{uuid.uuid4().hex}{PARTIAL_SUFFIX}'
+
+    @staticmethod
+    def key(url, variant=None):
+        """Index key for url; variant separates outputs of different encodings"""
+        return f'{variant} {url}' if variant else url
+
+    def knows(self, url):
+        """True if url was stored under any variant"""
+        return any(key == url or key.endswith(f' {url}') for key in self._index)
+
+    def lookup(self, url, variant=None):
+        """Return the sha256 stored for url, or None if it was never fetched"""
+        sha256 = self._index.get(self.key(url, variant))
+        if sha256 and self.blob_path(sha256).exists():
+            return sha256
+        return None
+
+    def urls(self):
+        """{url: sha256} for every indexed URL, whatever variant produced it"""
+        with self._lock:
+            return {key.split(' ', 1)[-1]: sha256 for key, sha256 in self._index.items()}
+
+    def add(self, path, sha256, url=None, variant=None):
+        """Move the file at path into the store as sha256 and index url
+
+        If the blob already exists the new copy is discarded.
+        """
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            Path(path).unlink(missing_ok=True)
+        else:
+            os.chmod(path, 0o644)  # mkstemp creates owner-only files
+            os.replace(path, blob)
+        if url:
+            with self._lock:
+                self._index[self.key(url, variant)] = sha256
+        return blob
+
+    def link(self, sha256, filepath):
+        """Point filepath at the blob; return False if it already did
+
+        Prefers a hardlink (a plain file to git and GitHub Pages), then a
+        symlink, then a copy. The swap is atomic via a temp name.
+        """
+        blob = self.blob_path(sha256)
+        filepath = Path(filepath)
+        if filepath.exists() and not filepath.is_symlink() and os.path.samefile(blob, filepath):
+            return False
+        if filepath.is_symlink() and filepath.resolve() == blob.resolve():
+            return False
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = filepath.parent / f'.{uuid.uuid4().hex}{PARTIAL_SUFFIX}'
+        try:
+            try:
+                os.link(blob, temp_path)
+            except OSError:
+                try:
+                    os.symlink(os.path.relpath(blob, filepath.parent), temp_path)
+                except OSError:
+                    shutil.copy2(blob, temp_path)
+            os.replace(temp_path, filepath)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return True
+
+    def save(self):
+        """Atomically write the URL index"""
+        with self._lock:
+            data = dict(self._index)
+        fd, temp_name = tempfile.mkstemp(dir=self.root, prefix='.', suffix=PARTIAL_SUFFIX)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(temp_name, self.index_path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
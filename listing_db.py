@@ -0,0 +1,314 @@
+"""
+Listing Database
+SQLite store for everything the scrapers learn: the listings, timestamped
+observations of each field (so prices and ratings keep their history),
+image URLs seen per listing and the downloaded blobs they resolved to.
+Writes are batched in transactions; lookups by listing, field and time are
+indexed. Importers load the JSON files earlier runs left behind.
+
+Usage:
+    python listing_db.py --import        # Load the existing JSON files
+    python listing_db.py --prices 5      # Price history for option 5
+    python listing_db.py --pending       # Image URLs not downloaded yet
+    python listing_db.py                 # Table sizes
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from image_store import STORE_DIR, ImageStore
+
+# Configuration
+DB_FILE = Path('listings.db')
+OBSERVED_FIELDS = ('title', 'price', 'rating', 'reviews', 'bedrooms', 'bathrooms', 'sleeps', 'sqft',
+                   'amenities', 'description')
+IMPORT_FILES = (  # Most trusted first: option numbers from later files never override earlier ones
+    ('vrbo_updated_data.json', 'records'),
+    ('image_download_results.json', 'summary'),
+    ('pool_images.json', 'image_lists'),
+    ('vrbo_images.json', 'image_lists'),
+    ('image_urls.json', 'url_lists'),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT PRIMARY KEY,
+    option INTEGER,
+    name TEXT,
+    url TEXT,
+    updated TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_option ON listings (option);
+
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    listing_id TEXT NOT NULL REFERENCES listings (listing_id),
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,      -- JSON for lists, the raw text otherwise
+    number REAL,              -- First number in value (price, rating, ...) for trends
+    observed TEXT NOT NULL,   -- UTC ISO timestamp
+    source TEXT,
+    UNIQUE (listing_id, field, observed)
+);
+CREATE INDEX IF NOT EXISTS observations_listing ON observations (listing_id, field, observed);
+CREATE INDEX IF NOT EXISTS observations_time ON observations (observed);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    bytes INTEGER,
+    added TEXT
+);
+
+CREATE TABLE IF NOT EXISTS image_urls (
+    listing_id TEXT NOT NULL REFERENCES listings (listing_id),
+    url TEXT NOT NULL,
+    sha256 TEXT REFERENCES blobs (sha256),   -- NULL until downloaded
+    first_seen TEXT,
+    last_seen TEXT,
+    source TEXT,
+    PRIMARY KEY (listing_id, url)
+);
+CREATE INDEX IF NOT EXISTS image_urls_url ON image_urls (url);
+CREATE INDEX IF NOT EXISTS image_urls_pending ON image_urls (sha256) WHERE sha256 IS NULL;
+CREATE INDEX IF NOT EXISTS image_urls_seen ON image_urls (last_seen);
+"""
+
+NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def utc_stamp(when=None):
+    when = when or datetime.now(timezone.utc)
+    return when.isoformat(timespec='seconds')
+
+
+def first_number(value):
+    match = NUMBER.search(value) if isinstance(value, str) else None
+    return float(match.group().replace(',', '')) if match else None
+
+
+class ListingDB:
+    """One SQLite connection; group writes with `with db.transaction():`"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+        self.conflicts = []  # (listing_id, name, kept option, rejected option, source)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything inside the block at once (or nothing on error)"""
+        with self.conn:
+            yield self.conn
+
+    # Writes ----------------------------------------------------------------
+
+    def upsert_listing(self, listing_id, name=None, option=None, url=None, source=''):
+        """Add or update a listing; an option already on record is never overridden"""
+        row = self.conn.execute('SELECT option, name FROM listings WHERE listing_id = ?',
+                                (listing_id,)).fetchone()
+        if row and row['option'] is not None and option is not None and row['option'] != option:
+            self.conflicts.append((listing_id, row['name'] or name, row['option'], option, source))
+            option = row['option']
+        self.conn.execute(
+            """INSERT INTO listings (listing_id, option, name, url, updated) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (listing_id) DO UPDATE SET
+                   option = COALESCE(listings.option, excluded.option),
+                   name = COALESCE(excluded.name, listings.name),
+                   url = COALESCE(excluded.url, listings.url),
+                   updated = excluded.updated""",
+            (listing_id, option, name or None, url or None, utc_stamp()))
+
+    def record_listing(self, record, observed=None, source=''):
+        """Store one vrbo_updated_data.json-shaped record as observations
+
+        observed defaults to the record's own 'fetched' stamps, then to now.
+        Empty fields are not observations and are skipped.
+        """
+        listing_id = record['listing_id']
+        self.upsert_listing(listing_id, record.get('name'), record.get('option'), record.get('url'), source)
+        if 'error' in record:
+            return 0
+        fetched = record.get('fetched') or {}
+        rows = []
+        for field in OBSERVED_FIELDS:
+            value = record.get(field)
+            if not value:
+                continue
+            text = json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else str(value)
+            when = observed or fetched.get(field) or utc_stamp()
+            rows.append((listing_id, field, text, first_number(text) if field != 'amenities' else None,
+                         when, source))
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO observations (listing_id, field, value, number, observed, source) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self.add_image_urls(listing_id, record.get('images') or [], source,
+                            observed or fetched.get('images'))
+        return len(rows)
+
+    def add_image_urls(self, listing_id, urls, source='', seen=None):
+        seen = seen or utc_stamp()
+        self.conn.executemany(
+            """INSERT INTO image_urls (listing_id, url, first_seen, last_seen, source) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (listing_id, url) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)""",
+            [(listing_id, url, seen, seen, source) for url in dict.fromkeys(urls)])
+
+    def add_blobs(self, url_to_sha256, blob_dir):
+        """Record downloaded blobs and link the image URLs that produced them"""
+        blobs = []
+        for sha256 in set(url_to_sha256.values()):
+            path = Path(blob_dir) / sha256
+            if path.exists():
+                stat = path.stat()
+                blobs.append((sha256, stat.st_size,
+                              utc_stamp(datetime.fromtimestamp(stat.st_mtime, timezone.utc))))
+        self.conn.executemany('INSERT OR IGNORE INTO blobs (sha256, bytes, added) VALUES (?, ?, ?)', blobs)
+        present = {sha256 for sha256, _, _ in blobs}
+        self.conn.executemany('UPDATE image_urls SET sha256 = ? WHERE url = ?',
+                              [(sha256, url) for url, sha256 in url_to_sha256.items() if sha256 in present])
+        return len(blobs)
+
+    def import_store(self, store):
+        """Link image URLs to the blobs of an image_store.ImageStore"""
+        return self.add_blobs(store.urls(), store.root)
+
+    # Queries ---------------------------------------------------------------
+
+    def history(self, option, field='price'):
+        """[(observed, value, number)] for one option's field, oldest first"""
+        return self.conn.execute(
+            """SELECT o.observed, o.value, o.number FROM observations o
+               JOIN listings l ON l.listing_id = o.listing_id
+               WHERE l.option = ? AND o.field = ? ORDER BY o.observed""", (option, field)).fetchall()
+
+    def latest(self, listing_id):
+        """{field: newest value} for a listing"""
+        rows = self.conn.execute(
+            """SELECT field, value FROM observations o
+               WHERE listing_id = ? AND observed = (
+                   SELECT MAX(observed) FROM observations
+                   WHERE listing_id = o.listing_id AND field = o.field)""", (listing_id,))
+        return {row['field']: row['value'] for row in rows}
+
+    def pending_images(self, listing_id=None):
+        """Image URLs seen but not yet downloaded"""
+        query = 'SELECT listing_id, url FROM image_urls WHERE sha256 IS NULL'
+        if listing_id:
+            return self.conn.execute(query + ' AND listing_id = ?', (listing_id,)).fetchall()
+        return self.conn.execute(query).fetchall()
+
+    def counts(self):
+        return {table: self.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('listings', 'observations', 'image_urls', 'blobs')}
+
+
+# Importers ---------------------------------------------------------------
+
+def _file_stamp(path):
+    return utc_stamp(datetime.fromtimestamp(os.path.getmtime(path), timezone.utc))
+
+
+def import_records(db, data, stamp, source):
+    """vrbo_updated_data.json: {listing_id: record}"""
+    return sum(db.record_listing(record, None if record.get('fetched') else stamp, source)
+               for record in data.values())
+
+
+def import_summary(db, data, stamp, source):
+    """image_download_results.json: listing names and options only"""
+    for listing_id, entry in data.items():
+        db.upsert_listing(listing_id, entry.get('name'), entry.get('option'), source=source)
+    return 0
+
+
+def import_image_lists(db, data, stamp, source):
+    """pool_images.json / vrbo_images.json: {listing_id: {name, option, images}}"""
+    count = 0
+    for listing_id, entry in data.items():
+        db.upsert_listing(listing_id, entry.get('name'), entry.get('option'), source=source)
+        db.add_image_urls(listing_id, entry.get('images') or [], source, stamp)
+        count += len(entry.get('images') or [])
+    return count
+
+
+def import_url_lists(db, data, stamp, source):
+    """image_urls.json: {listing_id: [url, ...]}"""
+    count = 0
+    for listing_id, urls in data.items():
+        db.upsert_listing(listing_id, source=source)
+        db.add_image_urls(listing_id, urls, source, stamp)
+        count += len(urls)
+    return count
+
+
+IMPORTERS = {
+    'records': import_records,
+    'summary': import_summary,
+    'image_lists': import_image_lists,
+    'url_lists': import_url_lists,
+}
+
+
+def import_all(db, files=IMPORT_FILES):
+    """Load every JSON file that exists, each in one transaction"""
+    for name, kind in files:
+        if not Path(name).exists():
+            continue
+        with open(name, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with db.transaction():
+            count = IMPORTERS[kind](db, data, _file_stamp(name), name)
+        print(f"  [+] {name}: {len(data)} listings, {count} rows")
+    for listing_id, name, kept, rejected, source in db.conflicts:
+        print(f"  [!] {source} has {name} ({listing_id}) as option {rejected}; keeping option {kept}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite store of listing observations and images')
+    parser.add_argument('--db', default=str(DB_FILE))
+    parser.add_argument('--import', dest='do_import', action='store_true', help='Load the existing JSON files')
+    parser.add_argument('--prices', type=int, metavar='OPTION', help='Price history for an option')
+    parser.add_argument('--pending', action='store_true', help='Image URLs not downloaded yet')
+    args = parser.parse_args()
+
+    with ListingDB(args.db) as db:
+        if args.do_import:
+            print(f"[*] Importing JSON files into {args.db}")
+            import_all(db)
+            if STORE_DIR.exists():
+                with db.transaction():
+                    print(f"  [+] image store: {db.import_store(ImageStore())} blobs")
+        if args.prices is not None:
+            rows = db.history(args.prices, 'price')
+            print(f"[*] Price history for option {args.prices}: {len(rows)} observations")
+            for row in rows:
+                print(f"  {row['observed']}  {row['value']}")
+        if args.pending:
+            rows = db.pending_images()
+            print(f"[*] {len(rows)} image URLs not downloaded yet")
+            for row in rows:
+                print(f"  {row['listing_id']}  {row['url']}")
+        print("[=] " + ", ".join(f"{table}: {count}" for table, count in db.counts().items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""
+Listing Field Extraction
+The selector lists for each listing field, the in-browser script that reads
+them in one round trip, and the same extraction done offline on saved HTML
+(selectolax when installed, otherwise the standard library parser). Embedded
+JSON blobs (JSON-LD, application/json scripts, window.X = JSON.parse(...))
+fill any field the page markup left empty; fields_from_data() reads the
+same fields from captured JSON/GraphQL responses.
+"""
+
+import json
+import re
+from html.parser import HTMLParser
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+# Fallback selectors per field, tried in order inside the page
+FIELD_SELECTORS = {
+    'title': [
+        'h1[data-testid="property-title"]',
+        'h1',
+        '[data-testid="property-name"]',
+        '.property-title'
+    ],
+    'price': [
+        '[data-testid="price-summary-total"]',
+        '[data-testid="price"]',
+        '.price',
+        '[class*="price"]'
+    ],
+    'rating': [
+        '[data-testid="rating"]',
+        '[class*="rating"]',
+        '[class*="review"]'
+    ],
+    'details': [
+        '[data-testid="property-details"]',
+        '[class*="property-detail"]',
+        '[class*="bedroom"]',
+        '[class*="bathroom"]'
+    ],
+    'amenities': [
+        '[data-testid="amenity"]',
+        '[class*="amenity"]',
+        '[class*="feature"]'
+    ],
+    'description': [
+        '[data-testid="property-description"]',
+        '[class*="description"]',
+        '[class*="overview"]'
+    ],
+}
+MAX_AMENITIES_PER_SELECTOR = 20
+MAX_AMENITY_LENGTH = 100
+MAX_DESCRIPTION_LENGTH = 500
+MAX_IMAGES = 20
+IMAGE_HOSTS = ('trvl-media.com', 'vrbo', 'expedia')
+IMAGE_EXCLUDE = ('logo', 'icon', 'avatar')
+CHALLENGE_TITLES = ('bot or not?',)  # Served instead of the listing when the visit is flagged
+
+# Runs in the page and returns every field in one round trip, with
+# EXTRACT_ARGS as its argument. Each field keeps the fallback semantics of
+# the selector lists above.
+EXTRACT_SCRIPT = """
+    ({selectors, limits, imageHosts, imageExclude}) => {
+        const record = {};
+        const text = (el) => (el.innerText || '');
+        const field = (fn) => {
+            try { fn(); } catch (e) { /* Leave the field empty, like a missing element */ }
+        };
+
+        // First selector that matches wins
+        const first = (name, limit) => {
+            for (const selector of selectors[name]) {
+                const el = document.querySelector(selector);
+                if (el) {
+                    const value = text(el).trim();
+                    return limit ? value.slice(0, limit) : value;
+                }
+            }
+            return '';
+        };
+        field(() => { record.title = first('title'); });
+        field(() => { record.price = first('price'); });
+        field(() => { record.description = first('description', limits.description); });
+
+        // First star/rating text of each selector; later selectors take precedence
+        field(() => {
+            for (const selector of selectors.rating) {
+                for (const el of document.querySelectorAll(selector)) {
+                    const value = text(el);
+                    if (value.includes('\\u2605') || value.toLowerCase().includes('rating')) {
+                        record.rating = value.trim();
+                        break;
+                    }
+                }
+            }
+        });
+
+        // Bedrooms / bathrooms / sleeps / sqft from any detail element
+        field(() => {
+            for (const selector of selectors.details) {
+                for (const el of document.querySelectorAll(selector)) {
+                    const value = text(el).toLowerCase();
+                    if (value.includes('bedroom')) record.bedrooms = value.trim();
+                    else if (value.includes('bath')) record.bathrooms = value.trim();
+                    else if (value.includes('sleep')) record.sleeps = value.trim();
+                    else if (value.includes('sq') || value.includes('square')) record.sqft = value.trim();
+                }
+            }
+        });
+
+        // A few elements per selector, reasonable amenity length only
+        field(() => {
+            record.amenities = [];
+            for (const selector of selectors.amenities) {
+                const elements = [...document.querySelectorAll(selector)].slice(0, limits.amenitiesPerSelector);
+                for (const el of elements) {
+                    const value = text(el).trim();
+                    if (value && value.length < limits.amenityLength) record.amenities.push(value);
+                }
+            }
+        });
+
+        field(() => {
+            const images = [];
+            document.querySelectorAll('img').forEach(img => {
+                const src = img.src || img.getAttribute('data-src') || img.getAttribute('data-lazy-src');
+                if (src && imageHosts.some(host => src.includes(host))
+                        && !imageExclude.some(part => src.includes(part))) {
+                    images.push(src);
+                }
+            });
+            record.images = [...new Set(images)].slice(0, limits.images); // Unique URLs only
+        });
+
+        return record;
+    }
+"""
+EXTRACT_ARGS = {
+    'selectors': FIELD_SELECTORS,
+    'limits': {
+        'description': MAX_DESCRIPTION_LENGTH,
+        'amenitiesPerSelector': MAX_AMENITIES_PER_SELECTOR,
+        'amenityLength': MAX_AMENITY_LENGTH,
+        'images': MAX_IMAGES,
+    },
+    'imageHosts': IMAGE_HOSTS,
+    'imageExclude': IMAGE_EXCLUDE,
+}
+
+
+def new_record(listing_id, name, option_num, url=''):
+    """Empty listing record in the vrbo_updated_data.json shape"""
+    return {
+        'listing_id': listing_id,
+        'name': name,
+        'option': option_num,
+        'url': url,
+        'title': '',
+        'price': '',
+        'rating': '',
+        'reviews': '',
+        'bedrooms': '',
+        'bathrooms': '',
+        'sleeps': '',
+        'sqft': '',
+        'amenities': [],
+        'description': '',
+        'images': []
+    }
+
+
+# Offline parsing ----------------------------------------------------------
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+HIDDEN_TAGS = {'script', 'style', 'noscript', 'template'}
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+|\[[^\]]+\])*)$')
+SELECTOR_PART = re.compile(r'\.([\w-]+)|\[([\w-]+)(?:([*^$~]?=)"([^"]*)")?\]')
+
+
+class _Element:
+    """Minimal stand-in for a selectolax node: tag, attributes, text()"""
+
+    __slots__ = ('tag', 'attributes', 'children')
+
+    def __init__(self, tag, attributes):
+        self.tag = tag
+        self.attributes = attributes
+        self.children = []
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, _Element):
+                yield child
+                yield from child.iter()
+
+    def text(self, separator=''):
+        parts = []
+        for child in self.children:
+            if isinstance(child, str):
+                parts.append(child)
+            elif child.tag not in HIDDEN_TAGS:
+                parts.append(child.text(separator))
+        return separator.join(parts)
+
+    def raw_text(self):
+        return ''.join(child for child in self.children if isinstance(child, str))
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Element('#document', {})
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        element = _Element(tag, {name: value or '' for name, value in attrs})
+        self.stack[-1].children.append(element)
+        if tag not in VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].children.append(_Element(tag, {name: value or '' for name, value in attrs}))
+
+    def handle_endtag(self, tag):
+        # Close back to the matching open tag; stray end tags are ignored
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                break
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def _compile_selector(selector):
+    """Predicate for a simple selector: tag, .class, [attr], [attr="v"], [attr*="v"] ..."""
+    match = SIMPLE_SELECTOR.match(selector.strip())
+    if not match:
+        raise ValueError(f"Unsupported selector: {selector}")
+    tag = match.group(1).lower() if match.group(1) else None
+    tests = []
+    for cls, name, op, value in SELECTOR_PART.findall(match.group(2)):
+        if cls:
+            tests.append(lambda el, c=cls: c in el.attributes.get('class', '').split())
+        elif not op:
+            tests.append(lambda el, n=name: n in el.attributes)
+        else:
+            check = {
+                '=': lambda a, v: a == v,
+                '*=': lambda a, v: v in a,
+                '^=': lambda a, v: a.startswith(v),
+                '$=': lambda a, v: a.endswith(v),
+                '~=': lambda a, v: v in a.split(),
+            }[op]
+            tests.append(lambda el, n=name, v=value, f=check: n in el.attributes and f(el.attributes[n], v))
+    return lambda el: (tag is None or el.tag == tag) and all(test(el) for test in tests)
+
+
+class _StdlibPage:
+    """The parts of the selectolax document API the offline extractor uses"""
+
+    def __init__(self, html):
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        self.root = builder.root
+        self._elements = list(self.root.iter())
+
+    def css(self, selector):
+        matches = _compile_selector(selector)
+        return [el for el in self._elements if matches(el)]
+
+    def css_first(self, selector):
+        matches = _compile_selector(selector)
+        return next((el for el in self._elements if matches(el)), None)
+
+    def scripts(self):
+        return [(el.attributes, el.raw_text()) for el in self._elements if el.tag == 'script']
+
+
+class _LexborPage:
+    def __init__(self, html):
+        self.tree = LexborHTMLParser(html)
+        self._scripts = [(dict(node.attributes), node.text()) for node in self.tree.css('script')]
+        self.tree.strip_tags(list(HIDDEN_TAGS))  # innerText never includes them
+
+    def css(self, selector):
+        return self.tree.css(selector)
+
+    def css_first(self, selector):
+        return self.tree.css_first(selector)
+
+    def scripts(self):
+        return self._scripts
+
+
+def parse_html(html):
+    """Parse saved page HTML with the fastest available backend"""
+    return _LexborPage(html) if HAS_SELECTOLAX else _StdlibPage(html)
+
+
+def inner_text(node):
+    """Approximate element.innerText: visible text, whitespace collapsed"""
+    return ' '.join(node.text(separator=' ').split())
+
+
+def attribute(node, name):
+    return (node.attributes.get(name) or '') if node is not None else ''
+
+
+EMBEDDED_JSON_PARSE = re.compile(r'window\.([\w$]+)\s*=\s*JSON\.parse\(("(?:[^"\\]|\\.)*")\)')
+EMBEDDED_OBJECT = re.compile(r'window\.([\w$]+)\s*=\s*(?=[{\[])')
+
+
+def structured_data(page):
+    """Embedded JSON blobs: {'ld+json': [...], '<script id>': data, 'window.X': data}"""
+    blobs = {'ld+json': []}
+    decoder = json.JSONDecoder()
+    for attrs, text in page.scripts():
+        script_type = (attrs.get('type') or '').lower()
+        try:
+            if script_type == 'application/ld+json':
+                data = json.loads(text)
+                blobs['ld+json'].extend(data if isinstance(data, list) else [data])
+            elif script_type == 'application/json':
+                blobs[attrs.get('id') or f'json-{len(blobs)}'] = json.loads(text)
+            elif not attrs.get('src'):
+                for match in EMBEDDED_JSON_PARSE.finditer(text):
+                    blobs[f'window.{match.group(1)}'] = json.loads(json.loads(match.group(2)))
+                for match in EMBEDDED_OBJECT.finditer(text):
+                    blobs[f'window.{match.group(1)}'], _ = decoder.raw_decode(text, match.end())
+        except ValueError:
+            continue  # Not JSON after all (or truncated); the markup still counts
+    return blobs
+
+
+def _ld_listing(blobs):
+    """The first JSON-LD node that describes a lodging/rental, if any"""
+    for node in blobs['ld+json']:
+        for item in node.get('@graph', [node]) if isinstance(node, dict) else []:
+            kinds = item.get('@type', '')
+            kinds = kinds if isinstance(kinds, list) else [kinds]
+            if any(k in ('VacationRental', 'LodgingBusiness', 'Accommodation', 'House', 'Product',
+                         'Hotel', 'Residence') for k in kinds):
+                return item
+    return {}
+
+
+def _fill_from_structured(data, blobs):
+    """Fill fields the markup left empty from schema.org JSON-LD"""
+    ld = _ld_listing(blobs)
+    if not ld:
+        return
+    rating = ld.get('aggregateRating') or {}
+    occupancy = ld.get('occupancy') or {}
+    images = ld.get('image') or []
+    images = images if isinstance(images, list) else [images]
+    found = {
+        'title': ld.get('name', ''),
+        'description': (ld.get('description') or '')[:MAX_DESCRIPTION_LENGTH],
+        'rating': str(rating.get('ratingValue', '')),
+        'reviews': str(rating.get('reviewCount', '') or rating.get('ratingCount', '')),
+        'bedrooms': str(ld.get('numberOfBedrooms', '') or ld.get('numberOfRooms', '')),
+        'bathrooms': str(ld.get('numberOfBathroomsTotal', '')),
+        'sleeps': str(occupancy.get('maxValue', '') if isinstance(occupancy, dict) else occupancy),
+        'amenities': [a.get('name', '') for a in ld.get('amenityFeature', []) if isinstance(a, dict)],
+        'images': [i.get('url', '') if isinstance(i, dict) else i for i in images][:MAX_IMAGES],
+    }
+    for key, value in found.items():
+        if value and not data[key]:
+            data[key] = value
+
+
+# Keys that carry each field in the site's JSON/GraphQL data responses,
+# most specific first. Values may be scalars or {formatted/amount/value} objects.
+DATA_KEYS = {
+    'price': ('totalPriceFormatted', 'formattedTotalPrice', 'totalPrice', 'displayPrice', 'formattedPrice',
+              'priceTotal'),
+    'rating': ('averageOverallRating', 'overallScore', 'reviewScore', 'ratingValue', 'averageRating'),
+    'reviews': ('reviewCount', 'totalReviewCount', 'reviewsCount'),
+    'bedrooms': ('bedroomCount', 'bedrooms', 'numberOfBedrooms'),
+    'bathrooms': ('bathroomCount', 'bathrooms', 'numberOfBathrooms'),
+    'sleeps': ('maxOccupancy', 'sleeps', 'maxGuests'),
+    'sqft': ('squareFootage', 'livingArea', 'floorSize'),
+}
+SCALAR_KEYS = ('formatted', 'displayValue', 'text', 'amount', 'value')
+# Keys naming the listing an object describes. Responses also carry other
+# listings (similar properties, recommendations), so only objects carrying
+# the visited listing's id are read.
+ID_KEYS = ('listingId', 'propertyId', 'id')
+LISTING_ID = re.compile(r'^[\d.]+$')  # '4146676', or dotted forms such as '321.4146676.1234'
+
+
+def _scalar(value):
+    if isinstance(value, dict):
+        for key in SCALAR_KEYS:
+            if isinstance(value.get(key), (str, int, float)) and not isinstance(value.get(key), bool):
+                return str(value[key])
+        return ''
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value)
+    return ''
+
+
+def _listing_ids(node):
+    """Listing ids an object declares under ID_KEYS (other ids, e.g. of reviews, are ignored)"""
+    ids = set()
+    for key in ID_KEYS:
+        value = node.get(key)
+        if isinstance(value, (str, int)) and not isinstance(value, bool) and LISTING_ID.match(str(value)):
+            ids.add(str(value))
+    return ids
+
+
+def _is_listing(ids, listing_id):
+    return any(value == listing_id or listing_id in value.split('.') for value in ids)
+
+
+def _find_keys(node, keys, found, listing_id, inside=False):
+    """Depth-first: record the first usable value of each key in keys
+
+    Values count only inside an object carrying listing_id; subtrees of
+    objects declaring another listing are skipped.
+    """
+    if isinstance(node, dict):
+        ids = _listing_ids(node)
+        if ids:
+            if not _is_listing(ids, listing_id):
+                return
+            inside = True
+        for key, value in node.items():
+            if inside and key in keys and key not in found:
+                text = _scalar(value).strip()
+                if text:
+                    found[key] = text
+            _find_keys(value, keys, found, listing_id, inside)
+    elif isinstance(node, list):
+        for item in node:
+            _find_keys(item, keys, found, listing_id, inside)
+
+
+def fields_from_data(responses, listing_id):
+    """Listing fields from captured JSON data responses ([{url, status, body}])
+
+    Only objects carrying listing_id are read. Returns {field: text} for
+    the fields found; missing fields are absent.
+    """
+    wanted = {key for keys in DATA_KEYS.values() for key in keys}
+    found = {}
+    for response in responses:
+        _find_keys(response.get('body'), wanted, found, str(listing_id))
+    fields = {}
+    for field, keys in DATA_KEYS.items():
+        for key in keys:
+            if key in found:
+                fields[field] = found[key]
+                break
+    return fields
+
+
+def is_challenge_page(page):
+    """True for the bot-check page served instead of a listing"""
+    title = page.css_first('title')
+    return title is not None and inner_text(title).lower() in CHALLENGE_TITLES
+
+
+def extract_from_html(html, listing_id, name, option_num, url=''):
+    """Offline equivalent of EXTRACT_SCRIPT over saved page HTML
+
+    Returns the record in the vrbo_updated_data.json shape. A bot-check
+    page gets an 'error' entry instead of fields.
+    """
+    data = new_record(listing_id, name, option_num, url)
+    page = parse_html(html)
+    if is_challenge_page(page):
+        data['error'] = 'bot check page, no listing content'
+        return data
+
+    def first(field, limit=None):
+        for selector in FIELD_SELECTORS[field]:
+            node = page.css_first(selector)
+            if node is not None:
+                return inner_text(node)[:limit]
+        return ''
+
+    data['title'] = first('title')
+    data['price'] = first('price')
+    data['description'] = first('description', MAX_DESCRIPTION_LENGTH)
+
+    for selector in FIELD_SELECTORS['rating']:
+        for node in page.css(selector):
+            text = inner_text(node)
+            if '★' in text or 'rating' in text.lower():
+                data['rating'] = text
+                break
+
+    for selector in FIELD_SELECTORS['details']:
+        for node in page.css(selector):
+            text = inner_text(node).lower()
+            if 'bedroom' in text:
+                data['bedrooms'] = text
+            elif 'bath' in text:
+                data['bathrooms'] = text
+            elif 'sleep' in text:
+                data['sleeps'] = text
+            elif 'sq' in text or 'square' in text:
+                data['sqft'] = text
+
+    for selector in FIELD_SELECTORS['amenities']:
+        for node in page.css(selector)[:MAX_AMENITIES_PER_SELECTOR]:
+            text = inner_text(node)
+            if text and len(text) < MAX_AMENITY_LENGTH:
+                data['amenities'].append(text)
+
+    images = []
+    for node in page.css('img'):
+        src = attribute(node, 'src') or attribute(node, 'data-src') or attribute(node, 'data-lazy-src')
+        if src and any(host in src for host in IMAGE_HOSTS) and not any(x in src for x in IMAGE_EXCLUDE):
+            images.append(src)
+    data['images'] = list(dict.fromkeys(images))[:MAX_IMAGES]
+
+    _fill_from_structured(data, structured_data(page))
+    return data
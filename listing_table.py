@@ -0,0 +1,267 @@
+"""
+Listing Table
+Normalizes scraped listing records once - price, rating, rooms, sleeps and
+square feet parsed from their display strings into numbers - and keeps
+them in a NumPy structured array. Ranking, per-person cost and top-k then
+run as vectorized column math, never re-parsing strings; the parsed table
+is cached next to the JSON it came from.
+
+Usage:
+    python listing_table.py                         # Rank for 14 travelers
+    python listing_table.py --travelers 10 --top 3
+    python listing_table.py --weights price=-2,rating=1,sleeps=0.5
+"""
+
+import argparse
+import ast
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+from image_convert import PARTIAL_SUFFIX
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Configuration
+DATA_FILE = Path('vrbo_updated_data.json')
+CACHE_SUFFIX = '.v2.npy'  # vrbo_updated_data.json -> vrbo_updated_data.v2.npy; bump when parsing changes
+TRAVELERS = 14
+NIGHTS = 2
+RATING_SCALE = 10
+FIVE_POINT_MAX = 5  # A bare rating up to this is on a 5-point scale (schema.org style '4.8')
+# Weight per column for rank(); negative means lower is better. Columns are
+# z-scored first, so weights compare directly whatever the units.
+DEFAULT_WEIGHTS = {
+    'price': -1.0,
+    'rating': 1.0,
+    'bedrooms': 0.3,
+    'bathrooms': 0.2,
+    'sleeps': 0.2,
+    'amenities': 0.1,
+}
+NUMERIC_FIELDS = ('price', 'rating', 'reviews', 'bedrooms', 'bathrooms', 'sleeps', 'sqft', 'amenities', 'images')
+
+if HAS_NUMPY:
+    DTYPE = np.dtype([('listing_id', 'U16'), ('option', 'i4')] + [(field, 'f8') for field in NUMERIC_FIELDS])
+
+NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+RATING_OUT_OF = re.compile(r'(\d+(?:\.\d+)?)\s*(?:/|out of)\s*(\d+)')
+UNIT_PATTERNS = {
+    'bedrooms': re.compile(r'(\d+(?:\.\d+)?)\s*(?:bedrooms?|br\b)', re.IGNORECASE),
+    'bathrooms': re.compile(r'(\d+(?:\.\d+)?)\s*(?:bathrooms?|baths?|ba\b)', re.IGNORECASE),
+    'sleeps': re.compile(r'sleeps\s*(\d+)', re.IGNORECASE),
+    'sqft': re.compile(r'([\d,]+)\s*(?:sq\.?\s*ft|square feet)', re.IGNORECASE),
+    'reviews': re.compile(r'([\d,]+)\s*reviews?', re.IGNORECASE),
+}
+
+
+# Normalization -------------------------------------------------------------
+
+def parse_number(value):
+    """First number in value ('$3,282 total' -> 3282.0); NaN if there is none"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = NUMBER.search(value) if isinstance(value, str) else None
+    return float(match.group().replace(',', '')) if match else math.nan
+
+
+def parse_rating(value):
+    """Rating on a 0-10 scale ('4.8/5' -> 9.6, '8.4/10 Very good' -> 8.4)
+
+    Without an explicit scale, numbers up to FIVE_POINT_MAX are read as out
+    of 5 ('4.8' -> 9.6) and larger ones as out of 10. Above 10 it is NaN.
+    """
+    if isinstance(value, str):
+        match = RATING_OUT_OF.search(value)
+        if match:
+            return float(match.group(1)) * RATING_SCALE / float(match.group(2))
+    rating = parse_number(value)
+    if rating <= FIVE_POINT_MAX:
+        return rating * RATING_SCALE / FIVE_POINT_MAX
+    return rating if rating <= RATING_SCALE else math.nan
+
+
+def parse_list(value):
+    """A list field that may have been saved as its string form ('[]', "['a', 'b']")"""
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return []
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            parsed = parse(value)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(parsed, list):
+            return parsed
+    return []
+
+
+def parse_unit(field, *texts):
+    """Number labeled by its unit in any of texts ('6 BR / 4.5 BA', 'Sleeps 32')"""
+    for text in texts:
+        if isinstance(text, (int, float)) and not isinstance(text, bool):
+            return float(text)
+        if not isinstance(text, str) or not text:
+            continue
+        match = UNIT_PATTERNS[field].search(text)
+        if match:
+            return float(match.group(1).replace(',', ''))
+    return math.nan
+
+
+def normalize(record):
+    """One record -> dict of typed values for DTYPE (NaN where unknown)
+
+    The field's own value is used first; unit-labeled numbers in the title
+    and description fill rooms, sleeps and size when it is empty.
+    """
+    text = ' '.join(str(record.get(key) or '') for key in ('title', 'description'))
+    option = parse_number(record.get('option'))
+    row = {
+        'listing_id': str(record.get('listing_id', '')),
+        'option': -1 if math.isnan(option) else int(option),
+        'price': parse_number(record.get('price')),
+        'rating': parse_rating(record.get('rating')),
+        'amenities': float(len(parse_list(record.get('amenities')))),
+        'images': float(len(parse_list(record.get('images')))),
+    }
+    for field in ('reviews', 'bedrooms', 'bathrooms', 'sleeps', 'sqft'):
+        own = record.get(field)
+        row[field] = parse_number(own) if own not in (None, '') else math.nan
+        if math.isnan(row[field]):
+            row[field] = parse_unit(field, text)
+    return row
+
+
+# Table ---------------------------------------------------------------------
+
+class ListingTable:
+    """Columnar listing data; every method is vectorized over all rows"""
+
+    def __init__(self, rows):
+        self.rows = rows  # NumPy structured array of DTYPE
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from {listing_id: record} or a list of records (parses once)"""
+        if isinstance(records, dict):
+            records = [dict(record, listing_id=record.get('listing_id', key)) for key, record in records.items()]
+        normalized = [normalize(record) for record in records]
+        rows = np.array([tuple(row[name] for name in DTYPE.names) for row in normalized], dtype=DTYPE)
+        return cls(rows)
+
+    @classmethod
+    def load(cls, path=DATA_FILE):
+        """Table for a JSON data file, from its .npy cache when that is newer"""
+        path = Path(path)
+        cache = path.with_suffix(CACHE_SUFFIX)
+        if cache.exists() and cache.stat().st_mtime >= path.stat().st_mtime:
+            rows = np.load(cache, allow_pickle=False)
+            if rows.dtype == DTYPE:
+                return cls(rows)
+        with open(path, 'r', encoding='utf-8') as f:
+            table = cls.from_records(json.load(f))
+        table.save(cache)
+        return table
+
+    def save(self, path):
+        temp = Path(path).with_name(f'.{Path(path).name}{PARTIAL_SUFFIX}')
+        with open(temp, 'wb') as f:
+            np.save(f, self.rows, allow_pickle=False)
+        os.replace(temp, path)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, name):
+        return self.rows[name]
+
+    def per_person(self, travelers=TRAVELERS):
+        """Total price split over travelers (NaN where the price is unknown)"""
+        return self.rows['price'] / max(1, travelers)
+
+    def per_person_night(self, travelers=TRAVELERS, nights=NIGHTS):
+        return self.per_person(travelers) / max(1, nights)
+
+    def fits(self, travelers=TRAVELERS):
+        """True where the listing sleeps at least travelers (unknown capacity counts as fitting)"""
+        sleeps = self.rows['sleeps']
+        return np.isnan(sleeps) | (sleeps >= travelers)
+
+    def score(self, weights=None):
+        """Weighted sum of z-scored columns; a missing value scores as the column mean"""
+        weights = DEFAULT_WEIGHTS if weights is None else weights
+        total = np.zeros(len(self.rows))
+        for name, weight in weights.items():
+            values = self.rows[name]
+            known = ~np.isnan(values)
+            if not weight or not known.any():
+                continue
+            mean = values[known].mean()
+            spread = values[known].std() or 1.0
+            total += weight * np.where(known, (values - mean) / spread, 0.0)
+        return total
+
+    def rank(self, weights=None, travelers=None, k=None):
+        """Row indexes best first; with travelers, listings too small are left out
+
+        With k, only the top k are selected (argpartition) before sorting.
+        """
+        scores = self.score(weights)
+        candidates = np.flatnonzero(self.fits(travelers)) if travelers else np.arange(len(scores))
+        if k is not None and k < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def top(self, k=5, weights=None, travelers=TRAVELERS):
+        """[(row, score, per-person cost)] for the k best listings"""
+        scores = self.score(weights)
+        per_person = self.per_person(travelers)
+        return [(self.rows[i], float(scores[i]), float(per_person[i]))
+                for i in self.rank(weights, travelers, k)]
+
+
+def parse_weights(text):
+    """'price=-2,rating=1' -> {'price': -2.0, 'rating': 1.0}"""
+    weights = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, value = part.partition('=')
+        if name not in NUMERIC_FIELDS:
+            raise ValueError(f"Unknown column {name!r} (choose from {', '.join(NUMERIC_FIELDS)})")
+        weights[name] = float(value)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank listings from the normalized listing table')
+    parser.add_argument('--data', default=str(DATA_FILE))
+    parser.add_argument('--travelers', type=int, default=TRAVELERS)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--weights', type=parse_weights, default=None, help='e.g. price=-2,rating=1')
+    args = parser.parse_args()
+
+    if not HAS_NUMPY:
+        print("[!] NumPy not installed. Install with: pip install numpy")
+        return
+
+    table = ListingTable.load(args.data)
+    print(f"[*] {len(table)} listings, ranked for {args.travelers} travelers")
+
+    def fmt(value, spec):
+        return '-' if math.isnan(value) else format(value, spec)
+
+    for place, (row, score, per_person) in enumerate(table.top(args.top, args.weights, args.travelers), 1):
+        print(f"  {place}. Option {row['option']} ({row['listing_id']}): score {score:+.2f}, "
+              f"price {fmt(row['price'], ',.0f')}, ~{fmt(per_person, ',.0f')}/person, "
+              f"rating {fmt(row['rating'], '.1f')}, sleeps {fmt(row['sleeps'], '.0f')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Minify
+Dependency-free minifiers for the page's own HTML, CSS and JavaScript.
+They only remove what cannot change behavior: comments and layout
+whitespace. Strings, template literals, regex literals, <pre> and
+<textarea> are copied exactly, and JavaScript keeps a line break wherever
+one could matter to automatic semicolon insertion.
+"""
+
+import re
+
+# HTML elements whose surrounding whitespace never renders
+BLOCK_TAGS = frozenset('''
+    html head body header footer main section article nav aside div p h1 h2 h3 h4 h5 h6
+    ul ol li dl dt dd table thead tbody tfoot tr td th caption title meta link script style
+    noscript br hr figure figcaption form fieldset legend details summary template
+'''.split())
+# Opening characters after which a '/' starts a regex literal rather than a division
+REGEX_AFTER = frozenset('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = frozenset(('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                            'throw', 'case', 'do', 'else', 'yield', 'await'))
+WORD = re.compile(r'[\w$]')
+
+HTML_TOKEN = re.compile(
+    r'(<!--.*?-->|<(pre|textarea|script|style)\b[^>]*>.*?</\2\s*>|<[^>]+>)', re.DOTALL | re.IGNORECASE)
+TAG_NAME = re.compile(r'</?([a-zA-Z][\w-]*)')
+CSS_SPACE_AROUND = re.compile(r'\s*([{};,>])\s*')
+CSS_SPACE_AFTER_COLON = re.compile(r':\s+')
+
+
+# CSS -----------------------------------------------------------------------
+
+def _css_pieces(css):
+    """(is_string, text) pieces of css with comments dropped"""
+    pieces, code, i = [], [], 0
+    while i < len(css):
+        char = css[i]
+        if css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = len(css) if end < 0 else end + 2
+            code.append(' ')
+        elif char in '"\'':
+            end = _string_end(css, i)
+            pieces.append((False, ''.join(code)))
+            pieces.append((True, css[i:end]))
+            code, i = [], end
+        else:
+            code.append(char)
+            i += 1
+    pieces.append((False, ''.join(code)))
+    return pieces
+
+
+def minify_css(css):
+    out = []
+    for is_string, text in _css_pieces(css):
+        if not is_string:
+            text = re.sub(r'\s+', ' ', text)
+            text = CSS_SPACE_AROUND.sub(r'\1', text)
+            text = CSS_SPACE_AFTER_COLON.sub(':', text).replace(';}', '}')
+        out.append(text)
+    return ''.join(out).strip()
+
+
+def css_blocks(css):
+    """Top-level (prelude, body) pairs of a stylesheet, e.g. ('.a,.b', 'color:red')
+
+    The body of an @media block is itself a stylesheet. Block-less
+    statements (@import, @charset) come back with a body of None.
+    """
+    blocks, depth, start, body_start, i = [], 0, 0, 0, 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i = _string_end(css, i)
+            continue
+        if char == ';' and not depth:
+            blocks.append((css[start:i].strip(), None))
+            start = i + 1
+        elif char == '{':
+            if not depth:
+                body_start = i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if not depth:
+                blocks.append((css[start:body_start - 1].strip(), css[body_start:i]))
+                start = i + 1
+        i += 1
+    return blocks
+
+
+# JavaScript ----------------------------------------------------------------
+
+def _string_end(src, i):
+    """Index just past the quoted string starting at src[i]"""
+    quote, i = src[i], i + 1
+    while i < len(src) and src[i] != quote:
+        i += 2 if src[i] == '\\' else 1
+    return i + 1
+
+
+def _template_end(src, i):
+    """Index just past the template literal starting at src[i] (with ${...} inside)"""
+    i += 1
+    while i < len(src) and src[i] != '`':
+        if src[i] == '\\':
+            i += 2
+        elif src.startswith('${', i):
+            i = _expression_end(src, i + 2)
+        else:
+            i += 1
+    return i + 1
+
+
+def _expression_end(src, i):
+    """Index just past the '}' closing a ${ expression that starts at src[i]"""
+    depth = 1
+    while i < len(src):
+        char = src[i]
+        if char in '"\'':
+            i = _string_end(src, i)
+            continue
+        if char == '`':
+            i = _template_end(src, i)
+            continue
+        depth += {'{': 1, '}': -1}.get(char, 0)
+        i += 1
+        if not depth:
+            break
+    return i
+
+
+def _regex_end(src, i):
+    """Index just past the regex literal (and its flags) starting at src[i]"""
+    i += 1
+    in_class = False
+    while i < len(src) and (in_class or src[i] != '/'):
+        if src[i] == '\\':
+            i += 1
+        elif src[i] == '[':
+            in_class = True
+        elif src[i] == ']':
+            in_class = False
+        i += 1
+    i += 1
+    while i < len(src) and WORD.match(src[i]):
+        i += 1
+    return i
+
+
+def _starts_regex(out):
+    """True when a '/' following the minified output so far begins a regex"""
+    code = ''.join(out[-8:]).rstrip()
+    if not code or code[-1] in REGEX_AFTER:
+        return True
+    word = re.search(r'[\w$]+$', code)
+    return bool(word) and word.group() in REGEX_KEYWORDS
+
+
+def minify_js(src):
+    out = []
+    i = 0
+    pending = ''  # Whitespace seen since the last emitted character: '', ' ' or '\n'
+    while i < len(src):
+        char = src[i]
+        if char in ' \t\r\n' or src.startswith('/*', i) or src.startswith('//', i):
+            if src.startswith('//', i):
+                end = src.find('\n', i)
+                i = len(src) if end < 0 else end
+                continue
+            if src.startswith('/*', i):
+                end = src.find('*/', i + 2)
+                end = len(src) if end < 0 else end + 2
+                gap = '\n' if '\n' in src[i:end] else ' '
+                i = end
+            else:
+                gap = '\n' if char in '\r\n' else ' '
+                i += 1
+            pending = '\n' if '\n' in (pending, gap) else (pending or gap)
+            continue
+
+        if pending and out:
+            prev = out[-1][-1]
+            continues = char in ')]};,' or (char == '.' and not src[i + 1:i + 2].isdigit())
+            if pending == '\n' and prev not in '{;,([' and not continues:
+                out.append('\n')
+            elif (WORD.match(prev) and WORD.match(char)) or (prev in '+-' and char == prev):
+                out.append(' ')
+        pending = ''
+
+        if char in '"\'':
+            end = _string_end(src, i)
+        elif char == '`':
+            end = _template_end(src, i)
+        elif char == '/' and _starts_regex(out):
+            end = _regex_end(src, i)
+        else:
+            end = i + 1
+        out.append(src[i:end])
+        i = end
+    return ''.join(out)
+
+
+# HTML ----------------------------------------------------------------------
+
+def _tag_name(tag):
+    match = TAG_NAME.match(tag)
+    return match.group(1).lower() if match else ''
+
+
+def minify_html(html):
+    """Drop comments and collapse whitespace; inline <style> and <script> are minified too"""
+    parts = []
+
+    def add_text(text):
+        if parts and parts[-1][0] == 'text':
+            parts[-1] = ('text', parts[-1][1] + text)  # Text on both sides of a dropped comment
+        else:
+            parts.append(('text', text))
+
+    last = 0
+    for match in HTML_TOKEN.finditer(html):
+        add_text(html[last:match.start()])
+        last = match.end()
+        token = match.group(1)
+        name = (match.group(2) or '').lower()
+        if token.startswith('<!--'):
+            if token.startswith('<!--[if'):
+                parts.append(('tag', token))
+            continue
+        if name in ('script', 'style'):
+            open_end = token.index('>') + 1
+            close_start = token.lower().rindex('</')
+            opening, body, closing = token[:open_end], token[open_end:close_start], token[close_start:]
+            script_type = re.search(r'type=["\']?([^"\'\s>]+)', opening)
+            if name == 'style':
+                body = minify_css(body)
+            elif not script_type or script_type.group(1) in ('text/javascript', 'module'):
+                body = minify_js(body).strip()
+            token = opening + body + closing
+        parts.append(('tag', token))
+    add_text(html[last:])
+
+    out = []
+    for index, (kind, text) in enumerate(parts):
+        if kind != 'text':
+            out.append(text)
+            continue
+        if not text:
+            continue
+        before = parts[index - 1][1] if index else ''
+        after = parts[index + 1][1] if index + 1 < len(parts) else ''
+        collapsed = re.sub(r'\s+', ' ', text)
+        if _tag_name(before) in BLOCK_TAGS or not before:
+            collapsed = collapsed.lstrip()
+        if _tag_name(after) in BLOCK_TAGS or not after:
+            collapsed = collapsed.rstrip()
+        out.append(collapsed)
+    return ''.join(out)
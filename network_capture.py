@@ -0,0 +1,155 @@
+"""
+Network Capture
+Keeps the bodies of the responses a page already received: listing images
+(staged next to the image store, so they are converted and stored without
+a second download) and the site's JSON/GraphQL data responses (saved to the
+snapshot archive, and read for price, rating and the other listing fields).
+
+Matching responses are only noted while the page loads; settle() reads
+their bodies afterwards. Call it before the page navigates away.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from urllib.parse import urlparse
+
+from image_convert import HAS_PIL, PARTIAL_SUFFIX
+from resource_policy import IMAGE_HOSTS, is_first_party
+
+if HAS_PIL:
+    from PIL import Image
+
+# Configuration
+IMAGE_TYPES = ('image/jpeg', 'image/png', 'image/webp', 'image/avif')
+MIN_CAPTURE_WIDTH = 1000  # Smaller renditions (thumbnails) are downloaded at full size instead
+DATA_PATTERNS = ('graphql', '/api/', '/pdp/')  # URL parts of first-party data responses
+MAX_DATA_BYTES = 4 * 1024 * 1024
+
+
+def base_url(url):
+    """url without its query, the key download_vrbo_images uses for an image"""
+    return url.split('?')[0]
+
+
+def image_width(data):
+    """Pixel width from the image header, or None if it cannot be read"""
+    if not HAS_PIL:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size[0]
+    except Exception:
+        return None
+
+
+class NetworkCapture:
+    """Response bodies of one page, collected per listing
+
+    attach(page) once (sync or async page), reset() before each listing,
+    then settle() / async_settle() once the page has loaded.
+    """
+
+    def __init__(self, staging_dir=None, data=True):
+        """Images are kept only with a staging_dir (on the image store's filesystem)"""
+        self.staging_dir = Path(staging_dir) if staging_dir else None
+        if self.staging_dir:
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.capture_images = self.staging_dir is not None
+        self.capture_data = data
+        self.images = {}  # base URL -> {'path', 'sha256', 'bytes', 'width', 'url'}, largest rendition
+        self.data = []  # [{'url', 'status', 'body'}] parsed JSON, in arrival order
+        self._pending = []
+
+    def attach(self, page):
+        page.on('response', self._note)
+
+    def reset(self):
+        """Forget the previous listing, deleting staged images nobody took"""
+        for image in self.images.values():
+            Path(image['path']).unlink(missing_ok=True)
+        self.images = {}
+        self.data = []
+        self._pending = []
+
+    def _kind(self, response):
+        if response.status != 200:
+            return None
+        content_type = (response.headers.get('content-type') or '').split(';')[0].strip().lower()
+        url = response.url
+        if self.capture_images and content_type in IMAGE_TYPES and any(host in url for host in IMAGE_HOSTS):
+            return 'image'
+        if self.capture_data and 'json' in content_type and is_first_party(url) \
+                and any(pattern in urlparse(url).path.lower() for pattern in DATA_PATTERNS):
+            return 'data'
+        return None
+
+    def _note(self, response):
+        kind = self._kind(response)
+        if kind:
+            self._pending.append((kind, response))
+
+    def settle(self):
+        """Read the bodies of the responses noted so far (sync pages)"""
+        pending, self._pending = self._pending, []
+        for kind, response in pending:
+            try:
+                self._keep(kind, response.url, response.status, response.body())
+            except Exception:
+                continue  # Body no longer available (redirected, evicted); it is fetched normally
+
+    async def async_settle(self):
+        pending, self._pending = self._pending, []
+        for kind, response in pending:
+            try:
+                self._keep(kind, response.url, response.status, await response.body())
+            except Exception:
+                continue
+
+    def _keep(self, kind, url, status, body):
+        if kind == 'data':
+            if len(body) <= MAX_DATA_BYTES:
+                try:
+                    self.data.append({'url': url, 'status': status, 'body': json.loads(body)})
+                except ValueError:
+                    pass
+            return
+        key = base_url(url)
+        if key in self.images and self.images[key]['bytes'] >= len(body):
+            return
+        fd, temp_name = tempfile.mkstemp(dir=self.staging_dir, prefix='.', suffix=PARTIAL_SUFFIX)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        if key in self.images:
+            Path(self.images[key]['path']).unlink(missing_ok=True)
+        self.images[key] = {'path': Path(temp_name), 'sha256': hashlib.sha256(body).hexdigest(),
+                            'bytes': len(body), 'width': image_width(body), 'url': url}
+
+    def take(self, url, min_width=MIN_CAPTURE_WIDTH):
+        """Hand over the staged body for an image URL, or None to download it
+
+        The caller owns the returned file. Renditions narrower than min_width
+        are left for a full-size download.
+        """
+        image = self.images.get(base_url(url))
+        if not image or (image['width'] or 0) < min_width:
+            return None
+        del self.images[base_url(url)]
+        return image
+
+    def peek(self, url):
+        """The staged rendition of an image URL at any width, left in place; None if there is none"""
+        return self.images.get(base_url(url))
+
+    def save_data(self, archive, listing_id, name='', option=None):
+        """Store the captured data responses in a PageArchive; returns the path or None"""
+        if not self.data:
+            return None
+        return archive.save_data(listing_id, self.data, name=name, option=option)
+
+    def summary(self):
+        kept = sum(image['bytes'] for image in self.images.values())
+        return f"{len(self.images)} images ({kept / 1024:.0f} KB), {len(self.data)} data responses"
@@ -0,0 +1,177 @@
+"""
+Page Snapshot Archive
+Keeps a gzip-compressed copy of every listing page the scrapers load
+(snapshots/<listing_id>/<UTC timestamp>.html.gz), plus the JSON data
+responses captured alongside it (.json.gz), and rebuilds
+vrbo_updated_data.json from the archive without a browser, so parsing
+changes can be re-run over every saved page offline.
+
+Usage:
+    python page_archive.py                      # Rebuild vrbo_updated_data.json
+    python page_archive.py --html vrbo_page.html --listing 4146676
+"""
+
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from freshness import merge
+from image_convert import PARTIAL_SUFFIX
+from listing_extract import HAS_SELECTOLAX, extract_from_html, fields_from_data
+
+# Configuration
+ARCHIVE_DIR = Path('snapshots')
+OUTPUT_FILE = 'vrbo_updated_data.json'
+COMPRESS_LEVEL = 6
+
+
+class PageArchive:
+    """Timestamped, compressed page.content() snapshots per listing ID"""
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = Path(root)
+        self.index_path = self.root / 'index.json'
+        self._lock = threading.Lock()
+        self._index = {}  # listing_id -> [{file, fetched, url, name, option, bytes}], oldest first
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[!] Ignoring unreadable snapshot index {self.index_path}: {e}")
+
+    def save(self, listing_id, html, url='', name='', option=None):
+        """Compress and store one snapshot; returns its path"""
+        return self._store(listing_id, html, 'html', url, name, option)
+
+    def save_data(self, listing_id, responses, url='', name='', option=None):
+        """Store captured data responses ([{url, status, body}]) for a listing"""
+        return self._store(listing_id, json.dumps(responses, ensure_ascii=False), 'json', url, name, option)
+
+    def _store(self, listing_id, text, kind, url, name, option):
+        listing_id = str(listing_id)
+        fetched = datetime.now(timezone.utc)
+        data = gzip.compress(text.encode('utf-8'), compresslevel=COMPRESS_LEVEL, mtime=0)
+        directory = self.root / listing_id
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            stamp = fetched.strftime('%Y%m%dT%H%M%SZ')
+            path = directory / f'{stamp}.{kind}.gz'
+            n = 1
+            while path.exists():  # Two snapshots in the same second
+                path = directory / f'{stamp}-{n}.{kind}.gz'
+                n += 1
+            self._write(path, data)
+            self._index.setdefault(listing_id, []).append({
+                'file': path.relative_to(self.root).as_posix(),
+                'fetched': fetched.isoformat(timespec='seconds'),
+                'url': url,
+                'name': name,
+                'option': option,
+                'bytes': len(data),
+                'kind': kind,
+            })
+            self._save_index()
+        return path
+
+    def listings(self):
+        """Listing IDs with at least one snapshot, by option number"""
+        return sorted(self._index, key=lambda i: (self._index[i][-1].get('option') or 0, i))
+
+    def snapshots(self, listing_id, kind='html'):
+        """Snapshot entries of one kind ('html' pages or 'json' data) for listing_id, newest first"""
+        return [entry for entry in reversed(self._index.get(str(listing_id), []))
+                if entry.get('kind', 'html') == kind]
+
+    def load(self, entry):
+        """Decompressed text (HTML, or JSON for data snapshots) of one snapshot entry"""
+        return gzip.decompress((self.root / entry['file']).read_bytes()).decode('utf-8')
+
+    def _write(self, path, data):
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix='.', suffix=PARTIAL_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_name, path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+
+    def _save_index(self):
+        self._write(self.index_path, json.dumps(self._index, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def rebuild(archive, previous=None):
+    """Re-extract every archived listing from its newest usable snapshot
+
+    Starts from previous (the current output), so listings without
+    snapshots are kept. Each re-extracted record is merged into its
+    previous one as of the snapshot's time (freshness.merge): fields the
+    page did not yield keep their values. Snapshots of the bot-check page
+    are skipped in favor of older ones; if none is usable the previous
+    record stays as it was. As in update_vrbo_data.py, the fields found in
+    the newest data snapshot (captured JSON responses) override the page's.
+    Listings with data snapshots only are skipped. Returns {listing_id: record}.
+    """
+    results = dict(previous or {})
+    for listing_id in archive.listings():
+        record = entry = None
+        for entry in archive.snapshots(listing_id):
+            record = extract_from_html(archive.load(entry), listing_id, entry.get('name', ''),
+                                       entry.get('option'), entry.get('url', ''))
+            if 'error' not in record:
+                data = archive.snapshots(listing_id, 'json')[:1]
+                if data:
+                    record.update(fields_from_data(json.loads(archive.load(data[0])), listing_id))
+                break
+        if record is None:
+            continue  # Data responses but no page
+        if 'error' in record and listing_id in results:
+            print(f"  [=] {listing_id}: no usable snapshot, keeping the previous record")
+        # Fresh as of the snapshot, not the rebuild
+        results[listing_id] = merge(results.get(listing_id), record, entry.get('fetched'))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild listing data from archived page snapshots')
+    parser.add_argument('--html', help='Extract a single saved HTML file instead of the archive')
+    parser.add_argument('--listing', default='', help='Listing ID for --html')
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Page Snapshot Archive")
+    print("=" * 70)
+    print(f"Parser: {'selectolax' if HAS_SELECTOLAX else 'html.parser (pip install selectolax for speed)'}")
+
+    started = time.monotonic()
+    if args.html:
+        html = Path(args.html).read_text(encoding='utf-8')
+        record = extract_from_html(html, args.listing, '', None)
+        print(json.dumps(record, indent=2, ensure_ascii=False))
+        print(f"[+] Extracted in {time.monotonic() - started:.3f}s")
+        return
+
+    archive = PageArchive()
+    if not archive.listings():
+        print(f"[!] No snapshots in {archive.root}/ yet - run update_vrbo_data.py first")
+        return
+    previous = {}
+    if Path(args.output).exists():
+        with open(args.output, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    results = rebuild(archive, previous)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"[+] {len(results)} listings re-extracted in {time.monotonic() - started:.2f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
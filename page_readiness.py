@@ -0,0 +1,132 @@
+"""
+Page Readiness and Politeness
+Replaces fixed sleeps in the Playwright scripts with events: a selector
+appears, a matching response arrives, or the DOM stops changing. Pacing
+between page loads is left to one PolitenessScheduler per run, which spaces
+navigations to each host at a configurable rate. The waits are for pages
+from async_playwright (scrape_engine.py).
+"""
+
+import asyncio
+import time
+from urllib.parse import urlparse
+
+from download_engine import HostRateLimiter
+
+# Configuration
+PAGES_PER_MINUTE = 3.5  # Per host; ~17 s between listings, the average of the old sleeps
+PAGE_RATE_JITTER = 0.35  # +/- fraction, so gaps land between ~11 and ~23 s as before
+READY_SELECTORS = (
+    'h1',
+    '[data-testid="property-title"]',
+    '[data-testid="property-name"]',
+    'img[src*="trvl-media.com"]',
+)
+READY_TIMEOUT = 20000  # ms to wait for any ready selector
+QUIET_MS = 500  # DOM counts as settled after this long without mutations
+QUIET_TIMEOUT = 5000  # ms cap on waiting for the DOM to settle
+
+DOM_QUIET_SCRIPT = """
+    ({quietMs, timeoutMs}) => new Promise(resolve => {
+        const start = performance.now();
+        let timer = null;
+        let cap = null;
+        const done = (settled) => {
+            observer.disconnect();
+            clearTimeout(timer);
+            clearTimeout(cap);
+            resolve({settled, ms: performance.now() - start});
+        };
+        const observer = new MutationObserver(() => {
+            clearTimeout(timer);
+            timer = setTimeout(() => done(true), quietMs);
+        });
+        observer.observe(document.documentElement, {childList: true, subtree: true});
+        timer = setTimeout(() => done(true), quietMs);
+        cap = setTimeout(() => done(false), timeoutMs);
+    })
+"""
+
+
+class PolitenessScheduler:
+    """Spaces page navigations to each host at PAGES_PER_MINUTE
+
+    Shared by everything in a run that loads pages, so the time between
+    requests to the site is decided in one place rather than by sleeps
+    scattered through the scrape.
+    """
+
+    def __init__(self, pages_per_minute=PAGES_PER_MINUTE, jitter=PAGE_RATE_JITTER):
+        self.limiter = HostRateLimiter(pages_per_minute / 60.0, jitter)
+        self.waited = 0.0  # Total for the run
+
+    async def async_wait(self, url):
+        """Sleep until a page load from url's host may start; return the wait
+
+        Other tasks keep running meanwhile.
+        """
+        wait = self.limiter.reserve(urlparse(url).hostname or '')
+        self.waited += wait
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    async def async_goto(self, page, url, response_pattern=None, **kwargs):
+        """Paced page.goto; with response_pattern, also wait for a matching response
+
+        Returns (seconds paced, the matching Response or None).
+        """
+        wait = await self.async_wait(url)
+        return wait, await async_navigate(page, url, response_pattern, **kwargs)
+
+
+async def async_navigate(page, url, response_pattern=None, **kwargs):
+    """Unpaced async page.goto, optionally waiting for a matching response"""
+    if not response_pattern:
+        await page.goto(url, **kwargs)
+        return None
+    waiter = asyncio.ensure_future(
+        page.wait_for_event('response', lambda r: response_pattern in r.url, timeout=READY_TIMEOUT))
+    try:
+        await page.goto(url, **kwargs)
+    except BaseException:
+        waiter.cancel()
+        raise
+    try:
+        return await waiter
+    except Exception:
+        return None  # Navigated, but the response never came
+
+
+def _describe(found, settled):
+    if found and settled:
+        return 'content + DOM settled'
+    if found:
+        return 'content, DOM still changing'
+    return 'no content selector' + (', DOM settled' if settled else '')
+
+
+async def async_wait_for_any_selector(page, selectors=READY_SELECTORS, timeout=READY_TIMEOUT):
+    """Wait until any selector is attached; return True if one appeared"""
+    try:
+        await page.wait_for_selector(', '.join(selectors), state='attached', timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+async def async_wait_for_dom_quiet(page, quiet_ms=QUIET_MS, timeout=QUIET_TIMEOUT):
+    """Wait until the DOM has not changed for quiet_ms; return True if it settled"""
+    try:
+        result = await page.evaluate(DOM_QUIET_SCRIPT, {'quietMs': quiet_ms, 'timeoutMs': timeout})
+    except Exception:
+        return False
+    return bool(result and result.get('settled'))
+
+
+async def async_wait_until_ready(page, selectors=READY_SELECTORS, timeout=READY_TIMEOUT, quiet_ms=QUIET_MS):
+    """Selector appears, then the DOM stops growing; return (seconds, what happened)"""
+    started = time.monotonic()
+    found = await async_wait_for_any_selector(page, selectors, timeout)
+    settled = await async_wait_for_dom_quiet(page, quiet_ms)
+    return time.monotonic() - started, _describe(found, settled)
@@ -0,0 +1,187 @@
+"""
+Resource Policy
+page.route-based request filtering for Playwright scrapes. The 'data-only'
+profile aborts images, media, fonts and third-party scripts (image URLs are
+still collected from the aborted requests); 'full' loads everything, as a
+normal visit does. Either way the bytes loaded (as transferred: encoded
+bodies plus headers, from Playwright's request sizes), requests blocked and
+the page-ready time are tracked per listing.
+
+Routing turns off Playwright's HTTP cache, so pages in the browser service
+(browser_service.py) use SERVICE_PROFILE instead, keeping its disk cache.
+"""
+
+import time
+from urllib.parse import urlparse
+
+# Configuration
+PROFILES = {
+    'data-only': {
+        'block_types': {'image', 'media', 'font', 'texttrack'},
+        'block_third_party': {'script', 'xhr', 'fetch', 'eventsource', 'websocket', 'other'},
+    },
+    'full': None,  # No routing at all (routing also turns off the HTTP cache)
+}
+DEFAULT_PROFILE = 'data-only'
+SERVICE_PROFILE = 'full'  # For pages in the browser service, whose disk cache routing would bypass
+FIRST_PARTY_DOMAINS = ('vrbo.com', 'expedia.com', 'travel-assets.com', 'trvl-media.com',
+                       'expedia-aarp.com', 'homeaway.com')
+IMAGE_HOSTS = ('trvl-media.com', 'vrbo', 'expedia')
+# Rough transfer sizes, used only to estimate what blocked requests would have cost
+TYPICAL_BYTES = {'image': 120 * 1024, 'media': 1024 * 1024, 'font': 40 * 1024, 'texttrack': 2 * 1024,
+                 'script': 60 * 1024}
+TYPICAL_BYTES_OTHER = 5 * 1024
+
+NAVIGATION_TIMING_SCRIPT = """
+    () => {
+        const nav = performance.getEntriesByType('navigation')[0];
+        if (!nav) return null;
+        return {dom_ready: nav.domContentLoadedEventEnd, load: nav.loadEventEnd};
+    }
+"""
+
+
+def is_first_party(url):
+    host = (urlparse(url).hostname or '').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in FIRST_PARTY_DOMAINS)
+
+
+class ResourcePolicy:
+    """Route handler plus per-listing counters for one browser context or page
+
+    Call attach(context) (or attach(page)) once, then reset() before and
+    report(page) after each listing.
+    """
+
+    def __init__(self, profile=DEFAULT_PROFILE):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown resource profile {profile!r} (choose from {', '.join(PROFILES)})")
+        self.profile = profile
+        self.rules = PROFILES[profile]
+        self.reset()
+
+    def attach(self, target):
+        """Install the route (for filtering profiles) and the byte counter on a context or page"""
+        if self.rules:
+            target.route('**/*', self._handle_route)
+        target.on('response', self._note_response)
+        target.on('requestfinished', self._count_finished)
+
+    async def async_attach(self, target):
+        """attach() for an async_playwright context or page"""
+        if self.rules:
+            await target.route('**/*', self._async_handle_route)
+        target.on('response', self._note_response)
+        target.on('requestfinished', self._async_count_finished)
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.loaded_bytes = 0
+        self.loaded_requests = 0
+        self.blocked = {}  # resource type -> count
+        self.estimated_saved = 0
+        self.image_urls = []  # Image URLs seen in requests, including aborted ones
+
+    def should_block(self, request):
+        resource_type = request.resource_type
+        if resource_type in self.rules['block_types']:
+            return True
+        return resource_type in self.rules['block_third_party'] and not is_first_party(request.url)
+
+    def _decide(self, request):
+        """Record the request and return True if it should be aborted"""
+        if request.resource_type == 'image' and any(host in request.url for host in IMAGE_HOSTS):
+            self.image_urls.append(request.url)
+        if not self.should_block(request):
+            return False
+        resource_type = request.resource_type
+        self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+        self.estimated_saved += TYPICAL_BYTES.get(resource_type, TYPICAL_BYTES_OTHER)
+        return True
+
+    def _handle_route(self, route):
+        if self._decide(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _async_handle_route(self, route):
+        if self._decide(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _note_response(self, response):
+        if not self.rules and response.request.resource_type == 'image' \
+                and any(host in response.url for host in IMAGE_HOSTS):
+            self.image_urls.append(response.url)
+
+    def _add_sizes(self, sizes):
+        """Count one finished request; sizes from request.sizes() (None if unavailable)
+
+        Compressed and chunked responses often have no content-length, so
+        the transferred sizes are used rather than the header.
+        """
+        self.loaded_requests += 1
+        if sizes:
+            self.loaded_bytes += sizes.get('responseBodySize', 0) + sizes.get('responseHeadersSize', 0)
+
+    def _count_finished(self, request):
+        try:
+            sizes = request.sizes()
+        except Exception:
+            sizes = None  # Page closed, or the response is gone
+        self._add_sizes(sizes)
+
+    async def _async_count_finished(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            sizes = None
+        self._add_sizes(sizes)
+
+    def page_timing(self, page):
+        """DOMContentLoaded / load times in seconds since navigation start (None if unknown)"""
+        try:
+            timing = page.evaluate(NAVIGATION_TIMING_SCRIPT) or {}
+        except Exception:
+            timing = {}
+        return {key: (value / 1000 if value else None) for key, value in timing.items()}
+
+    async def async_page_timing(self, page):
+        try:
+            timing = await page.evaluate(NAVIGATION_TIMING_SCRIPT) or {}
+        except Exception:
+            timing = {}
+        return {key: (value / 1000 if value else None) for key, value in timing.items()}
+
+    def report(self, page=None, timing=None):
+        """Counters for the current listing as a dict
+
+        Pass a sync page to read its timing, or timing from async_page_timing.
+        """
+        if timing is None:
+            timing = self.page_timing(page) if page is not None else {}
+        return {
+            'profile': self.profile,
+            'loaded_kb': round(self.loaded_bytes / 1024, 1),
+            'loaded_requests': self.loaded_requests,
+            'blocked_requests': sum(self.blocked.values()),
+            'blocked_by_type': dict(self.blocked),
+            'estimated_saved_kb': round(self.estimated_saved / 1024, 1),
+            'dom_ready_s': timing.get('dom_ready'),
+            'load_s': timing.get('load'),
+            'image_urls': len(dict.fromkeys(self.image_urls)),
+        }
+
+
+def format_report(report):
+    """One-line summary of report() for the console"""
+    ready = f"{report['dom_ready_s']:.2f}s" if report.get('dom_ready_s') else 'n/a'
+    load = f"{report['load_s']:.2f}s" if report.get('load_s') else 'n/a'
+    line = (f"{report['profile']}: {report['loaded_kb']:.0f} KB in {report['loaded_requests']} responses, "
+            f"DOM ready {ready}, load {load}")
+    if report['blocked_requests']:
+        line += (f", blocked {report['blocked_requests']} requests "
+                 f"(~{report['estimated_saved_kb']:.0f} KB saved est.)")
+    return line
@@ -0,0 +1,142 @@
+"""
+Run Journal
+Append-only JSONL checkpoint of finished listings. Every entry is flushed
+and fsynced as its listing completes, tagged with the run ID, so a crash or
+Ctrl+C loses at most the listing in flight. A resumed run skips what its
+run already finished, and the final JSON files are built from the journal.
+
+Usage:
+    python run_journal.py journal/update_vrbo_data.jsonl     # List runs
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from image_convert import PARTIAL_SUFFIX
+
+# Configuration
+JOURNAL_DIR = Path('journal')
+KEEP_RUNS = 5  # Older runs are dropped from the file when a new run starts
+
+
+def new_run_id():
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ') + '-' + uuid.uuid4().hex[:6]
+
+
+def read_lines(path):
+    """Parsed journal lines; a line torn by a crash mid-write is skipped"""
+    lines = []
+    if not Path(path).exists():
+        return lines
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                lines.append(json.loads(line))
+            except ValueError:
+                continue
+    return lines
+
+
+class RunJournal:
+    """Checkpoints for one script's runs, in JOURNAL_DIR/<name>.jsonl
+
+    resume=None starts a new run; resume='latest' or a run ID continues
+    that run (a new run is started if there is nothing to resume).
+    """
+
+    def __init__(self, name, resume=None, root=JOURNAL_DIR):
+        self.path = Path(root) / f'{name}.jsonl'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        lines = read_lines(self.path)
+        runs = list(dict.fromkeys(line['run'] for line in lines if 'run' in line))
+        self.resumed = False
+        if resume == 'latest' and runs:
+            self.run_id, self.resumed = runs[-1], True
+        elif resume and resume in runs:
+            self.run_id, self.resumed = resume, True
+        else:
+            if resume and resume != 'latest':
+                print(f"[!] Run {resume} is not in {self.path}; starting a new run")
+            self.run_id = new_run_id()
+            self._compact(lines, runs[-(KEEP_RUNS - 1):] if KEEP_RUNS > 1 else [])
+        self._entries = {line['listing_id']: line for line in lines
+                         if line.get('run') == self.run_id and 'listing_id' in line}
+        torn = False
+        if self.path.exists() and self.path.stat().st_size:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn:
+            self._file.write('\n')  # End a line torn by a crash so the next entry starts clean
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, listing_id, entry, ok=True):
+        """Append one finished listing and force it to disk
+
+        ok=False marks a failed listing, which a resumed run tries again.
+        """
+        line = {'run': self.run_id, 'listing_id': listing_id, 'ok': ok,
+                'at': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'entry': entry}
+        data = json.dumps(line, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._entries[listing_id] = line
+
+    def done(self, listing_id):
+        """True if this run already finished listing_id successfully"""
+        line = self._entries.get(listing_id)
+        return bool(line and line['ok'])
+
+    def entries(self):
+        """{listing_id: (entry, finished at)} for this run, latest attempt of each"""
+        with self._lock:
+            return {listing_id: (line['entry'], line['at']) for listing_id, line in self._entries.items()}
+
+    def _compact(self, lines, keep_runs):
+        """Rewrite the journal with only the most recent runs"""
+        keep = [line for line in lines if line.get('run') in keep_runs]
+        if len(keep) == len(lines):
+            return
+        fd, temp_name = tempfile.mkstemp(dir=self.path.parent, prefix='.', suffix=PARTIAL_SUFFIX)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(line, ensure_ascii=False) + '\n' for line in keep)
+            os.replace(temp_name, self.path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__.strip().split('Usage:')[1])
+        return
+    runs = {}
+    for line in read_lines(sys.argv[1]):
+        run = runs.setdefault(line['run'], {'ok': 0, 'failed': 0, 'last': ''})
+        run['ok' if line['ok'] else 'failed'] += 1
+        run['last'] = line['at']
+    for run_id, run in runs.items():
+        print(f"  {run_id}: {run['ok']} done, {run['failed']} failed, last at {run['last']}")
+
+
+if __name__ == '__main__':
+    main()
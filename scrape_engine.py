@@ -0,0 +1,143 @@
+"""
+Async Scrape Engine
+Visits listings with async_playwright across several browser contexts at
+once. Page loads from every context go through one PolitenessScheduler, so
+the request rate to the site stays fixed while page loads, readiness waits
+and extraction overlap. Results come back in input order. With the browser
+service running (browser_service.py) the workers open their pages in its
+persistent context, so they share its warm disk cache; they then load pages
+with SERVICE_PROFILE, since routing would bypass that cache.
+
+Usage:
+    engine = ScrapeEngine(contexts=3, launch_options=..., context_options=...)
+    results = engine.run_sync(listings, handler)   # handler(worker, item) is async
+"""
+
+import asyncio
+import time
+
+from playwright.async_api import async_playwright
+
+from browser_service import async_launch, async_new_context, attached
+from page_readiness import PolitenessScheduler
+from resource_policy import SERVICE_PROFILE, ResourcePolicy
+
+# Configuration
+CONTEXTS = 3  # Listings in flight at once; the scheduler still sets the page rate
+RESOURCE_PROFILE = 'full'
+
+
+class Worker:
+    """One page (in its own context, or the service's shared one), handed to the handler for each item
+
+    Output is buffered per item through log() and printed in one block
+    when the item finishes, so parallel listings do not interleave.
+    """
+
+    def __init__(self, number, context, page, policy, scheduler, capture=None):
+        self.number = number
+        self.context = context
+        self.page = page
+        self.policy = policy
+        self.scheduler = scheduler
+        self.capture = capture  # NetworkCapture, if the engine was given a capture factory
+        self.last_wait = 0.0  # Pacing wait before this worker's latest navigation
+        self._lines = []
+
+    async def goto(self, url, response_pattern=None, **kwargs):
+        """Navigate this worker's page when the shared scheduler allows"""
+        self.last_wait, response = await self.scheduler.async_goto(self.page, url, response_pattern, **kwargs)
+        return response
+
+    def log(self, line):
+        self._lines.append(line)
+
+    def flush(self):
+        """Print buffered output now (e.g. before a step that prints directly)"""
+        if self._lines:
+            print('\n'.join(self._lines), flush=True)
+            self._lines = []
+
+
+class ScrapeEngine:
+    """N async browser contexts fed from one queue, paced by one scheduler"""
+
+    def __init__(self, contexts=CONTEXTS, launch_options=None, context_options=None, init_script=None,
+                 resource_profile=RESOURCE_PROFILE, scheduler=None, capture_factory=None):
+        self.contexts = max(1, contexts)
+        self.launch_options = launch_options or {'headless': True}
+        self.context_options = context_options or {}
+        self.init_script = init_script
+        self.resource_profile = resource_profile
+        self.scheduler = scheduler or PolitenessScheduler()
+        self.capture_factory = capture_factory  # Called once per worker for its NetworkCapture
+        self.profile = resource_profile  # The profile the last run used
+        self.elapsed = 0.0
+
+    async def _new_worker(self, browser, number, via_cdp):
+        context = await async_new_context(browser, **self.context_options)
+        if self.init_script and (number == 0 or not via_cdp):  # Once for a shared context
+            await context.add_init_script(self.init_script)
+        page = await context.new_page()
+        policy = ResourcePolicy(self.profile)
+        await policy.async_attach(page)  # Per page, so workers sharing a context count separately
+        capture = self.capture_factory() if self.capture_factory else None
+        if capture:
+            capture.attach(page)
+        return Worker(number, context, page, policy, self.scheduler, capture)
+
+    async def run(self, items, handler):
+        """await handler(worker, item) for every item; return results in item order
+
+        A handler that raises gets the exception object as its result.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        if not items:
+            return results
+        started = time.monotonic()
+        queue = asyncio.Queue()
+        for index, item in enumerate(items):
+            queue.put_nowait((index, item))
+
+        async def work(worker):
+            while True:
+                try:
+                    index, item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                worker.policy.reset()
+                if worker.capture:
+                    worker.capture.reset()
+                try:
+                    results[index] = await handler(worker, item)
+                except Exception as e:
+                    worker.log(f"  [!] Unexpected error: {e}")
+                    results[index] = e
+                worker.flush()
+
+        async with async_playwright() as p:
+            browser = await async_launch(p, **self.launch_options)
+            via_cdp = attached(browser)
+            self.profile = SERVICE_PROFILE if via_cdp else self.resource_profile
+            if self.profile != self.resource_profile:
+                print(f"[*] Resource profile {self.profile!r} in the browser service (routing would bypass its cache)")
+            workers = []
+            try:
+                for n in range(min(self.contexts, len(items))):
+                    workers.append(await self._new_worker(browser, n, via_cdp))
+                await asyncio.gather(*(work(worker) for worker in workers))
+            finally:
+                for worker in workers:
+                    if worker.capture:
+                        worker.capture.reset()  # Drop staged bodies the last item did not use
+                if via_cdp:  # close() only disconnects; leave no tabs behind in the service
+                    for worker in workers:
+                        await worker.page.close()
+                await browser.close()
+        self.elapsed = time.monotonic() - started
+        return results
+
+    def run_sync(self, items, handler):
+        """run() from synchronous code"""
+        return asyncio.run(self.run(items, handler))
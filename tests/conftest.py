@@ -0,0 +1,6 @@
+"""The scripts are flat modules at the repository root; make them importable from tests/"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,69 @@
+"""build(): only fragments whose inputs changed are re-rendered"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from build_site import build
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_ONLY_ID = '9990001'
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """A copy of the site inputs in a temporary working directory"""
+    shutil.copytree(ROOT / 'templates', tmp_path / 'templates')
+    shutil.copy(ROOT / 'site_listings.json', tmp_path)
+    (tmp_path / 'images').mkdir()
+    shutil.copy(ROOT / 'images' / 'manifest.json', tmp_path / 'images')
+    records = {DATA_ONLY_ID: {'listing_id': DATA_ONLY_ID, 'name': 'Scraped Only Cottage',
+                              'title': 'Scraped Only Cottage', 'price': '$900', 'bedrooms': '3'}}
+    (tmp_path / 'vrbo_updated_data.json').write_text(json.dumps(records))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def update_json(path, change):
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    change(data)
+    Path(path).write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_unchanged_inputs_render_nothing(site):
+    first = build()
+    assert first['rendered'] == first['fragments'] == 2 * first['listings']
+    assert first['written']
+    page = (site / 'index.html').read_bytes()
+    assert 'Scraped Only Cottage' in page.decode('utf-8')
+
+    second = build()
+    assert second['rendered'] == 0
+    assert not second['written']
+    assert (site / 'index.html').read_bytes() == page
+
+
+def test_changed_listing_rerenders_only_its_row_and_card(site):
+    build()
+    update_json('vrbo_updated_data.json', lambda data: data[DATA_ONLY_ID].update(price='$950'))
+    stats = build()
+    assert stats['rendered'] == 2
+    assert stats['written']
+    assert '$950' in (site / 'index.html').read_text(encoding='utf-8')
+
+
+def test_changed_manifest_entry_rerenders_only_that_option(site):
+    build()
+    update_json('images/manifest.json', lambda data: data['options']['1']['pool'][0].update(width=1))
+    assert build()['rendered'] == 2
+
+
+def test_force_rerenders_everything_to_the_same_page(site):
+    build()
+    page = (site / 'index.html').read_bytes()
+    stats = build(force=True)
+    assert stats['rendered'] == stats['fragments']
+    assert not stats['written']
+    assert (site / 'index.html').read_bytes() == page
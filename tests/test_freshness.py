@@ -0,0 +1,58 @@
+"""Freshness plan and merge"""
+
+from datetime import datetime, timedelta, timezone
+
+from freshness import FIELD_TTLS, merge, plan, stale_fields
+
+NOW = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+LISTINGS = [('4146676', 'Spacious Beach House', 1), ('2873463', 'Large Luxurious Home', 2)]
+
+
+def at(delta):
+    return (NOW - delta).isoformat(timespec='seconds')
+
+
+def fresh_record(listing_id, age=timedelta(hours=1)):
+    return {'listing_id': listing_id, 'price': '$1,000', 'fetched': {field: at(age) for field in FIELD_TTLS}}
+
+
+def test_plan_picks_listings_with_expired_fields():
+    records = {'4146676': fresh_record('4146676'), '2873463': fresh_record('2873463', timedelta(hours=13))}
+    due = plan(LISTINGS, records, NOW)
+    assert [listing[0] for listing, _ in due] == ['2873463']
+    assert due[0][1] == ['price']  # Only price has a TTL under 13 h
+
+
+def test_plan_visits_unknown_and_failed_listings_first_with_limit():
+    records = {'4146676': {'listing_id': '4146676', 'error': 'timeout'},
+               '2873463': fresh_record('2873463', timedelta(days=8))}
+    due = plan(LISTINGS, records, NOW, limit=1)
+    assert [listing[0] for listing, _ in due] == ['4146676']
+
+
+def test_merge_stamps_read_fields_only():
+    previous = fresh_record('4146676', timedelta(days=2))
+    merged = merge(previous, {'listing_id': '4146676', 'price': '', 'rating': '9.4'}, NOW)
+    assert merged['price'] == '$1,000'
+    assert merged['fetched']['price'] == previous['fetched']['price']
+    assert merged['fetched']['rating'] == at(timedelta(0))
+    assert merged['missed'] == {'price': at(timedelta(0))}
+
+
+def test_missed_field_is_retried_after_its_ttl_not_every_run():
+    previous = fresh_record('4146676', timedelta(days=2))
+    merged = merge(previous, {'listing_id': '4146676', 'price': ''}, NOW)
+    assert 'price' not in stale_fields(merged, NOW + timedelta(hours=1))
+    assert 'price' in stale_fields(merged, NOW + timedelta(hours=12))
+
+
+def test_reading_a_missed_field_clears_it():
+    merged = merge(fresh_record('4146676'), {'listing_id': '4146676', 'price': ''}, NOW)
+    merged = merge(merged, {'listing_id': '4146676', 'price': '$1,100'}, NOW + timedelta(hours=12))
+    assert 'missed' not in merged
+    assert merged['price'] == '$1,100'
+
+
+def test_failed_visit_keeps_previous_record():
+    previous = fresh_record('4146676')
+    assert merge(previous, {'listing_id': '4146676', 'error': 'bot check page'}, NOW) is previous
@@ -0,0 +1,46 @@
+"""ValidatorCache: conditional request headers from stored ETag / Last-Modified"""
+
+from types import SimpleNamespace
+
+from http_cache import ValidatorCache
+
+URL = 'https://media.vrbo.com/lodging/1/pool.jpg'
+LAST_MODIFIED = 'Wed, 01 Apr 2026 10:00:00 GMT'
+
+
+def response(status_code, **headers):
+    return SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def test_unknown_url_gets_no_conditional_headers(tmp_path):
+    cache = ValidatorCache(tmp_path / 'validators.json')
+    assert cache.conditional_headers(URL) == {}
+    assert not cache.has_validators(URL)
+
+
+def test_validators_are_sent_back_after_a_reload(tmp_path):
+    cache = ValidatorCache(tmp_path / 'validators.json')
+    cache.record(URL, response(200, **{'ETag': '"abc"', 'Last-Modified': LAST_MODIFIED}))
+    assert cache.validated(URL)
+    cache.save()
+    reloaded = ValidatorCache(tmp_path / 'validators.json')
+    assert not reloaded.validated(URL)  # Per run
+    assert reloaded.conditional_headers(URL) == {'If-None-Match': '"abc"', 'If-Modified-Since': LAST_MODIFIED}
+
+
+def test_not_modified_keeps_and_refreshes_validators(tmp_path):
+    cache = ValidatorCache(tmp_path / 'validators.json')
+    cache.record(URL, response(200, **{'ETag': '"abc"', 'Last-Modified': LAST_MODIFIED}))
+    cache.record(URL, response(304, ETag='"abd"'), conditional=True)
+    assert cache.not_modified == 1 and cache.modified == 0
+    assert cache.conditional_headers(URL) == {'If-None-Match': '"abd"', 'If-Modified-Since': LAST_MODIFIED}
+
+
+def test_full_response_replaces_validators(tmp_path):
+    cache = ValidatorCache(tmp_path / 'validators.json')
+    cache.record(URL, response(200, **{'ETag': '"abc"', 'Last-Modified': LAST_MODIFIED}))
+    cache.record(URL, response(200, ETag='"new"'), conditional=True)
+    assert cache.modified == 1
+    assert cache.conditional_headers(URL) == {'If-None-Match': '"new"'}
+    cache.record(URL, response(200))
+    assert not cache.has_validators(URL)
@@ -0,0 +1,56 @@
+"""build_manifest(): gallery order, sizes, variants and inline previews"""
+
+import json
+
+import pytest
+
+import image_manifest
+from image_manifest import build_manifest, write_manifest
+
+PIL = pytest.importorskip('PIL.Image')
+
+
+def save_image(path, size=(120, 80), color=(30, 120, 200)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    PIL.new('RGB', size, color).save(path, 'JPEG')
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    images = tmp_path / 'images'
+    for name in ('pool10.jpg', 'pool2.jpg', 'exterior.jpg', 'pool.jpg', 'deck.jpg', '.hidden.jpg'):
+        save_image(images / 'option-2' / name)
+    save_image(images / 'option-10' / 'pool.jpg')
+    return images
+
+
+def test_options_and_images_are_ordered(images_dir):
+    options = build_manifest(images_dir)['options']
+    assert list(options) == ['2', '10']
+    assert list(options['2']) == ['pool', 'exterior', 'deck']
+    assert [image['src'] for image in options['2']['pool']] == [
+        'images/option-2/pool.jpg', 'images/option-2/pool2.jpg', 'images/option-2/pool10.jpg']
+
+
+def test_image_entries_carry_size_hash_and_variants(images_dir):
+    (images_dir / 'derivatives.json').write_text(json.dumps({'option-2/pool.jpg': {
+        'width': 1200, 'height': 800, 'variants': [{'width': 400, 'src': 'option-2/derived/pool-400w.webp'}]}}))
+    pool = build_manifest(images_dir)['options']['2']['pool']
+    assert (pool[0]['width'], pool[0]['height']) == (1200, 800)  # From the derivatives record
+    assert pool[0]['variants'] == [{'width': 400, 'src': 'images/option-2/derived/pool-400w.webp'}]
+    assert (pool[1]['width'], pool[1]['height']) == (120, 80)  # From the header
+    assert pool[1]['variants'] == []
+    assert len(pool[1]['sha256']) == 64
+
+
+def test_only_the_first_image_of_each_gallery_has_a_preview(images_dir):
+    options = build_manifest(images_dir)['options']
+    for gallery in options['2'].values():
+        assert gallery[0]['preview'].startswith('data:image/webp;base64,')
+        assert not any('preview' in image for image in gallery[1:])
+
+
+def test_previews_of_unchanged_images_are_reused(images_dir, monkeypatch):
+    write_manifest(images_dir)
+    monkeypatch.setattr(image_manifest, 'preview_uri', lambda *args, **kwargs: pytest.fail('re-encoded'))
+    assert build_manifest(images_dir)['options']['10']['pool'][0]['preview']
@@ -0,0 +1,73 @@
+"""ImageStore: blobs by sha256, the URL index and links into option folders"""
+
+import hashlib
+import os
+
+import pytest
+
+from image_store import ImageStore
+
+URL = 'https://media.vrbo.com/lodging/1/pool.jpg'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(tmp_path / '.store')
+
+
+def stage(store, data):
+    path = store.staging_path()
+    path.write_bytes(data)
+    return path, hashlib.sha256(data).hexdigest()
+
+
+def test_add_moves_the_file_in_and_indexes_the_url(store):
+    path, sha256 = stage(store, b'pool photo')
+    blob = store.add(path, sha256, URL)
+    assert blob.read_bytes() == b'pool photo'
+    assert not path.exists()
+    assert store.lookup(URL) == sha256
+    assert store.lookup('https://media.vrbo.com/other.jpg') is None
+
+
+def test_same_content_is_stored_once(store):
+    first, sha256 = stage(store, b'pool photo')
+    second, _ = stage(store, b'pool photo')
+    store.add(first, sha256, URL)
+    store.add(second, sha256, URL + '?rw=1200')
+    assert not second.exists()
+    assert [p.name for p in store.root.iterdir()] == [sha256]
+    assert store.urls() == {URL: sha256, URL + '?rw=1200': sha256}
+
+
+def test_variants_are_indexed_separately(store):
+    path, sha256 = stage(store, b'webp bytes')
+    store.add(path, sha256, URL, variant='webp')
+    assert store.lookup(URL) is None
+    assert store.lookup(URL, 'webp') == sha256
+    assert store.knows(URL)
+
+
+def test_lookup_ignores_index_entries_whose_blob_is_gone(store):
+    path, sha256 = stage(store, b'pool photo')
+    store.add(path, sha256, URL).unlink()
+    assert store.lookup(URL) is None
+
+
+def test_index_survives_a_reload(store):
+    path, sha256 = stage(store, b'pool photo')
+    store.add(path, sha256, URL)
+    store.save()
+    assert ImageStore(store.root).lookup(URL) == sha256
+    assert not [p for p in store.root.iterdir() if p.name.startswith('.')]
+
+
+def test_link_points_the_option_file_at_the_blob(store, tmp_path):
+    path, sha256 = stage(store, b'pool photo')
+    blob = store.add(path, sha256, URL)
+    target = tmp_path / 'images' / 'option-1' / 'pool.jpg'
+    assert store.link(sha256, target)
+    assert target.read_bytes() == b'pool photo'
+    assert os.path.samefile(blob, target)
+    assert not store.link(sha256, target)  # Already linked
+    assert os.listdir(target.parent) == ['pool.jpg']
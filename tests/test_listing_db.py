@@ -0,0 +1,63 @@
+"""ListingDB: importing the JSON files and querying history"""
+
+import json
+
+import pytest
+
+from image_store import ImageStore
+from listing_db import ListingDB, import_all
+
+EARLY = '2026-05-01T00:00:00+00:00'
+LATE = '2026-06-01T00:00:00+00:00'
+POOL_URL = 'https://media.vrbo.com/lodging/1/pool.jpg'
+DECK_URL = 'https://media.vrbo.com/lodging/1/deck.jpg'
+
+
+@pytest.fixture
+def db(tmp_path):
+    with ListingDB(tmp_path / 'listings.db') as db:
+        yield db
+
+
+def record(price, fetched, option=1):
+    return {'listing_id': '4146676', 'name': 'Spacious Beach House', 'option': option, 'price': price,
+            'rating': '9.4', 'amenities': ['Pool', 'Wifi'], 'images': [POOL_URL], 'fetched': {
+                'price': fetched, 'rating': fetched, 'amenities': fetched, 'images': fetched}}
+
+
+def test_price_history_keeps_every_observation(db):
+    with db.transaction():
+        db.record_listing(record('$1,000', EARLY))
+        db.record_listing(record('$1,250', LATE))
+        db.record_listing(record('$1,250', LATE))  # Same stamp again is ignored
+    rows = db.history(1, 'price')
+    assert [(row['observed'], row['value'], row['number']) for row in rows] == [
+        (EARLY, '$1,000', 1000.0), (LATE, '$1,250', 1250.0)]
+    latest = db.latest('4146676')
+    assert latest['price'] == '$1,250'
+    assert json.loads(latest['amenities']) == ['Pool', 'Wifi']
+
+
+def test_option_on_record_is_not_overridden(db):
+    with db.transaction():
+        db.record_listing(record('$1,000', EARLY), source='vrbo_updated_data.json')
+        db.upsert_listing('4146676', option=7, source='pool_images.json')
+    assert db.history(1, 'price')
+    assert db.conflicts == [('4146676', 'Spacious Beach House', 1, 7, 'pool_images.json')]
+
+
+def test_import_all_and_pending_images(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'vrbo_updated_data.json').write_text(json.dumps({'4146676': record('$1,000', EARLY)}))
+    (tmp_path / 'image_urls.json').write_text(json.dumps({'4146676': [POOL_URL, DECK_URL]}))
+    import_all(db)
+    assert db.counts() == {'listings': 1, 'observations': 3, 'image_urls': 2, 'blobs': 0}
+    assert {row['url'] for row in db.pending_images()} == {POOL_URL, DECK_URL}
+
+    store = ImageStore(tmp_path / 'images' / '.store')
+    staged = store.staging_path()
+    staged.write_bytes(b'pool photo')
+    store.add(staged, 'a' * 64, POOL_URL)
+    with db.transaction():
+        assert db.import_store(store) == 1
+    assert [row['url'] for row in db.pending_images('4146676')] == [DECK_URL]
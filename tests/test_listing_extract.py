@@ -0,0 +1,76 @@
+"""extract_from_html() on saved pages, with both parsing backends, and fields_from_data()"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import listing_extract
+from listing_extract import extract_from_html, fields_from_data
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BACKENDS = [pytest.param(False, id='html.parser'),
+            pytest.param(True, id='selectolax',
+                         marks=pytest.mark.skipif(not listing_extract.HAS_SELECTOLAX,
+                                                  reason='selectolax not installed'))]
+
+LISTING_PAGE = """<!DOCTYPE html>
+<html><head><title>Beach House | Vrbo</title>
+<script type="application/ld+json">{}</script>
+</head><body>
+<h1 data-testid="property-title">Spacious Beach House</h1>
+<div data-testid="price-summary-total">$1,234 total</div>
+</body></html>
+""".format(json.dumps({
+    '@context': 'https://schema.org',
+    '@type': 'VacationRental',
+    'name': 'Spacious Beach House (JSON-LD)',
+    'aggregateRating': {'ratingValue': 9.4, 'reviewCount': 27},
+    'numberOfBedrooms': 5,
+}))
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(listing_extract, 'HAS_SELECTOLAX', request.param)
+
+
+def test_bot_check_page_is_an_error(backend):
+    html = (ROOT / 'vrbo_page.html').read_text(encoding='utf-8')
+    record = extract_from_html(html, '4146676', 'Spacious Beach House', 1)
+    assert record['error'] == 'bot check page, no listing content'
+    assert record['title'] == '' and record['price'] == ''
+
+
+def test_listing_page_fields(backend):
+    record = extract_from_html(LISTING_PAGE, '4146676', 'Spacious Beach House', 1)
+    assert 'error' not in record
+    assert record['title'] == 'Spacious Beach House'  # Markup wins over JSON-LD
+    assert record['price'] == '$1,234 total'
+    assert record['rating'] == '9.4'  # Only in JSON-LD
+    assert record['reviews'] == '27'
+    assert record['bedrooms'] == '5'
+
+
+def data_response(body):
+    return {'url': 'https://www.vrbo.com/graphql', 'status': 200, 'body': body}
+
+
+def test_data_fields_are_read_only_from_the_visited_listing():
+    body = {'data': {
+        'similarProperties': [{'propertyId': '999', 'bedroomCount': 2, 'totalPriceFormatted': '$400'}],
+        'propertyInfo': {'id': '4146676', 'summary': {'bedroomCount': 5, 'maxOccupancy': 16}},
+    }}
+    fields = fields_from_data([data_response(body)], '4146676')
+    assert fields == {'bedrooms': '5', 'sleeps': '16'}
+
+
+def test_data_fields_match_dotted_listing_ids():
+    body = {'listing': {'listingId': '321.4146676.4720', 'averageOverallRating': {'value': 9.6}}}
+    assert fields_from_data([data_response(body)], '4146676') == {'rating': '9.6'}
+
+
+def test_data_without_the_listing_id_yields_nothing():
+    body = {'bedroomCount': 4, 'offers': [{'listingId': '2873463', 'totalPriceFormatted': '$2,000'}]}
+    assert fields_from_data([data_response(body)], '4146676') == {}
@@ -0,0 +1,31 @@
+"""Rating parsing: every form ends up on the 0-10 scale"""
+
+import math
+
+import pytest
+
+from listing_table import normalize, parse_rating
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('4.8/5', 9.6),
+    ('4.8 out of 5', 9.6),
+    ('8.4/10 Very good', 8.4),
+    ('4.8', 9.6),  # Bare, 5-point
+    (4.8, 9.6),
+    ('8.4', 8.4),  # Bare, 10-point
+    (9, 9.0),
+])
+def test_parse_rating_scale(value, expected):
+    assert parse_rating(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('value', ['', None, 'No reviews yet', '42'])
+def test_parse_rating_unknown(value):
+    assert math.isnan(parse_rating(value))
+
+
+def test_bare_and_scaled_ratings_compare():
+    bare = normalize({'listing_id': '1', 'rating': '4.8'})
+    scaled = normalize({'listing_id': '2', 'rating': '4.8/5'})
+    assert bare['rating'] == scaled['rating'] == pytest.approx(9.6)
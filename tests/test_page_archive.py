@@ -0,0 +1,62 @@
+"""rebuild(): offline re-extraction folded into the current records"""
+
+import pytest
+
+from page_archive import PageArchive, rebuild
+
+LISTING_PAGE = """<html><head><title>Beach House | Vrbo</title></head><body>
+<h1 data-testid="property-title">Spacious Beach House</h1>
+</body></html>"""
+BOT_CHECK_PAGE = '<html><head><title>Bot or Not?</title></head><body></body></html>'
+FETCHED = '2026-01-01T00:00:00+00:00'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PageArchive(tmp_path / 'snapshots')
+
+
+def previous_records():
+    return {
+        '4146676': {'listing_id': '4146676', 'option': 1, 'title': 'Old title', 'price': '$1,000',
+                    'fetched': {'title': FETCHED, 'price': FETCHED}},
+        '2873463': {'listing_id': '2873463', 'option': 2, 'title': 'Large Luxurious Home', 'price': '$2,000',
+                    'fetched': {'title': FETCHED, 'price': FETCHED}},
+    }
+
+
+def test_listings_without_snapshots_are_kept(archive):
+    archive.save('4146676', LISTING_PAGE, name='Spacious Beach House', option=1)
+    results = rebuild(archive, previous_records())
+    assert set(results) == {'4146676', '2873463'}
+    assert results['2873463'] == previous_records()['2873463']
+
+
+def test_reextracted_record_is_merged(archive):
+    archive.save('4146676', LISTING_PAGE, name='Spacious Beach House', option=1)
+    record = rebuild(archive, previous_records())['4146676']
+    assert record['title'] == 'Spacious Beach House'
+    assert record['price'] == '$1,000'  # The page had no price; the previous one stays
+    assert record['fetched']['price'] == FETCHED  # ...and so does its timestamp
+    assert record['fetched']['title'] != FETCHED
+
+
+def test_bot_check_snapshot_keeps_previous_record(archive):
+    archive.save('4146676', BOT_CHECK_PAGE, option=1)
+    assert rebuild(archive, previous_records())['4146676'] == previous_records()['4146676']
+
+
+def test_data_snapshot_fields_override_page(archive):
+    archive.save('4146676', LISTING_PAGE, option=1)
+    responses = [{'url': 'https://www.vrbo.com/graphql', 'status': 200, 'body': {'data': {
+        'similarProperties': [{'id': '999', 'totalPrice': '$9,999'}],
+        'listing': {'id': '4146676', 'totalPrice': '$1,234', 'averageOverallRating': '9.6'}}}}]
+    archive.save_data('4146676', responses, option=1)
+    record = rebuild(archive, previous_records())['4146676']
+    assert record['price'] == '$1,234'
+    assert record['rating'] == '9.6'
+
+
+def test_data_only_listing_is_skipped(archive):
+    archive.save_data('3737974', [{'url': '', 'status': 200, 'body': {}}], option=3)
+    assert rebuild(archive, previous_records()) == previous_records()
@@ -0,0 +1,57 @@
+"""RunJournal: checkpoints and resuming an interrupted run"""
+
+import run_journal
+from run_journal import RunJournal, read_lines
+
+
+def test_resume_latest_skips_finished_listings_and_retries_failed(tmp_path):
+    with RunJournal('update', root=tmp_path) as journal:
+        journal.record('4146676', {'price': '$1,000'})
+        journal.record('2873463', {'error': 'timeout'}, ok=False)
+        run_id = journal.run_id
+
+    with RunJournal('update', resume='latest', root=tmp_path) as journal:
+        assert journal.resumed and journal.run_id == run_id
+        assert journal.done('4146676')
+        assert not journal.done('2873463')
+        journal.record('2873463', {'price': '$2,000'})
+        assert journal.entries()['2873463'][0] == {'price': '$2,000'}
+        assert journal.entries()['4146676'][0] == {'price': '$1,000'}
+
+
+def test_new_run_starts_empty(tmp_path):
+    with RunJournal('update', root=tmp_path) as journal:
+        journal.record('4146676', {'price': '$1,000'})
+        first = journal.run_id
+    with RunJournal('update', root=tmp_path) as journal:
+        assert not journal.resumed and journal.run_id != first
+        assert not journal.done('4146676')
+
+
+def test_resume_of_an_unknown_run_starts_a_new_one(tmp_path):
+    with RunJournal('update', resume='20260101T000000Z-abcdef', root=tmp_path) as journal:
+        assert not journal.resumed
+        assert journal.entries() == {}
+
+
+def test_torn_last_line_is_skipped_and_ended(tmp_path):
+    with RunJournal('update', root=tmp_path) as journal:
+        journal.record('4146676', {'price': '$1,000'})
+    path = tmp_path / 'update.jsonl'
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"run": "torn')
+    with RunJournal('update', resume='latest', root=tmp_path) as journal:
+        assert journal.done('4146676')
+        journal.record('2873463', {'price': '$2,000'})
+    assert [line['listing_id'] for line in read_lines(path)] == ['4146676', '2873463']
+
+
+def test_old_runs_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_journal, 'KEEP_RUNS', 2)
+    run_ids = []
+    for _ in range(3):
+        with RunJournal('update', root=tmp_path) as journal:
+            journal.record('4146676', {})
+            run_ids.append(journal.run_id)
+    runs = {line['run'] for line in read_lines(tmp_path / 'update.jsonl')}
+    assert runs == set(run_ids[1:])
@@ -1,13 +1,28 @@
 """
 VRBO Data Update Script
 Uses Playwright with anti-bot detection, slow navigation, and jittering
-to visit each VRBO listing and update information.
+to visit each VRBO listing and update information. Only listings with a
+field past its freshness TTL (freshness.py) are visited.
+
+Usage:
+    python update_vrbo_data.py               # Visit listings with stale fields
+    python update_vrbo_data.py --force       # Visit every listing
+    python update_vrbo_data.py --limit 50    # At most the 50 most overdue
+    python update_vrbo_data.py --resume      # Continue the last run after a crash or Ctrl+C
 """
 
-from playwright.sync_api import sync_playwright
+from scrape_engine import ScrapeEngine
+from listing_extract import CHALLENGE_TITLES, EXTRACT_ARGS, EXTRACT_SCRIPT, fields_from_data, new_record
+from network_capture import NetworkCapture
+from freshness import describe, load_records, merge, plan
+from listing_db import ListingDB
+from run_journal import RunJournal
+from page_archive import PageArchive
+from resource_policy import format_report
+from page_readiness import PolitenessScheduler, async_wait_for_dom_quiet, async_wait_until_ready
+import argparse
 import json
 import random
-import time
 import os
 from pathlib import Path
 
@@ -28,333 +43,282 @@ listings = [
 # Leave as None to use default Playwright profile (recommended for first run)
 USER_DATA_DIR = None  # Set to your Chrome profile path if you want to use your existing profile
 HEADLESS = False  # Set to True for headless mode
-MIN_DELAY = 2  # Minimum delay between actions (seconds)
-MAX_DELAY = 5  # Maximum delay between actions (seconds)
+CONTEXTS = 3  # Listings loaded at once; the request rate is set by PAGES_PER_MINUTE (page_readiness.py)
 PAGE_LOAD_TIMEOUT = 30000  # 30 seconds
+RESOURCE_PROFILE = 'data-only'  # 'data-only' skips images/media/fonts/third-party scripts, 'full' loads all
+                                # ('full' whenever the browser service is running, to use its disk cache)
+READY_RESPONSE = None  # URL substring of a response to wait for on each page (e.g. '/graphql'), or None
+SCROLL_QUIET_MS = 300  # After a scroll, continue once the DOM is quiet this long...
+SCROLL_QUIET_TIMEOUT = 1500  # ...or after this many ms at most
+MAX_VISITS = None  # Cap on listings visited per run (most overdue first), or None
+OUTPUT_FILE = 'vrbo_updated_data.json'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
-
-def jitter_delay(min_seconds=MIN_DELAY, max_seconds=MAX_DELAY):
-    """Add random jitter delay to mimic human behavior"""
-    delay = random.uniform(min_seconds, max_seconds)
-    time.sleep(delay)
-    return delay
+# Stealth scripts to avoid detection, added to every browser context
+STEALTH_SCRIPT = """
+    // Override webdriver property
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    
+    // Override plugins
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+    
+    // Override languages
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en']
+    });
+    
+    // Override permissions
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+    
+    // Chrome runtime
+    window.chrome = {
+        runtime: {}
+    };
+    """
 
 
-def human_like_scroll(page):
+async def human_like_scroll(page):
     """Scroll the page in a human-like manner"""
     # Random scroll amount
     scroll_amount = random.randint(300, 800)
     # Random scroll direction (mostly down, sometimes up)
     direction = random.choice([1, 1, 1, -1])  # 75% down, 25% up
     
-    page.evaluate(f"window.scrollBy(0, {scroll_amount * direction})")
-    jitter_delay(0.5, 1.5)
+    await page.evaluate(f"window.scrollBy(0, {scroll_amount * direction})")
+    # Lazy content triggered by the scroll has rendered once the DOM goes quiet
+    await async_wait_for_dom_quiet(page, SCROLL_QUIET_MS, SCROLL_QUIET_TIMEOUT)
 
 
-def extract_property_data(page, listing_id, name, option_num):
-    """Extract property data from the VRBO page"""
-    data = {
-        'listing_id': listing_id,
-        'name': name,
-        'option': option_num,
-        'url': page.url,
-        'title': '',
-        'price': '',
-        'rating': '',
-        'reviews': '',
-        'bedrooms': '',
-        'bathrooms': '',
-        'sleeps': '',
-        'sqft': '',
-        'amenities': [],
-        'description': '',
-        'images': []
-    }
+async def extract_property_data(page, listing_id, name, option_num, log=print):
+    """Extract property data from the VRBO page
+
+    All fields are read by one page.evaluate call (EXTRACT_SCRIPT), so the
+    cost is a single browser round trip however many elements match.
+    """
+    data = new_record(listing_id, name, option_num, page.url)
     
     try:
-        # Wait for page to be interactive (skip networkidle as VRBO has continuous activity)
-        jitter_delay(1, 2)
-        
-        # Extract title
-        try:
-            title_selectors = [
-                'h1[data-testid="property-title"]',
-                'h1',
-                '[data-testid="property-name"]',
-                '.property-title'
-            ]
-            for selector in title_selectors:
-                element = page.query_selector(selector)
-                if element:
-                    data['title'] = element.inner_text().strip()
-                    break
-        except:
-            pass
+        record = await page.evaluate(EXTRACT_SCRIPT, EXTRACT_ARGS)
+        data.update({key: value for key, value in record.items() if key in data})
         
-        # Extract price
-        try:
-            price_selectors = [
-                '[data-testid="price-summary-total"]',
-                '[data-testid="price"]',
-                '.price',
-                '[class*="price"]'
-            ]
-            for selector in price_selectors:
-                element = page.query_selector(selector)
-                if element:
-                    data['price'] = element.inner_text().strip()
-                    break
-        except:
-            pass
+        # Human-like scroll to trigger lazy loading
+        for _ in range(random.randint(2, 4)):
+            await human_like_scroll(page)
         
-        # Extract rating and reviews
-        try:
-            rating_selectors = [
-                '[data-testid="rating"]',
-                '[class*="rating"]',
-                '[class*="review"]'
-            ]
-            for selector in rating_selectors:
-                elements = page.query_selector_all(selector)
-                for elem in elements:
-                    text = elem.inner_text()
-                    if '★' in text or 'rating' in text.lower():
-                        data['rating'] = text.strip()
-                        break
-        except:
-            pass
+    except Exception as e:
+        log(f"  [!] Error extracting data: {e}")
+    
+    return data
+
+
+async def process_listing(worker, position, total, listing, archive):
+    """Visit one listing on worker's page; return (data, resource report or None)"""
+    listing_id, name, option_num = listing
+    log = worker.log
+    log(f"\n[{position}/{total}] Processing: {name} (ID: {listing_id})")
+    log("-" * 70)
+    
+    url = f'https://www.vrbo.com/{listing_id}'
+    page = worker.page
+    
+    try:
+        # Navigate once the scheduler allows another request to the site
+        log(f"  [*] Navigating to {url}...")
+        await worker.goto(url, READY_RESPONSE, wait_until='domcontentloaded', timeout=PAGE_LOAD_TIMEOUT)
+        if worker.last_wait:
+            log(f"  [*] Paced {worker.last_wait:.1f}s since the previous page")
         
-        # Extract property details (bedrooms, bathrooms, sleeps, sqft)
-        try:
-            detail_selectors = [
-                '[data-testid="property-details"]',
-                '[class*="property-detail"]',
-                '[class*="bedroom"]',
-                '[class*="bathroom"]'
-            ]
-            for selector in detail_selectors:
-                elements = page.query_selector_all(selector)
-                for elem in elements:
-                    text = elem.inner_text().lower()
-                    if 'bedroom' in text:
-                        data['bedrooms'] = text.strip()
-                    elif 'bath' in text:
-                        data['bathrooms'] = text.strip()
-                    elif 'sleep' in text:
-                        data['sleeps'] = text.strip()
-                    elif 'sq' in text or 'square' in text:
-                        data['sqft'] = text.strip()
-        except:
-            pass
+        # Ready when listing content is in the DOM and it stops growing
+        # (not 'networkidle': VRBO has continuous network activity)
+        elapsed, how = await async_wait_until_ready(page)
+        log(f"  [*] Page ready after {elapsed:.1f}s ({how})")
         
-        # Extract amenities
-        try:
-            amenity_selectors = [
-                '[data-testid="amenity"]',
-                '[class*="amenity"]',
-                '[class*="feature"]'
-            ]
-            for selector in amenity_selectors:
-                elements = page.query_selector_all(selector)
-                for elem in elements[:20]:  # Limit to first 20
-                    text = elem.inner_text().strip()
-                    if text and len(text) < 100:  # Reasonable amenity length
-                        data['amenities'].append(text)
-        except:
-            pass
+        # Human-like interaction: scroll and move mouse
+        log("  [*] Simulating human interaction...")
+        await human_like_scroll(page)
         
-        # Extract description
-        try:
-            desc_selectors = [
-                '[data-testid="property-description"]',
-                '[class*="description"]',
-                '[class*="overview"]'
-            ]
-            for selector in desc_selectors:
-                element = page.query_selector(selector)
-                if element:
-                    data['description'] = element.inner_text().strip()[:500]  # Limit length
-                    break
-        except:
-            pass
+        # Extract data
+        log("  [*] Extracting property data...")
+        data = await extract_property_data(page, listing_id, name, option_num, log)
+        archive.save(listing_id, await page.content(), page.url, name, option_num)
         
-        # Extract image URLs
-        try:
-            # Look for images in the page content
-            image_urls = page.evaluate("""
-                () => {
-                    const images = [];
-                    const imgElements = document.querySelectorAll('img');
-                    imgElements.forEach(img => {
-                        const src = img.src || img.getAttribute('data-src') || img.getAttribute('data-lazy-src');
-                        if (src && (src.includes('trvl-media.com') || src.includes('vrbo') || src.includes('expedia'))) {
-                            if (!src.includes('logo') && !src.includes('icon') && !src.includes('avatar')) {
-                                images.push(src);
-                            }
-                        }
-                    });
-                    return [...new Set(images)].slice(0, 20); // Return unique URLs, max 20
-                }
-            """)
-            data['images'] = image_urls
-        except:
-            pass
+        # The site's own JSON/GraphQL responses beat DOM scraping where they have a field
+        await worker.capture.async_settle()
+        worker.capture.save_data(archive, listing_id, name, option_num)
+        from_data = fields_from_data(worker.capture.data, listing_id)
+        data.update(from_data)
+        if from_data:
+            log(f"  [+] From {len(worker.capture.data)} data responses: {', '.join(from_data)}")
+        if (await page.title()).strip().lower() in CHALLENGE_TITLES:
+            # Keep the previous values (and their timestamps) rather than blanks
+            data['error'] = 'bot check page, no listing content'
+            log("  [!] Bot check page served; fields left stale")
+        # Image URLs requested by the page (blocked or not) add lazy-loaded ones
+        data['images'] = list(dict.fromkeys(data['images'] + worker.policy.image_urls))[:20]
+        report = worker.policy.report(timing=await worker.policy.async_page_timing(page))
         
-        # Human-like scroll to trigger lazy loading
-        for _ in range(random.randint(2, 4)):
-            human_like_scroll(page)
+        # Print summary
+        log(f"  [+] Title: {data['title'][:50] if data['title'] else 'N/A'}...")
+        log(f"  [+] Price: {data['price'] if data['price'] else 'N/A'}")
+        log(f"  [+] Images found: {len(data['images'])}")
+        log(f"  [+] Amenities: {len(data['amenities'])}")
+        log(f"  [+] Resources: {format_report(report)}")
+        return data, report
         
     except Exception as e:
-        print(f"  [!] Error extracting data: {e}")
-    
-    return data
+        log(f"  [!] Error processing {name}: {e}")
+        return {
+            'listing_id': listing_id,
+            'name': name,
+            'option': option_num,
+            'error': str(e)
+        }, None
 
 
 def main():
     """Main function to update VRBO data"""
+    parser = argparse.ArgumentParser(description='Refresh stale VRBO listing data')
+    parser.add_argument('--force', action='store_true', help='Visit every listing regardless of freshness')
+    parser.add_argument('--limit', type=int, default=MAX_VISITS, help='Visit at most this many (most overdue first)')
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RUN_ID',
+                        help='Skip listings an interrupted run already finished (default: the latest run)')
+    args = parser.parse_args()
+    
+    journal = RunJournal('update_vrbo_data', args.resume)  # Each finished listing is on disk at once
+    previous = load_records(OUTPUT_FILE)
+    if args.force:
+        due = [(listing, []) for listing in listings][:args.limit]
+    else:
+        due = plan(listings, previous, limit=args.limit)
+    todo = [(listing, stale) for listing, stale in due if not journal.done(listing[0])]
+    
     print("=" * 70)
     print("VRBO Data Update Script")
     print("=" * 70)
     print(f"Mode: {'Headed' if not HEADLESS else 'Headless'}")
     print(f"User Profile: {USER_DATA_DIR}")
-    print(f"Listings to process: {len(listings)}")
+    print(f"Resource profile: {RESOURCE_PROFILE}")
+    print(f"Browser contexts: {CONTEXTS}")
+    print(f"Run: {journal.run_id}" + (f" (resumed, {len(due) - len(todo)} already done)" if journal.resumed else ""))
+    print(f"Listings to process: {len(todo)} of {len(listings)}")
+    for (listing_id, name, option_num), stale in todo:
+        if stale:
+            print(f"  Option {option_num}: {name} - {describe(previous.get(listing_id), stale)}")
     print("=" * 70)
     print()
     
-    results = {}
+    if not todo and not journal.resumed:
+        print("[=] Every listing is within its freshness TTLs; nothing to visit (--force to visit anyway)")
+        journal.close()
+        return
     
-    with sync_playwright() as p:
-        # Launch browser with persistent context (user profile) if specified
-        launch_options = {
-            'headless': HEADLESS,
-            'args': [
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-            ]
-        }
-        
-        # Add user data directory if specified
-        if USER_DATA_DIR:
-            launch_options['args'].append(f'--user-data-dir={USER_DATA_DIR}')
-        
-        browser = p.chromium.launch(**launch_options)
-        
-        # Create context with realistic settings
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            viewport={'width': 1920, 'height': 1080},
-            locale='en-US',
-            timezone_id='America/Chicago',
-            permissions=['geolocation'],
-            geolocation={'latitude': 29.3013, 'longitude': -94.7977},  # Galveston coordinates
-            color_scheme='light',
-        )
-        
-        # Add stealth scripts to avoid detection
-        context.add_init_script("""
-            // Override webdriver property
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-            
-            // Override plugins
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5]
-            });
-            
-            // Override languages
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en']
-            });
-            
-            // Override permissions
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                    Promise.resolve({ state: Notification.permission }) :
-                    originalQuery(parameters)
-            );
-            
-            // Chrome runtime
-            window.chrome = {
-                runtime: {}
-            };
-        """)
-        
-        page = context.new_page()
-        
-        for i, (listing_id, name, option_num) in enumerate(listings, 1):
-            print(f"\n[{i}/{len(listings)}] Processing: {name} (ID: {listing_id})")
-            print("-" * 70)
-            
-            url = f'https://www.vrbo.com/{listing_id}'
-            
-            try:
-                # Navigate to page with slow, human-like behavior
-                print(f"  [*] Navigating to {url}...")
-                page.goto(url, wait_until='domcontentloaded', timeout=PAGE_LOAD_TIMEOUT)
-                
-                # Wait with jitter
-                delay = jitter_delay(2, 4)
-                print(f"  [*] Waited {delay:.1f}s (jitter)")
-                
-                # Wait for page to be ready (use 'load' instead of 'networkidle' as VRBO has continuous network activity)
-                print("  [*] Waiting for page to load...")
-                try:
-                    page.wait_for_load_state('load', timeout=20000)
-                except:
-                    pass  # Continue even if timeout
-                jitter_delay(2, 4)  # Give extra time for content to render
-                
-                # Human-like interaction: scroll and move mouse
-                print("  [*] Simulating human interaction...")
-                human_like_scroll(page)
-                
-                # Extract data
-                print("  [*] Extracting property data...")
-                data = extract_property_data(page, listing_id, name, option_num)
-                results[listing_id] = data
-                
-                # Print summary
-                print(f"  [+] Title: {data['title'][:50] if data['title'] else 'N/A'}...")
-                print(f"  [+] Price: {data['price'] if data['price'] else 'N/A'}")
-                print(f"  [+] Images found: {len(data['images'])}")
-                print(f"  [+] Amenities: {len(data['amenities'])}")
-                
-                # Random delay before next listing
-                if i < len(listings):
-                    delay = jitter_delay(3, 6)
-                    print(f"  [*] Waiting {delay:.1f}s before next listing...")
-                
-            except Exception as e:
-                print(f"  [!] Error processing {name}: {e}")
-                results[listing_id] = {
-                    'listing_id': listing_id,
-                    'name': name,
-                    'option': option_num,
-                    'error': str(e)
-                }
-        
-        browser.close()
+    archive = PageArchive()  # Raw pages, for re-extraction without a browser
+    scheduler = PolitenessScheduler()  # The only place that paces requests to the site
+    
+    # Launch browser with persistent context (user profile) if specified
+    launch_options = {
+        'headless': HEADLESS,
+        'args': [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-sandbox',
+            '--disable-setuid-sandbox',
+        ]
+    }
+    
+    # Add user data directory if specified
+    if USER_DATA_DIR:
+        launch_options['args'].append(f'--user-data-dir={USER_DATA_DIR}')
+    
+    # Every context gets the same realistic settings
+    context_options = {
+        'user_agent': USER_AGENT,
+        'viewport': {'width': 1920, 'height': 1080},
+        'locale': 'en-US',
+        'timezone_id': 'America/Chicago',
+        'permissions': ['geolocation'],
+        'geolocation': {'latitude': 29.3013, 'longitude': -94.7977},  # Galveston coordinates
+        'color_scheme': 'light',
+    }
+    
+    engine = ScrapeEngine(CONTEXTS, launch_options, context_options, STEALTH_SCRIPT, RESOURCE_PROFILE, scheduler,
+                          capture_factory=NetworkCapture)  # Data responses only (no staging dir for images)
+    
+    async def handler(worker, item):
+        position, listing = item
+        data, report = await process_listing(worker, position, len(todo), listing, archive)
+        journal.record(listing[0], {'data': data, 'report': report}, ok='error' not in data)
+        return data, report
+    
+    outcomes = []
+    if todo:
+        outcomes = engine.run_sync(enumerate((listing for listing, _ in todo), 1), handler)
+        print(f"\n[+] {len(todo)} listings in {engine.elapsed:.1f}s ({scheduler.waited:.1f}s of it pacing waits)")
+    
+    # Everything this run finished comes from the journal, including listings done before a resume
+    finished = journal.entries()
+    journal.close()
+    visited = {}
+    visited_at = {}
+    resource_reports = {}
+    crashed = {listing[0]: outcome for (listing, _), outcome in zip(todo, outcomes) if isinstance(outcome, Exception)}
+    for listing_id, name, option_num in listings:
+        if listing_id in finished:
+            entry, visited_at[listing_id] = finished[listing_id]
+            visited[listing_id] = entry['data']
+            if entry['report']:
+                resource_reports[listing_id] = entry['report']
+        elif listing_id in crashed:
+            visited[listing_id] = {'listing_id': listing_id, 'name': name, 'option': option_num,
+                                   'error': str(crashed[listing_id])}
+    
+    # Visited listings are merged over the previous records; the rest are kept as they were
+    results = {}
+    for listing_id, _, _ in listings:
+        if listing_id in visited:
+            results[listing_id] = merge(previous.get(listing_id), visited[listing_id], visited_at.get(listing_id))
+        elif listing_id in previous:
+            results[listing_id] = previous[listing_id]
+    results.update({key: value for key, value in previous.items() if key not in results})
     
     # Save results to JSON
-    output_file = 'vrbo_updated_data.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
     print("\n" + "=" * 70)
-    print(f"[+] Results saved to {output_file}")
+    print(f"[+] Results saved to {OUTPUT_FILE}")
+    
+    # What this run actually saw becomes timestamped history
+    with ListingDB() as db, db.transaction():
+        observations = sum(db.record_listing(record, visited_at.get(listing_id), 'update_vrbo_data')
+                           for listing_id, record in visited.items())
+    print(f"[+] {observations} observations added to {db.path}")
     print("=" * 70)
     
     # Print summary
     print("\nSummary:")
-    for listing_id, data in results.items():
+    for listing_id, data in visited.items():
         if 'error' not in data:
             print(f"  Option {data.get('option', '?')}: {data.get('name', 'Unknown')} - {len(data.get('images', []))} images")
         else:
             print(f"  {data.get('name', 'Unknown')} - ERROR: {data['error']}")
+    
+    if resource_reports:
+        loaded = sum(r['loaded_kb'] for r in resource_reports.values())
+        saved = sum(r['estimated_saved_kb'] for r in resource_reports.values())
+        ready = [r['dom_ready_s'] for r in resource_reports.values() if r['dom_ready_s']]
+        print(f"\nResources ({engine.profile}): {loaded / 1024:.1f} MB loaded, "
+              f"~{saved / 1024:.1f} MB saved (est.), "
+              f"mean DOM ready {sum(ready) / len(ready) if ready else 0:.2f}s")
 
 
 if __name__ == '__main__':